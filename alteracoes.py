@@ -0,0 +1,185 @@
+"""
+Detecção de alterações feitas por outros processos no mesmo banco.
+
+A CLI (main.py) e a interface gráfica (interface.py) podem abrir o mesmo
+arquivo ao mesmo tempo. Cada processo tem o próprio cache de leitura, então
+as escritas de um precisam invalidar o cache do outro.
+
+A detecção é feita em duas etapas baratas:
+
+1. ``PRAGMA data_version`` em uma conexão dedicada: o valor só muda quando
+   outra conexão confirma uma escrita no arquivo. Se não mudou, nada mais é
+   lido.
+2. A tabela ``alteracoes`` (migração 6), que guarda um contador por tabela
+   incrementado por gatilhos. Apenas as tabelas cujo contador mudou têm suas
+   entradas removidas do cache e dos mapas de identidade das sessões.
+
+Os gatilhos do SQLite rodam uma vez por linha, então cada linha gravada nas
+cinco tabelas monitoradas também atualiza a linha da tabela em
+``alteracoes``. Todas as transações que escrevem na mesma tabela disputam
+essa linha, o que não muda nada na prática: o SQLite já serializa as
+escritas no arquivo inteiro. Em cargas grandes (importador, gerador), o custo
+é uma atualização a mais por linha gravada em uma página que já está em
+memória.
+
+As escritas do próprio processo não invalidam o cache: ``Database`` lê os
+contadores dentro da transação de escrita e os informa em
+``registrar_escrita``.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+from urllib.request import pathname2url
+
+# Entradas do cache são etiquetadas pela tabela principal da consulta; as
+# tabelas de dados específicos dos usuários afetam as consultas de usuarios
+TABELAS_DO_CACHE = {
+    'usuarios': 'usuarios',
+    'admins': 'usuarios',
+    'anunciantes': 'usuarios',
+    'veiculos': 'veiculos',
+    'anuncios': 'anuncios',
+}
+
+
+class DetectorAlteracoes:
+    """
+    Verifica periodicamente se outro processo alterou o banco.
+
+    Attributes:
+        intervalo: Tempo mínimo, em segundos, entre duas verificações.
+    """
+
+    def __init__(self, db, intervalo: float = 0.5):
+        """
+        Args:
+            db: Instância de Database cujo cache será invalidado.
+            intervalo: Tempo mínimo entre verificações (0 verifica sempre).
+        """
+        self.db = db
+        self.intervalo = intervalo
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._ultima_verificacao = 0.0
+        self._data_version: Optional[int] = None
+        self._versoes: Optional[dict] = None
+
+    def verificar(self, forcar: bool = False) -> List[str]:
+        """
+        Invalida o cache e os mapas de identidade das tabelas alteradas desde
+        a última verificação.
+
+        As escritas deste processo já registradas (``registrar_escrita``)
+        não contam como alteração.
+
+        Args:
+            forcar: Ignora o intervalo mínimo entre verificações.
+
+        Returns:
+            List[str]: Tabelas alteradas.
+        """
+        if self.db.is_memory:
+            # Banco em memória: não há outro processo
+            return []
+
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_verificacao < self.intervalo:
+            return []
+
+        with self._lock:
+            self._ultima_verificacao = agora
+            try:
+                conn = self._conexao()
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version == self._data_version:
+                    return []
+                rows = conn.execute("SELECT tabela, versao FROM alteracoes").fetchall()
+            except sqlite3.OperationalError:
+                # Arquivo ainda não criado ou esquema anterior à migração 6
+                return []
+            self._data_version = data_version
+
+            versoes = dict(rows)
+            if self._versoes is None:
+                # Primeira leitura: registra o ponto de partida e descarta o
+                # que tenha sido guardado antes dele
+                self._versoes = versoes
+                self.db._invalidate_all()
+                return []
+
+            alteradas = [tabela for tabela, versao in versoes.items()
+                         if self._versoes.get(tabela) != versao]
+            self._versoes = versoes
+
+        # Os mapas de identidade usam os mesmos nomes de tabela do cache: os
+        # objetos descartados são relidos do banco na próxima consulta
+        for tabela in {TABELAS_DO_CACHE.get(t, t) for t in alteradas}:
+            self.db.invalidate(tabela)
+        if alteradas:
+            self.db._mark_write()
+        return alteradas
+
+    @property
+    def em_uso(self) -> bool:
+        """Indica se já existe um ponto de partida (primeira verificação feita)."""
+        return self._versoes is not None
+
+    def ler_versoes(self, conn: sqlite3.Connection) -> Optional[dict]:
+        """
+        Lê os contadores na conexão de uma escrita deste processo.
+
+        Deve ser chamada dentro da transação de escrita, que já reservou o
+        lock do arquivo: nenhum outro processo muda os contadores até o
+        COMMIT.
+
+        Returns:
+            Optional[dict]: tabela -> versão, ou None se o detector não está
+            em uso ou o esquema é anterior à migração 6.
+        """
+        if self._versoes is None:
+            return None
+        try:
+            return dict(conn.execute("SELECT tabela, versao FROM alteracoes").fetchall())
+        except sqlite3.OperationalError:
+            return None
+
+    def registrar_escrita(self, antes: Optional[dict], depois: Optional[dict]):
+        """
+        Marca como já vistas as alterações de uma escrita confirmada deste
+        processo.
+
+        Só avançam as tabelas cujo contador, no início da escrita, estava no
+        valor já conhecido. Se outro processo alterou a tabela antes disso, a
+        próxima verificação ainda invalida o cache dela.
+
+        Args:
+            antes: Contadores lidos logo após o BEGIN.
+            depois: Contadores lidos antes do COMMIT.
+        """
+        if antes is None or depois is None:
+            return
+        with self._lock:
+            if self._versoes is None:
+                return
+            for tabela, versao in depois.items():
+                if self._versoes.get(tabela) == antes.get(tabela):
+                    self._versoes[tabela] = versao
+
+    def fechar(self):
+        """Fecha a conexão dedicada."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._data_version = None
+            self._versoes = None
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão somente leitura usada apenas pelo detector."""
+        if self._conn is None:
+            uri = f"file:{pathname2url(os.path.abspath(self.db._db_path))}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return self._conn
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark dos Repositórios
+==========================
+
+Mede as operações principais dos repositórios em bancos de vários tamanhos
+e compara com uma referência gravada.
+
+1. Gera um banco temporário (gerador.py) com o menor tamanho, mede as
+   operações e faz o mesmo banco crescer até o próximo tamanho.
+2. A medição é feita em ``--rodadas``: em cada uma, todas as operações são
+   chamadas ``--repeticoes`` vezes, com entradas sorteadas a partir de uma
+   semente fixa, e também uma carga fixa de CPU (calibração). Cada rodada
+   contribui com a mediana dos seus tempos, dividida pela da calibração:
+   uma máquina mais lenta ou mais rápida naquele momento não muda a
+   proporção.
+3. As medianas por rodada são comparadas com as de
+   ``benchmark_referencia.json`` pelo teste de Mann-Whitney unilateral: uma
+   operação regrediu se ficou mais lenta com significância estatística (p
+   menor que ``--alfa``, corrigido por Bonferroni pelo número de
+   comparações) e a mediana piorou mais que ``--limiar``. A primeira
+   condição descarta o ruído da máquina; a segunda, diferenças reais, mas
+   pequenas demais para importar.
+
+Os tempos dependem da máquina: grave a referência (``--atualizar``) na
+mesma máquina em que o benchmark será repetido.
+
+Uso:
+    python benchmark.py                       # compara com a referência
+    python benchmark.py --atualizar           # grava a referência atual
+    python benchmark.py --tamanhos 1000,10000,100000 --rodadas 20
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from statistics import NormalDist, mean, median, stdev
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import Database
+from gerador import MARCAS, GeradorCatalogo
+
+REFERENCIA_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 'benchmark_referencia.json')
+TAMANHOS_PADRAO = (1000, 10000, 100000)
+
+# Termos da busca textual: modelos e prefixos de marca + modelo
+_TERMOS = ([modelo.lower() for _, modelos in MARCAS.values() for modelo, _ in modelos]
+           + ['toyota cor', 'chevrolet on', 'fiat ar', 'honda ci'])
+_STATUS = ('Aprovado', 'Pendente', 'Rejeitado')
+
+# Carga fixa, só de CPU, medida em todas as rodadas: as operações são
+# comparadas em proporção a ela, o que desconta a velocidade da máquina no
+# momento (frequência da CPU, outros processos)
+CALIBRACAO = 'calibracao'
+_DADOS_CALIBRACAO = random.Random(0).choices(range(10**6), k=2000)
+
+
+def _calibrar(_):
+    sorted(_DADOS_CALIBRACAO)
+
+
+# ========== ESTATÍSTICA ==========
+
+def resumir(amostras: List[float]) -> dict:
+    """Mediana, média, p90, desvio padrão e tamanho de uma amostra (ms)."""
+    ordenadas = sorted(amostras)
+    return {
+        'n': len(ordenadas),
+        'mediana_ms': median(ordenadas),
+        'media_ms': mean(ordenadas),
+        'p90_ms': ordenadas[max(math.ceil(0.9 * len(ordenadas)) - 1, 0)],
+        'desvio_ms': stdev(ordenadas) if len(ordenadas) > 1 else 0.0,
+    }
+
+
+def mann_whitney(referencia: List[float], atual: List[float]) -> float:
+    """
+    Teste de Mann-Whitney unilateral (aproximação normal, com correção de
+    empates e de continuidade).
+
+    Returns:
+        float: p-valor da hipótese "os tempos de ``atual`` tendem a ser
+        maiores que os de ``referencia``".
+    """
+    n1, n2 = len(referencia), len(atual)
+    if not n1 or not n2:
+        return 1.0
+    valores = sorted([(v, 0) for v in referencia] + [(v, 1) for v in atual])
+    n = n1 + n2
+
+    # Postos médios nos empates
+    soma_postos_atual = 0.0
+    correcao_empates = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and valores[j + 1][0] == valores[i][0]:
+            j += 1
+        posto = (i + j) / 2 + 1
+        empatados = j - i + 1
+        correcao_empates += empatados ** 3 - empatados
+        soma_postos_atual += posto * sum(grupo for _, grupo in valores[i:j + 1])
+        i = j + 1
+
+    u = soma_postos_atual - n2 * (n2 + 1) / 2
+    media_u = n1 * n2 / 2
+    variancia = n1 * n2 / 12 * ((n + 1) - correcao_empates / (n * (n - 1)))
+    if variancia <= 0:
+        return 1.0
+    z = (u - media_u - 0.5) / math.sqrt(variancia)
+    return 1 - NormalDist().cdf(z)
+
+
+def comparar(referencia: dict, atuais: dict, alfa: float = 0.05,
+             limiar: float = 0.10) -> dict:
+    """
+    Compara as medianas por rodada atuais com as da referência.
+
+    Quando os dois lados têm a calibração, cada rodada é dividida pelo tempo
+    da calibração na mesma rodada, e o teste e a variação usam essas
+    proporções (em vez dos milissegundos).
+
+    Args:
+        referencia: ``{tamanho: {operacao: {'rodadas': [...]}}}`` gravado.
+        atuais: Resultados no mesmo formato.
+        alfa: Nível de significância global (dividido pelo número de
+            comparações).
+        limiar: Piora (ou melhora) mínima da mediana, em fração, para contar.
+
+    Returns:
+        dict: comparacoes (lista de dicts com tamanho, operacao, mediana_ms,
+        referencia_ms, variacao (descontada a calibração), p e situacao:
+        'regressao', 'melhora' ou
+        'estavel'), regressoes (as comparações em regressão) e ausentes
+        (tamanho/operação sem referência).
+    """
+    pares, ausentes = [], []
+    for tamanho, operacoes in atuais.items():
+        medidas_ref = referencia.get(tamanho, {})
+        for operacao, atual in operacoes.items():
+            if operacao == CALIBRACAO:
+                continue
+            anterior = medidas_ref.get(operacao)
+            if anterior is None:
+                ausentes.append((tamanho, operacao))
+                continue
+            pares.append((tamanho, operacao, anterior['rodadas'], atual['rodadas'],
+                          _relativas(medidas_ref, anterior), _relativas(operacoes, atual)))
+
+    alfa_corrigido = alfa / max(len(pares), 1)
+    comparacoes = []
+    for tamanho, operacao, rodadas_ref, rodadas, anteriores, amostras in pares:
+        mediana, mediana_ref = median(rodadas), median(rodadas_ref)
+        variacao = median(amostras) / median(anteriores) - 1 if median(anteriores) else 0.0
+        p_pior = mann_whitney(anteriores, amostras)
+        p_melhor = mann_whitney(amostras, anteriores)
+        if p_pior < alfa_corrigido and variacao > limiar:
+            situacao, p = 'regressao', p_pior
+        elif p_melhor < alfa_corrigido and variacao < -limiar:
+            situacao, p = 'melhora', p_melhor
+        else:
+            situacao, p = 'estavel', min(p_pior, p_melhor)
+        comparacoes.append({'tamanho': tamanho, 'operacao': operacao, 'mediana_ms': mediana,
+                            'referencia_ms': mediana_ref, 'variacao': variacao, 'p': p,
+                            'situacao': situacao})
+
+    return {'comparacoes': comparacoes,
+            'regressoes': [c for c in comparacoes if c['situacao'] == 'regressao'],
+            'ausentes': ausentes}
+
+
+def _relativas(medidas: dict, operacao: dict) -> List[float]:
+    """Medianas por rodada divididas pelas da calibração, se houver."""
+    calibracao = medidas.get(CALIBRACAO)
+    if calibracao is None:
+        return operacao['rodadas']
+    return [tempo / base for tempo, base in zip(operacao['rodadas'], calibracao['rodadas'])
+            if base]
+
+
+# ========== OPERAÇÕES ==========
+
+def operacoes(db: Database) -> Dict[str, Tuple[Callable, Callable]]:
+    """
+    Operações medidas: nome -> (sortear entrada, executar).
+
+    O sorteio da entrada acontece fora da medição; só ``executar(entrada)``
+    é cronometrado.
+    """
+    from models.Vehicle import Veiculo
+    from repository import AnuncioRepository, UsuarioRepository, VeiculoRepository
+
+    usuarios, veiculos, anuncios = UsuarioRepository(), VeiculoRepository(), AnuncioRepository()
+
+    def faixa(tabela):
+        row = db.fetch_one(f"SELECT MIN(id) AS menor, MAX(id) AS maior FROM {tabela}")
+        return row['menor'], row['maior']
+
+    v_min, v_max = faixa('veiculos')
+    a_min, a_max = faixa('anuncios')
+    emails = [row['email'] for row in db.fetch_all("SELECT email FROM usuarios")]
+    anunciantes = [row['usuario_id'] for row in
+                   db.fetch_all("SELECT usuario_id FROM anunciantes LIMIT 1000")]
+
+    def novo_veiculo(r):
+        marca = r.choice(list(MARCAS))
+        modelo, preco = r.choice(MARCAS[marca][1])
+        return (Veiculo(marca, modelo, r.randint(2005, 2024), float(preco),
+                        r.randint(0, 150000)), r.choice(anunciantes))
+
+    return {
+        'veiculos.salvar': (novo_veiculo, lambda e: veiculos.salvar(*e)),
+        'veiculos.buscar_por_id': (lambda r: r.randint(v_min, v_max), veiculos.buscar_por_id),
+        'veiculos.buscar': (lambda r: r.choice(_TERMOS), veiculos.buscar),
+        'veiculos.listar_todos': (lambda r: r.randint(v_min, v_max),
+                                  lambda e: veiculos.listar_todos(after_id=e, limit=50)),
+        'anuncios.buscar_por_id': (lambda r: r.randint(a_min, a_max), anuncios.buscar_por_id),
+        'anuncios.listar_por_status': (
+            lambda r: (r.choice(_STATUS), r.randint(a_min, a_max)),
+            lambda e: anuncios.listar_por_status(e[0], after_id=e[1], limit=50)),
+        'anuncios.listar_todos': (lambda r: r.randint(a_min, a_max),
+                                  lambda e: anuncios.listar_todos(after_id=e, limit=50)),
+        'anuncios.atualizar_status': (lambda r: (r.randint(a_min, a_max), r.choice(_STATUS)),
+                                      lambda e: anuncios.atualizar_status(*e)),
+        'usuarios.buscar_por_email': (lambda r: r.choice(emails), usuarios.buscar_por_email),
+    }
+
+
+def medir(executar: Callable, entradas: list) -> List[float]:
+    """
+    Tempos, em milissegundos, de uma chamada de ``executar`` por entrada.
+
+    O coletor de lixo fica desligado durante as chamadas, como no ``timeit``.
+    """
+    tempos = []
+    gc_ligado = gc.isenabled()
+    gc.disable()
+    try:
+        for entrada in entradas:
+            inicio = time.perf_counter()
+            executar(entrada)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        if gc_ligado:
+            gc.enable()
+    return tempos
+
+
+def executar_benchmark(db: Database, tamanhos=TAMANHOS_PADRAO, rodadas: int = 10,
+                       repeticoes: int = 20, semente: int = 42,
+                       operacoes_escolhidas: Optional[List[str]] = None,
+                       ao_medir=None) -> dict:
+    """
+    Gera o banco em cada tamanho e mede as operações.
+
+    As medições são feitas em rodadas: cada rodada chama todas as operações
+    ``repeticoes`` vezes, uma operação depois da outra. Assim, variações da
+    máquina ao longo da execução (outros processos, frequência da CPU)
+    atingem todas as operações por igual, e a mediana de cada rodada é uma
+    observação independente para o teste estatístico.
+
+    Args:
+        db: Banco vazio (com as tabelas criadas), de preferência sem cache
+            de leitura, para medir o SQLite e não o cache.
+        tamanhos: Quantidades de veículos, em ordem crescente (o banco
+            cresce de um tamanho para o próximo; usuários = veículos / 10).
+        rodadas: Rodadas de medição por tamanho.
+        repeticoes: Chamadas de cada operação por rodada.
+        semente: Semente do catálogo e das entradas.
+        operacoes_escolhidas: Nomes das operações (padrão: todas).
+        ao_medir: Função chamada com (tamanho, operacao, resumo).
+
+    Returns:
+        dict: ``{tamanho: {operacao: {'resumo': {...}, 'rodadas': [...]}}}``
+        (tamanhos como texto, como no JSON; ``rodadas`` são as medianas de
+        cada rodada, em ms).
+    """
+    resultados = {}
+    atual = 0
+    for tamanho in sorted(tamanhos):
+        faltam = tamanho - atual
+        GeradorCatalogo(db, usuarios=max(faltam // 10, 2), veiculos=faltam,
+                        semente=semente + tamanho).executar()
+        atual = tamanho
+        ultimo_gerado = db.fetch_one("SELECT MAX(id) AS id FROM veiculos")['id']
+
+        medidas = {nome: operacao for nome, operacao in operacoes(db).items()
+                   if not operacoes_escolhidas or nome in operacoes_escolhidas}
+        medidas[CALIBRACAO] = (lambda r: None, _calibrar)
+        aleatorios = {nome: random.Random(f"{semente}:{tamanho}:{nome}") for nome in medidas}
+        amostras = {nome: [] for nome in medidas}
+        medianas = {nome: [] for nome in medidas}
+
+        # Aquecimento (conexões, statements preparados, páginas em cache)
+        for nome, (sortear, executar) in medidas.items():
+            medir(executar, [sortear(aleatorios[nome]) for _ in range(5)])
+
+        for _ in range(rodadas):
+            for nome, (sortear, executar) in medidas.items():
+                entradas = [sortear(aleatorios[nome]) for _ in range(repeticoes)]
+                tempos = medir(executar, entradas)
+                amostras[nome].extend(tempos)
+                medianas[nome].append(round(median(tempos), 4))
+
+        resultados[str(tamanho)] = {}
+        for nome in medidas:
+            resultados[str(tamanho)][nome] = {'resumo': resumir(amostras[nome]),
+                                              'rodadas': medianas[nome]}
+            if ao_medir:
+                ao_medir(tamanho, nome, resultados[str(tamanho)][nome]['resumo'])
+
+        # Remove os veículos criados por 'veiculos.salvar' (o próximo
+        # tamanho começa do catálogo gerado)
+        with db.transaction():
+            db.execute("DELETE FROM veiculos WHERE id > ?", (ultimo_gerado,))
+    return resultados
+
+
+def ambiente() -> dict:
+    """Informações da máquina, gravadas com a referência."""
+    return {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(), 'processador': platform.machine(),
+            'cpus': os.cpu_count()}
+
+
+def main():
+    """Função principal do benchmark."""
+    parser = argparse.ArgumentParser(description="Mede as operações dos repositórios.")
+    parser.add_argument('--referencia', default=REFERENCIA_PADRAO,
+                        help="arquivo JSON de referência (padrão: benchmark_referencia.json)")
+    parser.add_argument('--atualizar', action='store_true',
+                        help="grava os resultados atuais como referência")
+    parser.add_argument('--tamanhos', default=",".join(map(str, TAMANHOS_PADRAO)),
+                        help="quantidades de veículos separadas por vírgula "
+                             "(padrão: 1000,10000,100000)")
+    parser.add_argument('--rodadas', type=int, default=10,
+                        help="rodadas de medição por tamanho (padrão: 10)")
+    parser.add_argument('--repeticoes', type=int, default=20,
+                        help="chamadas de cada operação por rodada (padrão: 20)")
+    parser.add_argument('--operacoes', help="operações separadas por vírgula (padrão: todas)")
+    parser.add_argument('--semente', type=int, default=42, help="semente (padrão: 42)")
+    parser.add_argument('--alfa', type=float, default=0.05,
+                        help="nível de significância global (padrão: 0.05)")
+    parser.add_argument('--limiar', type=float, default=0.10,
+                        help="piora mínima da mediana, em fração (padrão: 0.10)")
+    args = parser.parse_args()
+    tamanhos = [int(t) for t in args.tamanhos.split(",")]
+    escolhidas = args.operacoes.split(",") if args.operacoes else None
+
+    print("\n" + "="*60)
+    print("⏱️  BENCHMARK DOS REPOSITÓRIOS")
+    print("="*60)
+
+    pasta = tempfile.mkdtemp(prefix='benchmark_')
+    caminho = os.path.join(pasta, 'benchmark.db')
+    db = Database(caminho, cache_size=0, profile='interativo')
+    if os.path.abspath(db._db_path) != caminho:
+        print("✗ O benchmark precisa da primeira instância de Database.")
+        return 1
+    db.instrumentation.ativa = False
+
+    def progresso(tamanho, operacao, resumo):
+        print(f"  {tamanho:>8} {operacao:<28} mediana {resumo['mediana_ms']:8.3f} ms   "
+              f"p90 {resumo['p90_ms']:8.3f} ms")
+
+    try:
+        db.create_tables()
+        resultados = executar_benchmark(db, tamanhos, args.rodadas, args.repeticoes,
+                                        args.semente, escolhidas, progresso)
+    finally:
+        db.close()
+        for nome in os.listdir(pasta):
+            os.remove(os.path.join(pasta, nome))
+        os.rmdir(pasta)
+
+    if args.atualizar or not os.path.exists(args.referencia):
+        with open(args.referencia, 'w', encoding='utf-8') as arquivo:
+            json.dump({'ambiente': ambiente(), 'rodadas': args.rodadas,
+                       'repeticoes': args.repeticoes,
+                       'semente': args.semente, 'resultados': resultados},
+                      arquivo, ensure_ascii=False, indent=1)
+            arquivo.write('\n')
+        print(f"\n💾 Referência gravada em {args.referencia}")
+        print("="*60 + "\n")
+        return 0
+
+    with open(args.referencia, encoding='utf-8') as arquivo:
+        dados = json.load(arquivo)
+    if dados.get('ambiente') != ambiente():
+        print("\n⚠️  Referência gravada em outro ambiente: tempos podem não ser comparáveis")
+        print(f"    referência: {dados.get('ambiente')}")
+        print(f"    atual:      {ambiente()}")
+
+    resultado = comparar(dados['resultados'], resultados, args.alfa, args.limiar)
+    print("\nVariação em relação à referência, descontada a calibração:")
+    print(f"{'tamanho':>8} {'operação':<28} {'ref ms':>9} {'atual ms':>9} {'variação':>9} "
+          f"{'p':>9}")
+    simbolos = {'regressao': '✗', 'melhora': '✓', 'estavel': ' '}
+    for c in resultado['comparacoes']:
+        print(f"{c['tamanho']:>8} {c['operacao']:<28} {c['referencia_ms']:9.3f} "
+              f"{c['mediana_ms']:9.3f} {c['variacao']:+9.1%} {c['p']:9.2g} "
+              f"{simbolos[c['situacao']]}")
+    for tamanho, operacao in resultado['ausentes']:
+        print(f"ℹ️  Sem referência para {operacao} com {tamanho} veículos")
+
+    if resultado['regressoes']:
+        print(f"\n✗ {len(resultado['regressoes'])} regressão(ões) de desempenho")
+        print("="*60 + "\n")
+        return 1
+    print("\n✅ Nenhuma regressão de desempenho")
+    print("="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
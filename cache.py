@@ -0,0 +1,157 @@
+"""
+Cache LRU com expiração para consultas frequentes dos repositórios.
+
+O cache guarda as linhas lidas do banco (``sqlite3.Row`` são imutáveis), não
+os objetos de domínio: cada chamada continua montando os objetos pelo
+repositório, o que mantém o mapa de identidade da sessão como fonte única
+das instâncias.
+
+Cada entrada recebe etiquetas ``(tabela, id)`` das linhas de que depende, ou
+``(tabela, None)`` quando depende da tabela inteira (listagens). Uma escrita
+em ``(tabela, id)`` remove as entradas daquela linha e as listagens da tabela.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional, Union
+
+Etiqueta = tuple
+Etiquetas = Union[Iterable[Etiqueta], Callable[[Any], Iterable[Etiqueta]]]
+
+
+class CacheLRU:
+    """
+    Cache de leitura (read-through) limitado por quantidade e por tempo.
+
+    Attributes:
+        max_entradas: Número máximo de entradas; as menos usadas saem primeiro.
+            Com 0 o cache fica desligado.
+        ttl: Tempo de vida de cada entrada, em segundos.
+    """
+
+    def __init__(self, max_entradas: int = 1024, ttl: float = 30.0):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas = OrderedDict()   # chave -> (expira_em, valor, etiquetas)
+        self._por_etiqueta = {}          # etiqueta -> {chaves}
+        self._lock = threading.Lock()
+        # Incrementada a cada invalidação: uma carga iniciada antes dela pode
+        # ter lido dados antigos e não deve ser guardada
+        self._geracao = 0
+        self._acertos = 0
+        self._falhas = 0
+        self._remocoes = 0
+        self._expiracoes = 0
+        self._invalidacoes = 0
+
+    def obter_ou_carregar(self, chave: Hashable, carregar: Callable[[], Any],
+                          etiquetas: Etiquetas = ()) -> Any:
+        """
+        Retorna o valor em cache ou executa ``carregar`` e guarda o resultado.
+
+        Resultados ``None`` (registro inexistente) não são guardados.
+
+        Args:
+            chave: Identifica a consulta (ex.: ``('usuarios.email', email)``).
+            carregar: Executa a consulta no banco.
+            etiquetas: Etiquetas da entrada, ou função que as calcula a
+                partir do valor carregado.
+        """
+        if self.max_entradas <= 0:
+            return carregar()
+
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                if entrada[0] > agora:
+                    self._entradas.move_to_end(chave)
+                    self._acertos += 1
+                    return entrada[1]
+                self._descartar(chave)
+                self._expiracoes += 1
+            self._falhas += 1
+            geracao = self._geracao
+
+        valor = carregar()
+        if valor is None:
+            return valor
+
+        if callable(etiquetas):
+            etiquetas = etiquetas(valor)
+        etiquetas = frozenset(etiquetas)
+
+        with self._lock:
+            if geracao != self._geracao:
+                return valor
+            self._descartar(chave)
+            self._entradas[chave] = (time.monotonic() + self.ttl, valor, etiquetas)
+            for etiqueta in etiquetas:
+                self._por_etiqueta.setdefault(etiqueta, set()).add(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._descartar(next(iter(self._entradas)))
+                self._remocoes += 1
+        return valor
+
+    def invalidar(self, tabela: str, entidade_id: Optional[int] = None):
+        """
+        Remove as entradas afetadas por uma escrita.
+
+        Com ``entidade_id``, saem as entradas daquela linha e as listagens da
+        tabela; sem ele, todas as entradas que dependem da tabela.
+        """
+        with self._lock:
+            self._geracao += 1
+            if entidade_id is not None:
+                alvos = [(tabela, entidade_id), (tabela, None)]
+            else:
+                alvos = [e for e in self._por_etiqueta if e[0] == tabela]
+            for etiqueta in alvos:
+                for chave in list(self._por_etiqueta.get(etiqueta, ())):
+                    self._descartar(chave)
+                    self._invalidacoes += 1
+
+    def limpar(self):
+        """Esvazia o cache (as estatísticas são mantidas)."""
+        with self._lock:
+            self._geracao += 1
+            self._entradas.clear()
+            self._por_etiqueta.clear()
+
+    def estatisticas(self) -> dict:
+        """
+        Contadores para dimensionar o cache.
+
+        Returns:
+            dict: entradas, max_entradas, ttl, acertos, falhas, taxa_acerto,
+            remocoes (saídas por LRU), expiracoes e invalidacoes.
+        """
+        with self._lock:
+            consultas = self._acertos + self._falhas
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'ttl': self.ttl,
+                'acertos': self._acertos,
+                'falhas': self._falhas,
+                'taxa_acerto': self._acertos / consultas if consultas else 0.0,
+                'remocoes': self._remocoes,
+                'expiracoes': self._expiracoes,
+                'invalidacoes': self._invalidacoes,
+            }
+
+    def _descartar(self, chave: Hashable):
+        """Remove uma entrada e suas etiquetas (chamar com o lock)."""
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        for etiqueta in entrada[2]:
+            chaves = self._por_etiqueta.get(etiqueta)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_etiqueta[etiqueta]
+
+    def __len__(self) -> int:
+        return len(self._entradas)
@@ -1,74 +1,731 @@
 import sqlite3
-from typing import Optional
+import threading
+import time
+import queue
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional
+from urllib.request import pathname2url
 import os
 
+from alteracoes import DetectorAlteracoes
+from cache import CacheLRU
+from identity_map import IdentityMap
+from instrumentacao import Instrumentacao
+from perfis import PerfilConexao, obter_perfil
+
+# Comandos que alteram o esquema sem mudar ``total_changes``
+_COMANDOS_DE_ESQUEMA = ('CREATE', 'DROP', 'ALTER')
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões SQLite que podem ser usadas por qualquer thread.
+
+    As conexões são criadas sob demanda até o limite ``max_size`` e devolvidas
+    ao pool após o uso. Quando todas estão emprestadas, a thread aguarda até
+    ``timeout`` segundos por uma conexão livre.
+    """
+
+    def __init__(self, db_path: str, max_size: int = 5, readonly: bool = False,
+                 timeout: float = 30.0, profile: Optional[PerfilConexao] = None):
+        """
+        Inicializa o pool.
+
+        Args:
+            db_path (str): Caminho do arquivo do banco de dados.
+            max_size (int): Número máximo de conexões abertas.
+            readonly (bool): Abre as conexões em modo somente leitura.
+            timeout (float): Tempo máximo de espera (segundos) por uma conexão
+                livre e pelo lock de escrita do SQLite.
+            profile (Optional[PerfilConexao]): PRAGMAs aplicados a cada
+                conexão aberta (ver ``perfis.py``).
+        """
+        if max_size < 1:
+            raise ValueError("O tamanho do pool deve ser pelo menos 1.")
+        self._db_path = db_path
+        self._max_size = max_size
+        self._readonly = readonly
+        self._timeout = timeout
+        self._profile = profile
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._returned = threading.Condition(self._lock)
+        self._connections: list[sqlite3.Connection] = []
+        self._borrowed = 0
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def readonly(self) -> bool:
+        return self._readonly
+
+    def _open(self) -> sqlite3.Connection:
+        """Abre uma nova conexão configurada para uso entre threads."""
+        if self._readonly:
+            uri = f"file:{pathname2url(os.path.abspath(self._db_path))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=self._timeout,
+                                   check_same_thread=False)
+        else:
+            # Autocommit: as transações são controladas por Database.transaction
+            conn = sqlite3.connect(self._db_path, timeout=self._timeout,
+                                   check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
+        if self._profile is not None:
+            self._profile.aplicar(conn, somente_leitura=self._readonly)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Empresta uma conexão do pool.
+
+        Returns:
+            sqlite3.Connection: Conexão livre (nova ou reaproveitada).
+
+        Raises:
+            TimeoutError: Se nenhuma conexão ficar livre dentro do timeout.
+        """
+        # Conta como emprestada desde já: close_all espera também quem aguarda
+        with self._lock:
+            self._borrowed += 1
+        try:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                if len(self._connections) < self._max_size:
+                    conn = self._open()
+                    self._connections.append(conn)
+                    return conn
+
+            try:
+                return self._idle.get(timeout=self._timeout)
+            except queue.Empty:
+                raise TimeoutError(
+                    f"Nenhuma conexão livre no pool após {self._timeout} segundos."
+                ) from None
+        except BaseException:
+            self._returned_one()
+            raise
+
+    def release(self, conn: sqlite3.Connection):
+        """
+        Devolve uma conexão ao pool.
+
+        Transações deixadas abertas são desfeitas para que a próxima thread
+        receba a conexão em estado limpo.
+        """
+        with self._lock:
+            if conn not in self._connections:
+                return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        finally:
+            self._returned_one()
+
+    def _returned_one(self):
+        """Desconta uma conexão emprestada e acorda quem espera em close_all."""
+        with self._returned:
+            self._borrowed -= 1
+            self._returned.notify_all()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Empresta uma conexão durante o bloco ``with``."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """
+        Fecha todas as conexões abertas pelo pool.
+
+        Conexões emprestadas não são fechadas nas mãos de quem as usa: espera
+        até ``timeout`` segundos que todas sejam devolvidas.
+
+        Raises:
+            TimeoutError: Se alguma conexão continuar emprestada após o timeout.
+        """
+        with self._returned:
+            if not self._returned.wait_for(lambda: self._borrowed == 0, self._timeout):
+                raise TimeoutError(
+                    f"{self._borrowed} conexão(ões) ainda emprestada(s) após "
+                    f"{self._timeout} segundos."
+                )
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._idle = queue.LifoQueue()
+
+
+class QueryResult:
+    """
+    Resultado de ``Database.execute``, lido por completo enquanto a conexão
+    ainda estava emprestada.
+
+    Oferece a parte de ``sqlite3.Cursor`` usada pelos chamadores
+    (``fetchone``, ``fetchmany``, ``fetchall``, iteração, ``lastrowid``,
+    ``rowcount`` e ``description``) sem prender a conexão, que pode estar
+    com outra thread quando o resultado for lido.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._rows = cursor.fetchall() if cursor.description is not None else []
+        self._position = 0
+        # Só são definitivos depois que todas as linhas foram lidas
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = cursor.rowcount
+        self.description = cursor.description
+        cursor.close()
+
+    def fetchone(self) -> Optional[sqlite3.Row]:
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size: int = 1) -> list[sqlite3.Row]:
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self) -> list[sqlite3.Row]:
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def __iter__(self) -> Iterator[sqlite3.Row]:
+        return iter(self.fetchall())
+
 
 class Database:
     """
     Classe responsável por gerenciar a conexão com o banco de dados SQLite.
     Implementa o padrão Singleton para garantir uma única instância.
+
+    As conexões são emprestadas de dois pools: um de leitura e escrita e outro
+    somente leitura, de modo que threads diferentes (GUI, jobs em lote) possam
+    consultar o banco em paralelo sem compartilhar o mesmo handle.
     """
     _instance: Optional['Database'] = None
-    _connection: Optional[sqlite3.Connection] = None
     
-    def __new__(cls, db_path: str = "catalogo_veiculos.db"):
-        """Implementa o padrão Singleton."""
+    def __new__(cls, db_path: str = "catalogo_veiculos.db", pool_size: int = 5,
+                read_pool_size: Optional[int] = None, cache_size: int = 1024,
+                cache_ttl: float = 30.0, profile: Optional[str] = None):
+        """
+        Implementa o padrão Singleton.
+
+        Args:
+            db_path (str): Caminho do arquivo do banco de dados.
+            pool_size (int): Máximo de conexões de leitura e escrita.
+            read_pool_size (Optional[int]): Máximo de conexões somente leitura
+                (padrão: igual a ``pool_size``).
+            cache_size (int): Máximo de consultas guardadas no cache de
+                leitura (0 desliga o cache).
+            cache_ttl (float): Tempo de vida, em segundos, de cada entrada do
+                cache de leitura.
+            profile (Optional[str]): Perfil de PRAGMAs das conexões
+                ('interativo', 'carga-em-massa' ou 'somente-leitura'; padrão:
+                variável de ambiente CATALOGO_DB_PERFIL ou 'interativo').
+        """
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
             cls._instance._db_path = db_path
+            cls._instance._pool_size = pool_size
+            cls._instance._read_pool_size = read_pool_size or pool_size
+            cls._instance._write_pool = None
+            cls._instance._read_pool = None
+            cls._instance._pool_lock = threading.Lock()
+            cls._instance._local = threading.local()
+            cls._instance._schema_cache = {}
+            cls._instance._write_version = 0
+            cls._instance._write_lock = threading.Lock()
+            cls._instance._identity_maps = weakref.WeakSet()
+            cls._instance._cache = CacheLRU(cache_size, cache_ttl)
+            cls._instance._detector = DetectorAlteracoes(cls._instance)
+            cls._instance._profile = obter_perfil(profile)
+            cls._instance._instrumentation = Instrumentacao()
         return cls._instance
-    
-    def connect(self) -> sqlite3.Connection:
+
+    @property
+    def is_memory(self) -> bool:
+        """Indica se o banco é em memória (uma única conexão compartilhada)."""
+        return self._db_path == ":memory:" or self._db_path.startswith("file::memory:")
+
+    def _get_pool(self, readonly: bool = False) -> ConnectionPool:
+        """Retorna (criando sob demanda) o pool de leitura ou de escrita."""
+        with self._pool_lock:
+            if self._write_pool is None:
+                # Um banco em memória só existe dentro da própria conexão
+                size = 1 if self.is_memory else self._pool_size
+                # Perfil somente leitura: nem o pool principal abre o arquivo
+                # para escrita
+                readonly_file = self._profile.somente_leitura and not self.is_memory
+                self._write_pool = ConnectionPool(self._db_path, max_size=size,
+                                                  readonly=readonly_file,
+                                                  profile=self._profile)
+            if readonly and self._read_pool is None and not self.is_memory:
+                self._read_pool = ConnectionPool(self._db_path,
+                                                 max_size=self._read_pool_size,
+                                                 readonly=True, profile=self._profile)
+            if readonly and self._read_pool is not None:
+                return self._read_pool
+            return self._write_pool
+
+    @property
+    def profile(self) -> PerfilConexao:
+        """Perfil de PRAGMAs aplicado às conexões (ver ``perfis.py``)."""
+        return self._profile
+
+    def set_profile(self, name: str) -> PerfilConexao:
         """
-        Estabelece conexão com o banco de dados SQLite.
-        
+        Troca o perfil das conexões.
+
+        As conexões abertas são fechadas; as próximas já usam o novo perfil.
+
+        Args:
+            name (str): Nome do perfil.
+
+        Raises:
+            RuntimeError: Se chamado dentro de uma transação.
+            ValueError: Se o perfil não existir.
+        """
+        if self.in_transaction:
+            raise RuntimeError("Não é possível trocar o perfil dentro de uma transação.")
+        profile = obter_perfil(name)
+        if profile is not self._profile:
+            self._profile = profile
+            if self.is_memory:
+                # Um banco em memória some ao fechar a conexão: reconfigura a atual
+                with self._pool_lock:
+                    if self._write_pool is not None:
+                        self._write_pool._profile = profile
+                        for conn in self._write_pool._connections:
+                            profile.aplicar(conn)
+            else:
+                self.close()
+        return profile
+
+    @contextmanager
+    def connection(self, readonly: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Empresta uma conexão do pool durante o bloco ``with``.
+
+        Se a thread atual está dentro de uma transação ou de um bloco
+        ``connect``, essa conexão é reutilizada, de modo que as leituras
+        enxergam as escritas ainda não confirmadas da transação.
+
+        Args:
+            readonly (bool): Prefere uma conexão somente leitura.
+
+        Yields:
+            sqlite3.Connection: Conexão emprestada.
+        """
+        pinned = self._pinned_connection()
+        if pinned is not None:
+            yield pinned
+            return
+
+        pool = self._get_pool(readonly)
+        try:
+            conn = pool.acquire()
+        except sqlite3.OperationalError:
+            # O arquivo ainda não existe: não há o que abrir em modo leitura
+            if not pool.readonly:
+                raise
+            pool = self._get_pool()
+            conn = pool.acquire()
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
+
+    def _pinned_connection(self) -> Optional[sqlite3.Connection]:
+        """Retorna a conexão da transação ativa ou a fixada na thread atual."""
+        tx = getattr(self._local, "tx_connection", None)
+        if tx is not None:
+            return tx
+        return getattr(self._local, "connection", None)
+
+    @property
+    def write_version(self) -> int:
+        """
+        Contador incrementado a cada escrita (ou fim de transação) feita por
+        este processo.
+
+        Permite que caches descubram, comparando o valor, se podem ter ficado
+        desatualizados.
+        """
+        return self._write_version
+
+    def _mark_write(self):
+        """Registra que o conteúdo do banco pode ter mudado."""
+        with self._write_lock:
+            self._write_version += 1
+
+    @contextmanager
+    def session(self) -> Iterator[IdentityMap]:
+        """
+        Sessão de trabalho com mapa de identidade próprio.
+
+        Dentro do bloco, os repositórios devolvem sempre o mesmo objeto para a
+        mesma chave primária e respondem ``buscar_por_id`` a partir da memória
+        quando o objeto já foi carregado. Sessões aninhadas reutilizam o mapa
+        da sessão externa; ao sair da mais externa o mapa é descartado.
+
+        Exemplo:
+            with db.session():
+                a = anuncio_repo.buscar_por_id(1)
+                assert a.anunciante is usuario_repo.buscar_por_id(2, 'anunciante')
+
+        Yields:
+            IdentityMap: Mapa de identidade da sessão.
+        """
+        mapa = getattr(self._local, "identity_map", None)
+        if mapa is not None:
+            yield mapa
+            return
+
+        mapa = IdentityMap()
+        self._local.identity_map = mapa
+        self._identity_maps.add(mapa)
+        try:
+            yield mapa
+        finally:
+            self._local.identity_map = None
+            self._identity_maps.discard(mapa)
+            mapa.limpar()
+
+    def identity_map(self) -> Optional[IdentityMap]:
+        """Retorna o mapa de identidade da sessão da thread atual, se houver."""
+        return getattr(self._local, "identity_map", None)
+
+    @property
+    def cache(self) -> CacheLRU:
+        """Cache de leitura compartilhado pelos repositórios."""
+        return self._cache
+
+    def cached(self, key: Hashable, loader: Callable[[], Any],
+               tags: Iterable[tuple] = ()) -> Any:
+        """
+        Executa ``loader`` passando pelo cache de leitura.
+
+        Dentro de uma transação o cache é ignorado, pois a consulta pode
+        enxergar escritas ainda não confirmadas. Antes de consultar o cache,
+        as alterações feitas por outros processos são verificadas
+        (``check_changes``).
+
+        Args:
+            key: Identifica a consulta.
+            loader: Executa a consulta no banco.
+            tags: Etiquetas ``(tabela, id)`` da entrada (ou função que as
+                calcula a partir do resultado); veja ``cache.CacheLRU``.
+        """
+        if self.in_transaction:
+            return loader()
+        self._detector.verificar()
+        return self._cache.obter_ou_carregar(key, loader, tags)
+
+    def check_changes(self, force: bool = False) -> list[str]:
+        """
+        Invalida o cache e os mapas de identidade das tabelas alteradas por
+        outros processos.
+
+        A verificação é barata (``PRAGMA data_version``) e limitada a uma a
+        cada ``changes_detector.intervalo`` segundos, a menos que ``force``
+        seja verdadeiro. Quando algo mudou, ``write_version`` também avança.
+
         Returns:
+            list[str]: Tabelas alteradas desde a última verificação.
+        """
+        return self._detector.verificar(force)
+
+    @property
+    def changes_detector(self) -> DetectorAlteracoes:
+        """Detector de alterações feitas por outros processos."""
+        return self._detector
+
+    def cache_stats(self) -> dict:
+        """Estatísticas de acertos, falhas e remoções do cache de leitura."""
+        return self._cache.estatisticas()
+
+    def invalidate(self, table: str, entity_id: Optional[int] = None,
+                   changes: Optional[dict] = None):
+        """
+        Propaga uma escrita para o cache de leitura e para os mapas de
+        identidade de todas as sessões.
+
+        Com ``changes``, os objetos carregados recebem os novos valores no
+        próprio lugar (continuam sendo a instância canônica). Sem ``changes``,
+        a entrada (ou, sem ``entity_id``, a tabela inteira) é descartada e
+        será relida do banco na próxima consulta.
+
+        Args:
+            table (str): Tabela afetada.
+            entity_id (Optional[int]): Chave primária afetada.
+            changes (Optional[dict]): Atributos do objeto e seus novos valores.
+        """
+        self._cache.invalidar(table, entity_id)
+        pendentes = getattr(self._local, "tx_invalidations", None)
+        if pendentes is not None:
+            # Outras threads podem recolocar a versão antiga no cache antes
+            # do commit; a invalidação é repetida ao confirmar
+            pendentes.append((table, entity_id))
+
+        for mapa in list(self._identity_maps):
+            if changes is not None and entity_id is not None:
+                mapa.atualizar(table, entity_id, changes)
+            else:
+                mapa.remover(table, entity_id)
+
+    @property
+    def in_transaction(self) -> bool:
+        """Indica se a thread atual está dentro de ``transaction()``."""
+        return getattr(self._local, "tx_connection", None) is not None
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Unidade de trabalho: agrupa várias operações em um único commit.
+
+        Todas as chamadas a ``execute``/``fetch_*`` (e, portanto, dos
+        repositórios) feitas na mesma thread dentro do bloco usam a mesma
+        conexão e só são confirmadas ao final. Em caso de exceção, tudo é
+        desfeito. Blocos aninhados viram savepoints, que podem ser desfeitos
+        isoladamente sem abortar a transação externa.
+
+        Exemplo:
+            with db.transaction():
+                usuario_repo.salvar(...)
+                veiculo_repo.salvar(...)
+
+        Yields:
+            sqlite3.Connection: Conexão usada pela transação.
+        """
+        local = self._local
+        conn = getattr(local, "tx_connection", None)
+
+        if conn is not None:
+            # Transação aninhada: savepoint
+            name = f"sp_{local.tx_depth}"
+            conn.execute(f"SAVEPOINT {name}")
+            local.tx_depth += 1
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f"ROLLBACK TO {name}")
+                conn.execute(f"RELEASE {name}")
+                self._mark_write()
+                self._invalidate_all()
+                raise
+            else:
+                conn.execute(f"RELEASE {name}")
+            finally:
+                local.tx_depth -= 1
+            return
+
+        pool = None
+        conn = getattr(local, "connection", None)
+        if conn is None:
+            pool = self._get_pool()
+            conn = pool.acquire()
+
+        # A unidade de trabalho também é uma sessão do mapa de identidade
+        with self.session():
+            try:
+                # IMMEDIATE reserva o lock de escrita já no início, evitando
+                # deadlocks entre transações que leem antes de escrever
+                conn.execute("BEGIN IMMEDIATE")
+                local.tx_connection = conn
+                local.tx_depth = 1
+                local.tx_invalidations = []
+                antes = self._detector.ler_versoes(conn)
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    # Objetos carregados podem refletir escritas desfeitas
+                    self._invalidate_all()
+                    raise
+                try:
+                    depois = self._detector.ler_versoes(conn)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    self._invalidate_all()
+                    raise
+                self._detector.registrar_escrita(antes, depois)
+                for table, entity_id in local.tx_invalidations:
+                    self._cache.invalidar(table, entity_id)
+            finally:
+                local.tx_connection = None
+                local.tx_depth = 0
+                local.tx_invalidations = None
+                if pool is not None:
+                    pool.release(conn)
+                self._mark_write()
+
+    @contextmanager
+    def _standalone_write(self, conn: sqlite3.Connection) -> Iterator[None]:
+        """
+        Envolve um comando avulso (fora de ``transaction``) em BEGIN
+        IMMEDIATE/COMMIT quando o detector de alterações está em uso.
+
+        Assim os contadores de ``alteracoes`` lidos antes e depois do comando
+        refletem só esta escrita, e ela não é tratada como alteração de outro
+        processo.
+        """
+        if conn.in_transaction or not self._detector.em_uso:
+            yield
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            antes = self._detector.ler_versoes(conn)
+            yield
+            depois = self._detector.ler_versoes(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        self._detector.registrar_escrita(antes, depois)
+
+    def _invalidate_all(self):
+        """Esvazia o cache de leitura e os mapas de identidade de todas as sessões."""
+        self._cache.limpar()
+        for mapa in list(self._identity_maps):
+            mapa.limpar()
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Estabelece conexão com o banco de dados SQLite.
+
+        Durante o bloco ``with``, a conexão de leitura e escrita fica fixada
+        na thread atual: todos os comandos da thread (inclusive leituras)
+        usam a mesma conexão. Ao sair, ela volta ao pool. Blocos aninhados
+        reutilizam a conexão do bloco externo.
+
+        Exemplo:
+            with db.connect() as conn:
+                conn.execute("PRAGMA temp_store = MEMORY")
+                db.fetch_all(...)
+
+        Yields:
             sqlite3.Connection: Objeto de conexão com o banco de dados.
         """
-        if self._connection is None:
-            self._connection = sqlite3.connect(self._db_path)
-            self._connection.row_factory = sqlite3.Row  # Permite acessar colunas por nome
-        return self._connection
+        conn = getattr(self._local, "connection", None)
+        if conn is not None:
+            yield conn
+            return
+
+        pool = self._get_pool()
+        conn = pool.acquire()
+        self._local.connection = conn
+        try:
+            yield conn
+        finally:
+            self._local.connection = None
+            pool.release(conn)
     
     def close(self):
-        """Fecha a conexão com o banco de dados."""
-        if self._connection:
-            self._connection.close()
-            self._connection = None
+        """
+        Fecha todas as conexões com o banco de dados.
+
+        Espera que as conexões emprestadas a outras threads sejam devolvidas
+        (veja ``ConnectionPool.close_all``).
+
+        Raises:
+            RuntimeError: Se a própria thread ainda usa uma conexão (dentro de
+                ``transaction`` ou ``connect``).
+        """
+        if self._pinned_connection() is not None:
+            raise RuntimeError("Não é possível fechar o banco dentro de transaction() ou connect().")
+        with self._pool_lock:
+            for pool in (self._write_pool, self._read_pool):
+                if pool is not None:
+                    pool.close_all()
+            self._write_pool = None
+            self._read_pool = None
+        self._detector.fechar()
+        self._instrumentation.fechar()
+    
+    @property
+    def instrumentation(self) -> Instrumentacao:
+        """Tempos por comando SQL e log de consultas lentas (ver ``instrumentacao.py``)."""
+        return self._instrumentation
+
+    def query_stats(self, limit: Optional[int] = None) -> list[dict]:
+        """
+        Comandos SQL que mais consumiram tempo.
+
+        Returns:
+            list[dict]: sql (normalizado), chamadas, total_ms, media_ms,
+            p50_ms, p99_ms, max_ms e linhas.
+        """
+        return self._instrumentation.estatisticas(limite=limit)
     
-    def execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
+    def execute(self, query: str, params: tuple = ()) -> 'QueryResult':
         """
         Executa uma query SQL.
+
+        Fora de uma transação o comando é confirmado imediatamente; dentro de
+        ``transaction()`` ele participa da transação ativa. As linhas
+        devolvidas (``RETURNING``) são lidas antes de a conexão voltar ao
+        pool. ``write_version`` só avança se o comando alterou alguma linha
+        (``total_changes``) ou o esquema; leituras não invalidam os
+        instantâneos de quem o acompanha.
         
         Args:
             query (str): Query SQL a ser executada.
             params (tuple): Parâmetros da query.
             
         Returns:
-            sqlite3.Cursor: Cursor com o resultado da query.
+            QueryResult: Linhas, ``lastrowid`` e ``rowcount`` do comando.
         """
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        conn.commit()
-        return cursor
+        with self.connection() as conn, self._standalone_write(conn):
+            cursor = conn.cursor()
+            alteracoes = conn.total_changes
+            inicio = time.perf_counter()
+            cursor.execute(query, params)
+            resultado = QueryResult(cursor)
+            self._instrumentation.registrar(query, time.perf_counter() - inicio,
+                                            max(resultado.rowcount, 0), params)
+            alterou = (conn.total_changes != alteracoes
+                       or query.lstrip().upper().startswith(_COMANDOS_DE_ESQUEMA))
+        if alterou:
+            self._mark_write()
+        return resultado
     
-    def executemany(self, query: str, params_list: list) -> sqlite3.Cursor:
+    def executemany(self, query: str, params_list: list) -> 'QueryResult':
         """
-        Executa múltiplas queries SQL.
+        Executa múltiplas queries SQL em uma única transação.
         
         Args:
             query (str): Query SQL a ser executada.
             params_list (list): Lista de tuplas com parâmetros.
             
         Returns:
-            sqlite3.Cursor: Cursor com o resultado da query.
+            QueryResult: ``lastrowid`` e ``rowcount`` do comando.
         """
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.executemany(query, params_list)
-        conn.commit()
-        return cursor
+        # Só um exemplo dos parâmetros vai para a instrumentação
+        exemplo = params_list[0] if isinstance(params_list, (list, tuple)) and params_list else ()
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            inicio = time.perf_counter()
+            cursor.executemany(query, params_list)
+            resultado = QueryResult(cursor)
+            self._instrumentation.registrar(query, time.perf_counter() - inicio,
+                                            max(resultado.rowcount, 0), exemplo)
+        self._mark_write()
+        return resultado
     
     def fetch_one(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
         """
@@ -81,8 +738,12 @@ class Database:
         Returns:
             Optional[sqlite3.Row]: Linha do resultado ou None.
         """
-        cursor = self.execute(query, params)
-        return cursor.fetchone()
+        with self.connection(readonly=True) as conn:
+            inicio = time.perf_counter()
+            row = conn.execute(query, params).fetchone()
+            self._instrumentation.registrar(query, time.perf_counter() - inicio,
+                                            int(row is not None), params)
+            return row
     
     def fetch_all(self, query: str, params: tuple = ()) -> list[sqlite3.Row]:
         """
@@ -95,97 +756,115 @@ class Database:
         Returns:
             list[sqlite3.Row]: Lista com todas as linhas do resultado.
         """
-        cursor = self.execute(query, params)
-        return cursor.fetchall()
+        with self.connection(readonly=True) as conn:
+            inicio = time.perf_counter()
+            rows = conn.execute(query, params).fetchall()
+            self._instrumentation.registrar(query, time.perf_counter() - inicio,
+                                            len(rows), params)
+            return rows
     
-    def create_tables(self):
-        """Cria todas as tabelas necessárias para o sistema."""
-        
-        # Tabela de Usuários
-        self.execute("""
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cpf TEXT NOT NULL UNIQUE,
-                nome TEXT NOT NULL,
-                email TEXT NOT NULL UNIQUE,
-                senha TEXT NOT NULL,
-                tipo TEXT NOT NULL CHECK(tipo IN ('admin', 'anunciante', 'cliente')),
-                logado INTEGER DEFAULT 0
-            )
-        """)
-        
-        # Tabela de Admins (campos específicos)
-        self.execute("""
-            CREATE TABLE IF NOT EXISTS admins (
-                usuario_id INTEGER PRIMARY KEY,
-                admin_id INTEGER NOT NULL UNIQUE,
-                FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Tabela de Anunciantes (campos específicos)
-        self.execute("""
-            CREATE TABLE IF NOT EXISTS anunciantes (
-                usuario_id INTEGER PRIMARY KEY,
-                telefone TEXT NOT NULL,
-                FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Tabela de Clientes (campos específicos)
-        self.execute("""
-            CREATE TABLE IF NOT EXISTS clientes (
-                usuario_id INTEGER PRIMARY KEY,
-                FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
-            )
-        """)
+    def iter_query(self, query: str, params: tuple = (),
+                   chunk_size: int = 500) -> Iterator[sqlite3.Row]:
+        """
+        Executa uma query e devolve as linhas sob demanda.
         
-        # Tabela de Histórico de Pesquisas
-        self.execute("""
-            CREATE TABLE IF NOT EXISTS historico_pesquisas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cliente_id INTEGER NOT NULL,
-                filtro TEXT NOT NULL,
-                data_pesquisa TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (cliente_id) REFERENCES clientes(usuario_id) ON DELETE CASCADE
-            )
-        """)
+        As linhas são lidas em blocos de ``chunk_size`` com ``fetchmany``, de
+        modo que a memória usada não depende do tamanho do resultado. A
+        conexão fica emprestada até o gerador ser esgotado ou fechado.
         
-        # Tabela de Veículos
-        self.execute("""
-            CREATE TABLE IF NOT EXISTS veiculos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                marca TEXT NOT NULL,
-                modelo TEXT NOT NULL,
-                ano INTEGER NOT NULL,
-                preco REAL NOT NULL,
-                quilometragem INTEGER NOT NULL,
-                anunciante_id INTEGER,
-                FOREIGN KEY (anunciante_id) REFERENCES anunciantes(usuario_id) ON DELETE SET NULL
-            )
-        """)
+        Args:
+            query (str): Query SQL.
+            params (tuple): Parâmetros da query.
+            chunk_size (int): Quantidade de linhas lidas por vez.
+            
+        Yields:
+            sqlite3.Row: Cada linha do resultado.
+        """
+        with self.connection(readonly=True) as conn:
+            # Só o tempo dentro do SQLite é medido, não o de quem consome
+            inicio = time.perf_counter()
+            cursor = conn.execute(query, params)
+            segundos = time.perf_counter() - inicio
+            linhas = 0
+            try:
+                while True:
+                    inicio = time.perf_counter()
+                    rows = cursor.fetchmany(chunk_size)
+                    segundos += time.perf_counter() - inicio
+                    if not rows:
+                        break
+                    linhas += len(rows)
+                    yield from rows
+            finally:
+                cursor.close()
+                self._instrumentation.registrar(query, segundos, linhas, params)
+    
+    def explain(self, query: str, params: tuple = ()) -> list[str]:
+        """
+        Retorna o plano de execução (EXPLAIN QUERY PLAN) de uma query.
         
-        # Tabela de Anúncios
-        self.execute("""
-            CREATE TABLE IF NOT EXISTS anuncios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data_publicacao TEXT NOT NULL,
-                status TEXT NOT NULL CHECK(status IN ('Pendente', 'Aprovado', 'Rejeitado')),
-                veiculo_id INTEGER NOT NULL UNIQUE,
-                anunciante_id INTEGER NOT NULL,
-                FOREIGN KEY (veiculo_id) REFERENCES veiculos(id) ON DELETE CASCADE,
-                FOREIGN KEY (anunciante_id) REFERENCES anunciantes(usuario_id) ON DELETE CASCADE
-            )
-        """)
+        Args:
+            query (str): Query SQL.
+            params (tuple): Parâmetros da query.
+            
+        Returns:
+            list[str]: Uma linha por passo do plano.
+        """
+        rows = self.fetch_all("EXPLAIN QUERY PLAN " + query, params)
+        return [row['detail'] for row in rows]
+    
+    def has_table(self, name: str) -> bool:
+        """
+        Verifica se uma tabela (ou tabela virtual) existe no banco.
+
+        O resultado é guardado em cache até a próxima alteração de esquema
+        feita por ``create_tables``/``reset_database``.
+        """
+        if name not in self._schema_cache:
+            row = self.fetch_one("""
+                SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?
+            """, (name,))
+            self._schema_cache[name] = row is not None
+        return self._schema_cache[name]
+    
+    def create_tables(self):
+        """
+        Cria ou atualiza as tabelas necessárias para o sistema.
+
+        Aplica, em ordem, as migrações pendentes (ver ``migrations.py``), de
+        modo que bancos criados por versões anteriores são atualizados no
+        próprio arquivo. Com o perfil somente leitura nada é gravado: apenas
+        se confere que o esquema já está na versão atual.
+
+        Raises:
+            RuntimeError: Perfil somente leitura e esquema desatualizado.
+        """
+        from migrations import MIGRACOES, aplicar_migracoes, versao_atual
+        if self._profile.somente_leitura:
+            versao, ultima = versao_atual(self), MIGRACOES[-1][0]
+            if versao < ultima:
+                raise RuntimeError(
+                    f"Esquema na versão {versao} (atual: {ultima}); abra o banco com "
+                    f"um perfil de escrita para aplicar as migrações.")
+            self._schema_cache.clear()
+            print(f"✓ Esquema na versão {versao} (somente leitura)")
+            return
+        aplicar_migracoes(self)
+        self._schema_cache.clear()
         
         print("✓ Tabelas criadas com sucesso!")
     
     def reset_database(self):
         """Remove todas as tabelas do banco de dados."""
         tables = ['anuncios', 'historico_pesquisas', 'veiculos', 
-                  'clientes', 'anunciantes', 'admins', 'usuarios']
+                  'clientes', 'anunciantes', 'admins', 'usuarios', 'alteracoes',
+                  'importacoes', 'moderacao_leases', 'contagens', 'estatisticas_marca']
         
-        for table in tables:
-            self.execute(f"DROP TABLE IF EXISTS {table}")
+        with self.transaction():
+            for table in tables:
+                self.execute(f"DROP TABLE IF EXISTS {table}")
+            self.execute("PRAGMA user_version = 0")
+        self._schema_cache.clear()
+        self._invalidate_all()
         
         print("✓ Banco de dados resetado!")
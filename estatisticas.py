@@ -0,0 +1,145 @@
+"""
+Estatísticas do catálogo para painéis e relatórios.
+
+As leituras usam as tabelas de resumo da migração 9 (``contagens`` e
+``estatisticas_marca``), atualizadas por gatilhos a cada escrita: o custo de
+uma leitura não depende de quantos usuários, veículos ou anúncios existem.
+
+``calcular`` refaz os mesmos números direto das tabelas, com uma consulta
+agrupada por tabela, e serve para conferir os resumos.
+
+Exemplo:
+    estatisticas = Estatisticas()
+    estatisticas.anuncios_por_status()   # {'Aprovado': 120, 'Pendente': 8, ...}
+    estatisticas.por_marca(limite=5)     # marcas com mais veículos
+"""
+
+import math
+from typing import Dict, List, Optional
+
+from database import Database
+
+TIPOS_USUARIO = ('admin', 'anunciante', 'cliente')
+STATUS_ANUNCIO = ('Aprovado', 'Pendente', 'Rejeitado')
+
+# Prefixo em estatisticas_marca -> nome no resultado
+_CAMPOS_MARCA = (('preco', 'preco'), ('km', 'quilometragem'), ('ano', 'ano'))
+
+
+class Estatisticas:
+    """Consultas de estatísticas sobre usuários, veículos e anúncios."""
+
+    def __init__(self):
+        self.db = Database()
+
+    def usuarios_por_tipo(self) -> Dict[str, int]:
+        """Quantidade de usuários de cada tipo."""
+        return self.contagens()['usuarios']
+
+    def anuncios_por_status(self) -> Dict[str, int]:
+        """Quantidade de anúncios em cada status."""
+        return self.contagens()['anuncios']
+
+    def total_veiculos(self) -> int:
+        """Quantidade de veículos cadastrados."""
+        return self.contagens()['veiculos']
+
+    def contagens(self) -> dict:
+        """
+        Usuários por tipo, anúncios por status e total de veículos.
+
+        Returns:
+            dict: ``usuarios`` e ``anuncios`` (dicts com zero para valores
+            sem registros) e ``veiculos`` (int).
+        """
+        return self._montar(self.db.fetch_all("SELECT tabela, valor, total FROM contagens"))
+
+    def por_marca(self, limite: Optional[int] = None) -> List[dict]:
+        """
+        Distribuição de preço, quilometragem e ano por marca.
+
+        Args:
+            limite: Número máximo de marcas (as com mais veículos primeiro).
+
+        Returns:
+            List[dict]: Para cada marca, ``marca``, ``veiculos`` e, em
+            ``preco``, ``quilometragem`` e ``ano``, um dict com ``min``,
+            ``max``, ``media`` e ``desvio`` (desvio padrão populacional).
+        """
+        sql = "SELECT * FROM estatisticas_marca ORDER BY veiculos DESC, marca"
+        params = ()
+        if limite is not None:
+            sql += " LIMIT ?"
+            params = (limite,)
+        return [self._distribuicao(row) for row in self.db.fetch_all(sql, params)]
+
+    def resumo(self, limite_marcas: Optional[int] = 10) -> dict:
+        """
+        Todas as estatísticas em um único dict (para painéis).
+
+        Returns:
+            dict: usuarios (por tipo), anuncios (por status), veiculos
+            (total) e marcas (veja ``por_marca``).
+        """
+        resumo = self.contagens()
+        resumo['marcas'] = self.por_marca(limite_marcas)
+        return resumo
+
+    def calcular(self) -> dict:
+        """
+        Calcula as contagens direto das tabelas, sem os resumos.
+
+        Uma única consulta, com uma passada agrupada por tabela (em vez de um
+        ``COUNT(*)`` por tipo e por status). Mais lenta que ``contagens`` em
+        bancos grandes; serve para conferir os resumos.
+
+        Returns:
+            dict: No formato de ``contagens``.
+        """
+        return self._montar(self.db.fetch_all("""
+            SELECT 'usuarios' AS tabela, tipo AS valor, COUNT(*) AS total
+            FROM usuarios GROUP BY tipo
+            UNION ALL
+            SELECT 'anuncios', status, COUNT(*) FROM anuncios GROUP BY status
+            UNION ALL
+            SELECT 'veiculos', '', COUNT(*) FROM veiculos
+        """))
+
+    def recalcular(self):
+        """Refaz as tabelas de resumo a partir dos dados."""
+        from migrations import recalcular_estatisticas
+        with self.db.transaction():
+            recalcular_estatisticas(self.db)
+
+    @staticmethod
+    def _montar(rows) -> dict:
+        """Agrupa linhas (tabela, valor, total) no formato de ``contagens``."""
+        contagens = {
+            'usuarios': dict.fromkeys(TIPOS_USUARIO, 0),
+            'anuncios': dict.fromkeys(STATUS_ANUNCIO, 0),
+            'veiculos': 0,
+        }
+        for row in rows:
+            if row['tabela'] == 'veiculos':
+                contagens['veiculos'] = row['total']
+            else:
+                contagens[row['tabela']][row['valor']] = row['total']
+        return contagens
+
+    @staticmethod
+    def _distribuicao(row) -> dict:
+        """Converte uma linha de estatisticas_marca no formato de ``por_marca``."""
+        n = row['veiculos']
+        resultado = {'marca': row['marca'], 'veiculos': n}
+        for prefixo, nome in _CAMPOS_MARCA:
+            media = row[f'{prefixo}_soma'] / n
+            # Soma dos quadrados acumulada em ponto flutuante: pequenos erros
+            # de arredondamento não podem gerar variância negativa
+            variancia = max(row[f'{prefixo}_soma_q'] / n - media * media, 0.0)
+            resultado[nome] = {
+                'min': row[f'{prefixo}_min'],
+                'max': row[f'{prefixo}_max'],
+                'media': media,
+                'desvio': math.sqrt(variancia),
+            }
+        return resultado
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exportação de Catálogo
+======================
+
+Exporta anúncios (com os dados do veículo e do anunciante) para CSV, JSONL
+ou NDJSON compactado com gzip. As linhas vão do cursor do SQLite direto para
+o arquivo, então a memória usada não depende do tamanho do catálogo.
+
+Uso:
+    python exportador.py catalogo.csv                      # anúncios aprovados
+    python exportador.py catalogo.ndjson.gz --status todos
+    python exportador.py catalogo.jsonl --de 2024-01-01 --ate 2024-12-31
+    python exportador.py catalogo.csv --anunciante joao@email.com
+    python exportador.py catalogo.csv --linhas-por-arquivo 100000
+    python exportador.py catalogo.csv --perfil interativo   # padrão: somente-leitura
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional, TextIO
+
+from database import Database
+from perfis import PERFIS, obter_perfil
+from repository import AnuncioRepository, UsuarioRepository
+
+FORMATOS = ('csv', 'jsonl', 'ndjson.gz')
+
+COLUNAS = ['anuncio_id', 'data_publicacao', 'status', 'veiculo_id', 'marca', 'modelo',
+           'ano', 'preco', 'quilometragem', 'anunciante_id', 'anunciante_nome',
+           'anunciante_email', 'anunciante_telefone']
+
+
+def formato_do_arquivo(caminho: str) -> str:
+    """Deduz o formato pela extensão (.csv, .jsonl/.ndjson, .ndjson.gz/.jsonl.gz)."""
+    nome = caminho.lower()
+    if nome.endswith('.gz'):
+        return 'ndjson.gz'
+    if nome.endswith('.jsonl') or nome.endswith('.ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+class _Saida:
+    """
+    Arquivo(s) de saída, opcionalmente divididos a cada N linhas.
+
+    Com divisão, ``catalogo.csv`` vira ``catalogo-0001.csv``,
+    ``catalogo-0002.csv``...; cada parte CSV tem o próprio cabeçalho.
+    """
+
+    def __init__(self, destino: str, formato: str, linhas_por_arquivo: Optional[int]):
+        self.destino = destino
+        self.formato = formato
+        self.linhas_por_arquivo = linhas_por_arquivo
+        self.arquivos: List[str] = []
+        self._arquivo: Optional[TextIO] = None
+        self._csv = None
+        self._linhas_no_arquivo = 0
+
+    def escrever(self, linha: dict):
+        if self._arquivo is None or (self.linhas_por_arquivo
+                                     and self._linhas_no_arquivo >= self.linhas_por_arquivo):
+            self._abrir_proximo()
+        if self._csv is not None:
+            self._csv.writerow(linha)
+        else:
+            self._arquivo.write(json.dumps(linha, ensure_ascii=False))
+            self._arquivo.write('\n')
+        self._linhas_no_arquivo += 1
+
+    def fechar(self):
+        if self._arquivo is None:
+            # Exportação vazia: ainda assim gera o arquivo (CSV só com cabeçalho)
+            self._abrir_proximo()
+        self._arquivo.close()
+        self._arquivo = None
+
+    def _abrir_proximo(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+        caminho = self._nome_da_parte(len(self.arquivos) + 1)
+        if self.formato == 'ndjson.gz':
+            self._arquivo = gzip.open(caminho, 'wt', compresslevel=6, encoding='utf-8')
+        else:
+            self._arquivo = open(caminho, 'w', newline='', encoding='utf-8')
+        self._csv = None
+        if self.formato == 'csv':
+            self._csv = csv.DictWriter(self._arquivo, fieldnames=COLUNAS)
+            self._csv.writeheader()
+        self.arquivos.append(caminho)
+        self._linhas_no_arquivo = 0
+
+    def _nome_da_parte(self, numero: int) -> str:
+        if not self.linhas_por_arquivo:
+            return self.destino
+        pasta, nome = os.path.split(self.destino)
+        base, ponto, extensao = nome.partition('.')
+        return os.path.join(pasta, f"{base}-{numero:04d}{ponto}{extensao}")
+
+
+def exportar(destino: str, formato: Optional[str] = None,
+             status: Optional[str] = 'Aprovado',
+             data_inicio: Optional[str] = None, data_fim: Optional[str] = None,
+             anunciante_id: Optional[int] = None,
+             linhas_por_arquivo: Optional[int] = None,
+             chunk_size: int = 1000) -> dict:
+    """
+    Exporta os anúncios que atendem aos filtros.
+
+    Args:
+        destino: Caminho do arquivo (ou base dos nomes, com divisão).
+        formato: 'csv', 'jsonl' ou 'ndjson.gz' (padrão: pela extensão).
+        status: Status exportado (None para todos).
+        data_inicio: Data de publicação mínima (YYYY-MM-DD).
+        data_fim: Data de publicação máxima, inclusive (YYYY-MM-DD).
+        anunciante_id: Exporta só os anúncios deste anunciante.
+        linhas_por_arquivo: Divide a saída em partes com até N linhas.
+        chunk_size: Linhas lidas do banco por vez.
+
+    Returns:
+        dict: linhas exportadas, arquivos gerados e segundos gastos.
+    """
+    formato = formato or formato_do_arquivo(destino)
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+
+    inicio = time.perf_counter()
+    saida = _Saida(destino, formato, linhas_por_arquivo)
+    linhas = 0
+    try:
+        for row in AnuncioRepository().iter_exportacao(status, data_inicio, data_fim,
+                                                       anunciante_id, chunk_size):
+            saida.escrever({coluna: row[coluna] for coluna in COLUNAS})
+            linhas += 1
+    finally:
+        saida.fechar()
+
+    return {
+        'linhas': linhas,
+        'arquivos': saida.arquivos,
+        'segundos': time.perf_counter() - inicio,
+    }
+
+
+def _data(valor: str) -> str:
+    """Valida uma data YYYY-MM-DD da linha de comando."""
+    try:
+        datetime.strptime(valor, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida: {valor} (use AAAA-MM-DD)") from None
+    return valor
+
+
+def main():
+    """Função principal do exportador."""
+    parser = argparse.ArgumentParser(description="Exporta anúncios para CSV/JSONL/NDJSON.gz.")
+    parser.add_argument('destino', help="arquivo de saída (.csv, .jsonl ou .ndjson.gz)")
+    parser.add_argument('--formato', choices=FORMATOS, help="padrão: pela extensão")
+    parser.add_argument('--status', default='Aprovado',
+                        help="Aprovado (padrão), Pendente, Rejeitado ou 'todos'")
+    parser.add_argument('--de', type=_data, help="data de publicação inicial (AAAA-MM-DD)")
+    parser.add_argument('--ate', type=_data, help="data de publicação final (AAAA-MM-DD)")
+    parser.add_argument('--anunciante', help="id ou email do anunciante")
+    parser.add_argument('--linhas-por-arquivo', type=int,
+                        help="divide a saída em arquivos de até N linhas")
+    parser.add_argument('--perfil', choices=list(PERFIS),
+                        help="perfil das conexões (padrão: CATALOGO_DB_PERFIL ou somente-leitura)")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("📤 EXPORTAÇÃO DE CATÁLOGO")
+    print("="*60)
+
+    db = Database(profile=obter_perfil(args.perfil, padrao='somente-leitura').nome)
+    print(f"⚙️  Perfil do banco: {db.profile.descricao()}")
+    try:
+        db.create_tables()
+    except RuntimeError as e:
+        # Perfil somente leitura com esquema desatualizado
+        print(f"✗ {e}")
+        print("  Use --perfil interativo para migrar o banco antes de exportar.")
+        return 1
+
+    anunciante_id = None
+    if args.anunciante:
+        if args.anunciante.isdigit():
+            anunciante_id = int(args.anunciante)
+        else:
+            resultado = UsuarioRepository().buscar_por_email(args.anunciante)
+            if not resultado or resultado[1] != 'anunciante':
+                print(f"✗ Anunciante não encontrado: {args.anunciante}")
+                return 1
+            anunciante_id = resultado[0].id
+
+    status = None if args.status.lower() == 'todos' else args.status.capitalize()
+
+    relatorio = exportar(args.destino, args.formato, status, args.de, args.ate,
+                         anunciante_id, args.linhas_por_arquivo)
+
+    segundos = relatorio['segundos']
+    taxa = relatorio['linhas'] / segundos if segundos > 0 else 0
+    print(f"✅ {relatorio['linhas']} anúncios exportados em {segundos:.2f}s ({taxa:.0f} linhas/s)")
+    for caminho in relatorio['arquivos']:
+        print(f"  📁 {caminho}")
+    print("="*60 + "\n")
+
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Exportação cancelada pelo usuário.")
+        sys.exit(1)
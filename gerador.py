@@ -0,0 +1,399 @@
+"""
+Geração de catálogos sintéticos para testes de desempenho.
+
+Produz, a partir de uma semente, sempre o mesmo catálogo:
+
+- usuários com a proporção de uma instalação real (poucos admins, cerca de
+  20% de anunciantes e o restante de clientes), cada cliente com seu
+  histórico de pesquisas;
+- veículos distribuídos entre as marcas pela participação de mercado, com o
+  ano concentrado nos últimos anos, quilometragem proporcional à idade e
+  preço de tabela depreciado pela idade; poucos anunciantes (lojas)
+  concentram a maior parte dos veículos;
+- um anúncio para quase todos os veículos, em todos os status: os recentes
+  ainda pendentes, os antigos já moderados.
+
+Os números aleatórios de cada tabela vêm de um gerador próprio, consumido
+linha a linha: o resultado não depende do tamanho do lote, e mudar a
+quantidade de veículos não muda os usuários gerados.
+
+Para gravar centenas de milhares de linhas por segundo, ``carga_rapida``
+remove os gatilhos e índices das tabelas durante a carga e os recria no
+final, refazendo de uma vez o índice FTS e as tabelas de resumo. A carga é
+feita em uma transação por lote; não escreva no banco por outro processo
+enquanto ela acontece.
+
+Exemplo:
+    gerador = GeradorCatalogo(db, usuarios=100_000, veiculos=1_000_000)
+    relatorio = gerador.executar()
+"""
+
+import random
+import time
+import unicodedata
+from bisect import bisect
+from math import exp, log
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import accumulate, islice
+from statistics import NormalDist
+from typing import Iterator, List
+
+from database import Database
+
+# Data "de hoje" do catálogo gerado: fixa, para que o resultado seja reprodutível
+DATA_REFERENCIA = date(2024, 6, 30)
+
+# Marca -> (participação de mercado em %, [(modelo, preço de tabela do 0 km)])
+MARCAS = {
+    'Fiat': (21, [('Mobi', 75000), ('Argo', 90000), ('Cronos', 100000), ('Pulse', 115000),
+                  ('Fastback', 140000), ('Strada', 110000), ('Toro', 160000), ('Uno', 65000)]),
+    'Volkswagen': (16, [('Gol', 80000), ('Polo', 95000), ('Virtus', 115000), ('Nivus', 130000),
+                        ('T-Cross', 145000), ('Saveiro', 100000), ('Amarok', 300000)]),
+    'Chevrolet': (15, [('Onix', 90000), ('Onix Plus', 100000), ('Tracker', 135000),
+                       ('Spin', 115000), ('Cruze', 160000), ('Montana', 130000), ('S10', 260000)]),
+    'Toyota': (9, [('Etios', 70000), ('Yaris', 110000), ('Corolla', 165000),
+                   ('Corolla Cross', 170000), ('Hilux', 280000), ('SW4', 370000)]),
+    'Hyundai': (9, [('HB20', 90000), ('HB20S', 100000), ('Creta', 140000), ('Tucson', 190000)]),
+    'Jeep': (7, [('Renegade', 130000), ('Compass', 190000), ('Commander', 250000)]),
+    'Renault': (6, [('Kwid', 70000), ('Sandero', 85000), ('Logan', 90000), ('Duster', 130000),
+                    ('Oroch', 135000)]),
+    'Honda': (5, [('Fit', 95000), ('City', 120000), ('WR-V', 120000), ('HR-V', 160000),
+                  ('Civic', 180000)]),
+    'Nissan': (4, [('March', 65000), ('Versa', 110000), ('Kicks', 120000), ('Frontier', 260000)]),
+    'Ford': (4, [('Ka', 70000), ('Fiesta', 75000), ('EcoSport', 100000), ('Territory', 210000),
+                 ('Ranger', 260000)]),
+}
+
+NOMES = ['Ana', 'Maria', 'João', 'José', 'Pedro', 'Lucas', 'Gabriel', 'Juliana', 'Fernanda',
+         'Rafael', 'Bruno', 'Camila', 'Carlos', 'Paulo', 'Mariana', 'Beatriz', 'Felipe',
+         'Larissa', 'Rodrigo', 'Patrícia', 'Marcos', 'Aline', 'Thiago', 'Letícia']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves',
+              'Pereira', 'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida',
+              'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa', 'Araújo', 'Conceição']
+DOMINIOS = ['exemplo.com', 'exemplo.com.br', 'exemplo.net']
+DDDS = [11, 11, 11, 11, 21, 21, 31, 41, 47, 51, 61, 62, 71, 81, 85, 19, 27, 48]
+
+# Logaritmo da fração do preço que resta a cada ano de uso
+_DEPRECIACAO = log(0.87)
+# Quantis da normal padrão, sorteados por índice no lugar de random.gauss
+_QUANTIS_NORMAIS = [NormalDist().inv_cdf((i + 0.5) / 4096) for i in range(4096)]
+
+# Tabelas escritas pelo gerador (e cujos gatilhos e índices carga_rapida suspende)
+TABELAS = ('usuarios', 'admins', 'anunciantes', 'clientes', 'historico_pesquisas',
+           'veiculos', 'anuncios')
+
+
+def _sem_acentos(texto: str) -> str:
+    """Remove acentos (para montar e-mails)."""
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return decomposto.encode('ascii', 'ignore').decode('ascii')
+
+
+def _em_lotes(linhas: Iterator, tamanho: int) -> Iterator[list]:
+    """Agrupa um iterador em listas de até ``tamanho`` itens."""
+    while True:
+        lote = list(islice(linhas, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+@contextmanager
+def carga_rapida(db: Database, tabelas=TABELAS):
+    """
+    Remove os gatilhos e índices das tabelas durante o bloco.
+
+    Ao sair (inclusive por erro ou Ctrl+C), recria tudo e refaz os dados que
+    os gatilhos manteriam: índice FTS, tabelas de resumo das estatísticas e
+    versões em ``alteracoes`` (para que os outros processos descartem seus
+    caches). Se o processo for morto no meio da carga, o banco fica sem os
+    gatilhos e índices: gere-o novamente com ``init_db.py --reset``.
+    """
+    marcadores = ", ".join("?" * len(tabelas))
+    objetos = db.fetch_all(f"""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+          AND tbl_name IN ({marcadores})
+        ORDER BY type, name
+    """, tuple(tabelas))
+
+    with db.transaction():
+        for objeto in objetos:
+            db.execute(f"DROP {objeto['type'].upper()} IF EXISTS {objeto['name']}")
+    try:
+        yield
+    finally:
+        from migrations import recalcular_estatisticas
+        with db.transaction():
+            # Índices primeiro: o 'rebuild' do FTS e os resumos já os usam
+            for objeto in objetos:
+                db.execute(objeto['sql'])
+            if db.fetch_one("SELECT 1 FROM sqlite_master WHERE name = 'veiculos_fts'"):
+                db.execute("INSERT INTO veiculos_fts (veiculos_fts) VALUES ('rebuild')")
+            recalcular_estatisticas(db)
+            db.execute(f"UPDATE alteracoes SET versao = versao + 1 WHERE tabela IN ({marcadores})",
+                       tuple(tabelas))
+
+
+class GeradorCatalogo:
+    """
+    Gera e grava um catálogo sintético reprodutível.
+
+    Attributes:
+        usuarios: Quantidade de usuários.
+        veiculos: Quantidade de veículos.
+        semente: Semente dos geradores aleatórios.
+        tamanho_lote: Linhas (usuários ou veículos) por transação.
+    """
+
+    def __init__(self, db: Database, usuarios: int = 10000, veiculos: int = 100000,
+                 semente: int = 42, tamanho_lote: int = 50000,
+                 proporcao_admins: float = 0.001, proporcao_anunciantes: float = 0.2,
+                 proporcao_anunciados: float = 0.92, pesquisas_por_cliente: float = 3.0):
+        """
+        Args:
+            db: Banco onde o catálogo é gravado (as tabelas já devem existir).
+            usuarios: Quantidade de usuários (admins, anunciantes e clientes).
+            veiculos: Quantidade de veículos.
+            semente: Semente; a mesma semente gera o mesmo catálogo.
+            tamanho_lote: Linhas por transação.
+            proporcao_admins: Fração dos usuários que são admins (ao menos um).
+            proporcao_anunciantes: Fração dos usuários que são anunciantes.
+            proporcao_anunciados: Fração dos veículos com anúncio.
+            pesquisas_por_cliente: Média de pesquisas no histórico de cada cliente.
+
+        Raises:
+            ValueError: Se houver veículos mas nenhum anunciante para eles.
+        """
+        self.db = db
+        self.usuarios = usuarios
+        self.veiculos = veiculos
+        self.semente = semente
+        self.tamanho_lote = tamanho_lote
+        self.proporcao_anunciados = proporcao_anunciados
+        self.pesquisas_por_cliente = pesquisas_por_cliente
+
+        self.admins = min(usuarios, max(1, round(usuarios * proporcao_admins)))
+        self.anunciantes = min(usuarios - self.admins,
+                               max(1, round(usuarios * proporcao_anunciantes)))
+        self.clientes = usuarios - self.admins - self.anunciantes
+        if veiculos and not self.anunciantes:
+            raise ValueError("São necessários ao menos 2 usuários para gerar veículos "
+                             "(um admin e um anunciante).")
+
+        self.linhas = dict.fromkeys(TABELAS, 0)
+        self._ids_anunciantes: List[int] = []
+        self._inicio = 0.0
+
+    def executar(self, ao_gravar_lote=None) -> dict:
+        """
+        Gera e grava o catálogo.
+
+        Args:
+            ao_gravar_lote: Função chamada após cada lote com o relatório
+                parcial (para exibir o progresso).
+
+        Returns:
+            dict: Linhas gravadas por tabela, ``linhas`` (total), ``segundos``
+            e ``linhas_por_segundo``.
+        """
+        self._inicio = time.perf_counter()
+        with carga_rapida(self.db):
+            self._gravar_usuarios(ao_gravar_lote)
+            self._gravar_veiculos(ao_gravar_lote)
+        return self._relatorio()
+
+    def _relatorio(self) -> dict:
+        """Linhas gravadas até agora e a vazão."""
+        segundos = time.perf_counter() - self._inicio
+        total = sum(self.linhas.values())
+        return dict(self.linhas, linhas=total, segundos=segundos,
+                    linhas_por_segundo=total / segundos if segundos else 0.0)
+
+    def _proximo_id(self, tabela: str, coluna: str = 'id') -> int:
+        """Primeiro ID livre de uma tabela (os IDs são atribuídos pelo gerador)."""
+        row = self.db.fetch_one(f"SELECT COALESCE(MAX({coluna}), 0) + 1 AS id FROM {tabela}")
+        return row['id']
+
+    def _aleatorio(self, fluxo: str) -> random.Random:
+        """Gerador independente para cada tabela."""
+        return random.Random(f"{self.semente}:{fluxo}")
+
+    # ========== USUÁRIOS ==========
+
+    def _gerar_usuarios(self) -> Iterator[tuple]:
+        """Linhas (id, cpf, nome, email, tipo, admin_id ou telefone, pesquisas)."""
+        aleatorio = self._aleatorio('usuarios')
+        r = aleatorio.random
+
+        tipos = (['admin'] * self.admins + ['anunciante'] * self.anunciantes
+                 + ['cliente'] * self.clientes)
+        aleatorio.shuffle(tipos)
+
+        termos = [termo for marca, (_, modelos) in MARCAS.items()
+                  for termo in [marca.lower()] + [m.lower() for m, _ in modelos]
+                  + [f"{marca.lower()} {m.lower()}" for m, _ in modelos]]
+        emails = {nome: _sem_acentos(nome).lower() for nome in NOMES + SOBRENOMES}
+        limite_pesquisa = datetime.combine(DATA_REFERENCIA, datetime.min.time())
+        media_pesquisas = 1 / self.pesquisas_por_cliente if self.pesquisas_por_cliente else None
+
+        usuario_id = self._proximo_id('usuarios')
+        admin_id = self._proximo_id('admins', 'admin_id')
+        for tipo in tipos:
+            nome = NOMES[int(r() * len(NOMES))]
+            sobrenome = SOBRENOMES[int(r() * len(SOBRENOMES))]
+            email = (f"{emails[nome]}.{emails[sobrenome]}{usuario_id}"
+                     f"@{DOMINIOS[int(r() * len(DOMINIOS))]}")
+            extra, pesquisas = None, ()
+            if tipo == 'admin':
+                extra = admin_id
+                admin_id += 1
+            elif tipo == 'anunciante':
+                extra = (f"({DDDS[int(r() * len(DDDS))]}) 9"
+                         f"{int(r() * 10**4):04d}-{int(r() * 10**4):04d}")
+            elif media_pesquisas:
+                quantidade = min(int(aleatorio.expovariate(media_pesquisas)), 50)
+                pesquisas = [(termos[int(r() * len(termos))],
+                              (limite_pesquisa - timedelta(seconds=int(r() * 180 * 86400)))
+                              .isoformat(sep=' '))
+                             for _ in range(quantidade)]
+            # CPF único por ID, com prefixo que não colide com CPFs reais
+            yield (usuario_id, f"9{usuario_id:010d}", f"{nome} {sobrenome}", email, tipo,
+                   extra, pesquisas)
+            usuario_id += 1
+
+    def _gravar_usuarios(self, ao_gravar_lote):
+        """Grava usuários, tabelas específicas de cada tipo e históricos."""
+        pesquisa_id = self._proximo_id('historico_pesquisas')
+        for lote in _em_lotes(self._gerar_usuarios(), self.tamanho_lote):
+            admins, anunciantes, clientes, historico = [], [], [], []
+            for usuario_id, _, _, _, tipo, extra, pesquisas in lote:
+                if tipo == 'admin':
+                    admins.append((usuario_id, extra))
+                elif tipo == 'anunciante':
+                    anunciantes.append((usuario_id, extra))
+                else:
+                    clientes.append((usuario_id,))
+                    for filtro, data in pesquisas:
+                        historico.append((pesquisa_id, usuario_id, filtro, data))
+                        pesquisa_id += 1
+
+            with self.db.transaction():
+                self.db.executemany("""
+                    INSERT INTO usuarios (id, cpf, nome, email, senha, tipo)
+                    VALUES (?, ?, ?, ?, 'senha123', ?)
+                """, [linha[:5] for linha in lote])
+                self.db.executemany("INSERT INTO admins (usuario_id, admin_id) VALUES (?, ?)",
+                                    admins)
+                self.db.executemany(
+                    "INSERT INTO anunciantes (usuario_id, telefone) VALUES (?, ?)", anunciantes)
+                self.db.executemany("INSERT INTO clientes (usuario_id) VALUES (?)", clientes)
+                self.db.executemany("""
+                    INSERT INTO historico_pesquisas (id, cliente_id, filtro, data_pesquisa)
+                    VALUES (?, ?, ?, ?)
+                """, historico)
+
+            self._ids_anunciantes.extend(usuario_id for usuario_id, _ in anunciantes)
+            self.linhas['usuarios'] += len(lote)
+            self.linhas['admins'] += len(admins)
+            self.linhas['anunciantes'] += len(anunciantes)
+            self.linhas['clientes'] += len(clientes)
+            self.linhas['historico_pesquisas'] += len(historico)
+            if ao_gravar_lote:
+                ao_gravar_lote(self._relatorio())
+
+    # ========== VEÍCULOS E ANÚNCIOS ==========
+
+    def _gerar_veiculos(self) -> Iterator[tuple]:
+        """Linhas (veículo, anúncio ou None)."""
+        aleatorio = self._aleatorio('veiculos')
+        r = aleatorio.random
+
+        # Um único sorteio escolhe marca e modelo: a participação da marca é
+        # dividida igualmente entre seus modelos
+        modelos = [(marca, modelo, preco) for marca, (_, lista) in MARCAS.items()
+                   for modelo, preco in lista]
+        acumulado_modelos = list(accumulate(participacao / len(lista)
+                                            for participacao, lista in MARCAS.values()
+                                            for _ in lista))
+        total_modelos = acumulado_modelos[-1]
+        ultimo_modelo = len(modelos) - 1
+
+        # Poucas lojas com muitos veículos e muitos particulares com um ou
+        # dois (Pareto com alfa 1,16: cerca de 80% dos veículos em 20% dos
+        # anunciantes)
+        anunciantes = self._ids_anunciantes
+        acumulado_anunciantes = list(accumulate(
+            aleatorio.paretovariate(1.16) for _ in anunciantes))
+        total_anunciantes = acumulado_anunciantes[-1] if anunciantes else 0.0
+        ultimo_anunciante = len(anunciantes) - 1
+
+        # Tabelas pré-calculadas: sortear um índice custa bem menos que
+        # gauss() e date.isoformat() a cada linha
+        normais = _QUANTIS_NORMAIS
+        datas = [(DATA_REFERENCIA - timedelta(days=dias)).isoformat() for dias in range(731)]
+        ano_referencia = DATA_REFERENCIA.year
+
+        veiculo_id = self._proximo_id('veiculos')
+        anuncio_id = self._proximo_id('anuncios')
+        for _ in range(self.veiculos):
+            # hi limita o índice caso o arredondamento leve o sorteio ao total
+            marca, modelo, preco_novo = modelos[
+                bisect(acumulado_modelos, r() * total_modelos, 0, ultimo_modelo)]
+            anunciante_id = anunciantes[
+                bisect(acumulado_anunciantes, r() * total_anunciantes, 0, ultimo_anunciante)]
+
+            # Idade exponencial (média de 6 anos), até 30 anos
+            idade = -6.0 * log(1.0 - r())
+            if idade > 30.0:
+                idade = 30.0
+            # Cerca de 12 mil km por ano, com desvio de um terço
+            quilometragem = int(idade * (12000 + 4000 * normais[int(r() * 4096)]) + r() * 100)
+            if quilometragem < 0:
+                quilometragem = 0
+            # Cerca de 13% de depreciação por ano e 12% de variação entre anúncios
+            preco = round(preco_novo * exp(idade * _DEPRECIACAO
+                                           + 0.12 * normais[int(r() * 4096)]), -2)
+            if preco < 5000.0:
+                preco = 5000.0
+            veiculo = (veiculo_id, marca, modelo, ano_referencia - int(idade), preco,
+                       quilometragem, anunciante_id)
+
+            anuncio = None
+            if r() < self.proporcao_anunciados:
+                # Publicação exponencial (média de 90 dias), até dois anos
+                dias = int(-90.0 * log(1.0 - r()))
+                if dias > 730:
+                    dias = 730
+                sorteio = r()
+                if dias <= 7:
+                    # Publicados na última semana: a maioria ainda na fila
+                    status = ('Pendente' if sorteio < 0.7 else
+                              'Aprovado' if sorteio < 0.95 else 'Rejeitado')
+                else:
+                    status = ('Aprovado' if sorteio < 0.85 else
+                              'Rejeitado' if sorteio < 0.95 else 'Pendente')
+                anuncio = (anuncio_id, datas[dias], status, veiculo_id, anunciante_id)
+                anuncio_id += 1
+            yield veiculo, anuncio
+            veiculo_id += 1
+
+    def _gravar_veiculos(self, ao_gravar_lote):
+        """Grava veículos e seus anúncios, um lote por transação."""
+        for lote in _em_lotes(self._gerar_veiculos(), self.tamanho_lote):
+            anuncios = [anuncio for _, anuncio in lote if anuncio]
+            with self.db.transaction():
+                self.db.executemany("""
+                    INSERT INTO veiculos (id, marca, modelo, ano, preco, quilometragem,
+                                          anunciante_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [veiculo for veiculo, _ in lote])
+                self.db.executemany("""
+                    INSERT INTO anuncios (id, data_publicacao, status, veiculo_id, anunciante_id)
+                    VALUES (?, ?, ?, ?, ?)
+                """, anuncios)
+            self.linhas['veiculos'] += len(lote)
+            self.linhas['anuncios'] += len(anuncios)
+            if ao_gravar_lote:
+                ao_gravar_lote(self._relatorio())
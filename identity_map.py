@@ -0,0 +1,74 @@
+"""
+Mapa de identidade da camada de repositórios.
+
+Dentro de uma sessão (``Database.session()``) cada chave primária corresponde
+a um único objeto em memória: buscar o mesmo veículo, anúncio ou usuário duas
+vezes devolve a mesma instância, e comparações como
+``anuncio.anunciante == usuario_logado`` passam a funcionar.
+
+Escritas pelos repositórios atualizam ou removem as entradas na hora. Para as
+demais (SQL direto, como ``FilaModeracao`` e o importador, ou outro
+processo), cada consulta que relê a linha aplica os valores lidos ao objeto
+já carregado.
+"""
+
+import threading
+import weakref
+from typing import Any, Optional
+
+
+class IdentityMap:
+    """
+    Associa (tabela, id) ao objeto de domínio já carregado.
+
+    As entradas são referências fracas: um objeto que ninguém mais usa sai do
+    mapa sozinho, de modo que sessões longas (a GUI, o menu do terminal) não
+    acumulam todo o catálogo em memória.
+    """
+
+    def __init__(self):
+        self._objetos = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def obter(self, tabela: str, entidade_id: int) -> Optional[Any]:
+        """Retorna o objeto já carregado para a chave, ou None."""
+        return self._objetos.get((tabela, entidade_id))
+
+    def registrar(self, tabela: str, entidade_id: int, objeto: Any) -> Any:
+        """
+        Registra o objeto para a chave.
+
+        Se outro objeto já estiver registrado, ele é mantido e devolvido, para
+        que quem chamou passe a usar a instância canônica.
+        """
+        with self._lock:
+            existente = self._objetos.get((tabela, entidade_id))
+            if existente is not None:
+                return existente
+            self._objetos[(tabela, entidade_id)] = objeto
+            return objeto
+
+    def atualizar(self, tabela: str, entidade_id: int, atributos: dict):
+        """Aplica os novos valores ao objeto carregado, se houver."""
+        with self._lock:
+            objeto = self._objetos.get((tabela, entidade_id))
+            if objeto is not None:
+                for nome, valor in atributos.items():
+                    setattr(objeto, nome, valor)
+
+    def remover(self, tabela: str, entidade_id: Optional[int] = None):
+        """Remove uma entrada ou, sem ``entidade_id``, toda a tabela."""
+        with self._lock:
+            if entidade_id is not None:
+                self._objetos.pop((tabela, entidade_id), None)
+                return
+            for chave in [c for c in list(self._objetos.keys()) if c[0] == tabela]:
+                self._objetos.pop(chave, None)
+
+    def limpar(self):
+        """Esvazia o mapa."""
+        with self._lock:
+            self._objetos.clear()
+
+    def __len__(self) -> int:
+        return len(self._objetos)
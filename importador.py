@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importação de Catálogo
+======================
+
+Importa veículos (e, opcionalmente, seus anúncios) de arquivos CSV ou JSONL
+grandes, sem carregá-los inteiros na memória.
+
+Cada linha deve ter as colunas/chaves:
+    marca, modelo, ano, preco, quilometragem
+    anunciante_cpf ou anunciante_email (ou ``anunciante`` com um dos dois)
+    status            (opcional: Pendente, Aprovado ou Rejeitado; cria o anúncio)
+    data_publicacao   (opcional, padrão: hoje)
+
+As linhas são lidas em lotes, validadas e normalizadas em paralelo por um
+pool de processos e gravadas em uma transação por lote. Ao final de cada
+lote o ponto de retomada é gravado na mesma transação: se a importação for
+interrompida, a próxima execução continua da primeira linha não gravada.
+
+Uso:
+    python importador.py veiculos.csv
+    python importador.py anuncios.jsonl --lote 5000 --processos 4
+    python importador.py veiculos.csv --reiniciar   # ignora o ponto de retomada
+    python importador.py veiculos.csv --perfil interativo   # padrão: carga-em-massa
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date, datetime
+from itertools import islice
+from typing import Iterator, List, Optional
+
+from database import Database
+from perfis import PERFIS, obter_perfil
+from models.Advertisement import Anuncio
+from models.Vehicle import Veiculo
+from repository import AnuncioRepository, VeiculoRepository
+
+STATUS_VALIDOS = ('Pendente', 'Aprovado', 'Rejeitado')
+
+
+# ========== LEITURA ==========
+
+def ler_linhas(caminho: str, pular: int = 0) -> Iterator[tuple[int, dict]]:
+    """
+    Lê o arquivo linha a linha.
+
+    Args:
+        caminho: Arquivo .csv ou .jsonl/.ndjson.
+        pular: Quantidade de linhas de dados já importadas (retomada).
+
+    Yields:
+        tuple[int, dict]: Número da linha de dados (a partir de 1) e valores.
+    """
+    with open(caminho, newline='', encoding='utf-8') as arquivo:
+        if caminho.lower().endswith('.csv'):
+            linhas = csv.DictReader(arquivo)
+        else:
+            linhas = (_ler_json(texto) for texto in arquivo if texto.strip())
+
+        for numero, linha in enumerate(linhas, start=1):
+            if numero > pular:
+                yield numero, linha
+
+
+def _ler_json(texto: str) -> dict:
+    """Decodifica uma linha JSONL; linhas inválidas viram erro na validação."""
+    try:
+        valor = json.loads(texto)
+    except ValueError as e:
+        return {'_erro': f"JSON inválido: {e}"}
+    if not isinstance(valor, dict):
+        return {'_erro': "cada linha deve ser um objeto JSON"}
+    return valor
+
+
+def em_lotes(linhas: Iterator, tamanho: int) -> Iterator[list]:
+    """Agrupa um iterador em listas de até ``tamanho`` itens."""
+    while True:
+        lote = list(islice(linhas, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+# ========== VALIDAÇÃO (executada nos processos do pool) ==========
+
+def _texto(linha: dict, campo: str) -> str:
+    valor = str(linha.get(campo) or '').strip()
+    if not valor:
+        raise ValueError(f"{campo} é obrigatório")
+    return valor
+
+
+def _inteiro(valor, campo: str) -> int:
+    """Aceita 50000, "50.000", "50 000 km"..."""
+    if isinstance(valor, bool):
+        raise ValueError(f"{campo} inválido: {valor!r}")
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    texto = str(valor if valor is not None else '').strip().lower()
+    texto = re.sub(r"km$", "", texto)
+    texto = re.sub(r"[\s._,]", "", texto)
+    if not texto.isdigit():
+        raise ValueError(f"{campo} inválido: {valor!r}")
+    return int(texto)
+
+
+def _decimal(valor, campo: str) -> float:
+    """Aceita 85000, 85000.5, "R$ 85.000,00", "85,000.00"..."""
+    if isinstance(valor, bool):
+        raise ValueError(f"{campo} inválido: {valor!r}")
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = re.sub(r"(?i)r\$|\s", "", str(valor if valor is not None else ''))
+    if ',' in texto and '.' in texto:
+        # O último separador é o decimal
+        milhar = '.' if texto.rfind(',') > texto.rfind('.') else ','
+        texto = texto.replace(milhar, '').replace(',', '.')
+    elif ',' in texto:
+        texto = texto.replace(',', '.') if len(texto.rsplit(',', 1)[1]) <= 2 else texto.replace(',', '')
+    elif texto.count('.') > 1 or re.fullmatch(r"\d+\.\d{3}", texto):
+        # "85.000" é lido como 85 mil
+        texto = texto.replace('.', '')
+    try:
+        return float(texto)
+    except ValueError:
+        raise ValueError(f"{campo} inválido: {valor!r}") from None
+
+
+def _anunciante(linha: dict) -> tuple[str, str]:
+    """Retorna ('cpf', dígitos) ou ('email', email)."""
+    email = str(linha.get('anunciante_email') or '').strip()
+    cpf = str(linha.get('anunciante_cpf') or '').strip()
+    generico = str(linha.get('anunciante') or '').strip()
+    if not email and not cpf and generico:
+        if '@' in generico:
+            email = generico
+        else:
+            cpf = generico
+    if email:
+        return ('email', email)
+    digitos = re.sub(r"\D", "", cpf)
+    if digitos:
+        return ('cpf', digitos)
+    raise ValueError("anunciante_cpf ou anunciante_email é obrigatório")
+
+
+def normalizar_linha(linha: dict, hoje: str) -> dict:
+    """
+    Valida e normaliza uma linha do arquivo.
+
+    Raises:
+        ValueError: Com a descrição do primeiro problema encontrado.
+    """
+    if '_erro' in linha:
+        raise ValueError(linha['_erro'])
+
+    ano = _inteiro(linha.get('ano'), 'ano')
+    if not 1886 <= ano <= date.today().year + 1:
+        raise ValueError(f"ano fora do intervalo: {ano}")
+    preco = _decimal(linha.get('preco'), 'preco')
+    if preco < 0:
+        raise ValueError(f"preco negativo: {preco}")
+    quilometragem = _inteiro(linha.get('quilometragem'), 'quilometragem')
+
+    status = str(linha.get('status') or '').strip().capitalize() or None
+    if status is not None and status not in STATUS_VALIDOS:
+        raise ValueError(f"status inválido: {linha.get('status')!r}")
+
+    data_publicacao = str(linha.get('data_publicacao') or '').strip() or hoje
+    if status is not None:
+        try:
+            datetime.strptime(data_publicacao, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"data_publicacao inválida: {data_publicacao!r}") from None
+
+    return {
+        'marca': _texto(linha, 'marca'),
+        'modelo': _texto(linha, 'modelo'),
+        'ano': ano,
+        'preco': preco,
+        'quilometragem': quilometragem,
+        'anunciante': _anunciante(linha),
+        'status': status,
+        'data_publicacao': data_publicacao,
+    }
+
+
+def validar_lote(lote: List[tuple[int, dict]], hoje: str) -> tuple[list, list]:
+    """
+    Valida um lote de linhas (função de topo para rodar no pool).
+
+    Returns:
+        tuple[list, list]: (número, linha normalizada) válidas e
+        (número, mensagem) rejeitadas.
+    """
+    validas, erros = [], []
+    for numero, linha in lote:
+        try:
+            validas.append((numero, normalizar_linha(linha, hoje)))
+        except (ValueError, TypeError) as e:
+            erros.append((numero, str(e)))
+    return validas, erros
+
+
+# ========== GRAVAÇÃO ==========
+
+class Importador:
+    """
+    Importa um arquivo em lotes, com validação paralela e retomada.
+
+    Attributes:
+        lidas: Linhas lidas nesta execução.
+        importadas: Veículos gravados nesta execução.
+        rejeitadas: Linhas rejeitadas nesta execução.
+        erros: (número da linha, mensagem) das primeiras ``max_erros``
+            linhas rejeitadas; o total está em ``rejeitadas``.
+    """
+
+    def __init__(self, db: Database, caminho: str, tamanho_lote: int = 1000,
+                 processos: Optional[int] = None, max_erros: int = 100):
+        """
+        Args:
+            db: Banco de destino.
+            caminho: Arquivo a importar.
+            tamanho_lote: Linhas por lote (e por transação).
+            processos: Processos de validação (padrão: nº de CPUs; 0 valida
+                no próprio processo).
+            max_erros: Mensagens de erro guardadas; as demais linhas
+                rejeitadas só entram na contagem, para que arquivos com
+                muitos erros não acumulem todos em memória.
+        """
+        self.db = db
+        self.caminho = os.path.abspath(caminho)
+        self.tamanho_lote = tamanho_lote
+        self.processos = (os.cpu_count() or 1) if processos is None else processos
+        self.veiculo_repo = VeiculoRepository()
+        self.anuncio_repo = AnuncioRepository()
+        self._anunciantes = {}
+        self.lidas = 0
+        self.importadas = 0
+        self.rejeitadas = 0
+        self.max_erros = max_erros
+        self.erros: List[tuple[int, str]] = []
+
+    # ----- ponto de retomada -----
+
+    def ponto_de_retomada(self) -> Optional[dict]:
+        """Retorna o estado gravado da importação deste arquivo, se houver."""
+        row = self.db.fetch_one("SELECT * FROM importacoes WHERE arquivo = ?", (self.caminho,))
+        return dict(row) if row else None
+
+    def reiniciar(self):
+        """Descarta o ponto de retomada deste arquivo."""
+        self.db.execute("DELETE FROM importacoes WHERE arquivo = ?", (self.caminho,))
+
+    def _gravar_ponto(self, linhas_processadas: int, importadas: int, rejeitadas: int,
+                      concluida: bool = False):
+        self.db.execute("""
+            INSERT INTO importacoes (arquivo, linhas_processadas, importadas, rejeitadas,
+                                     concluida, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(arquivo) DO UPDATE SET
+                linhas_processadas = excluded.linhas_processadas,
+                importadas = importacoes.importadas + excluded.importadas,
+                rejeitadas = importacoes.rejeitadas + excluded.rejeitadas,
+                concluida = excluded.concluida,
+                atualizado_em = excluded.atualizado_em
+        """, (self.caminho, linhas_processadas, importadas, rejeitadas, int(concluida)))
+
+    # ----- execução -----
+
+    def executar(self, ao_gravar_lote=None) -> dict:
+        """
+        Importa o arquivo a partir do ponto de retomada.
+
+        Args:
+            ao_gravar_lote: Função chamada após cada lote com o relatório
+                parcial (para exibir progresso).
+
+        Returns:
+            dict: Relatório (lidas, importadas, rejeitadas, segundos,
+            linhas_por_segundo, retomada_em).
+        """
+        ponto = self.ponto_de_retomada()
+        if ponto and ponto['concluida']:
+            # Importação já concluída: importa de novo desde o início
+            self.reiniciar()
+            ponto = None
+        pular = ponto['linhas_processadas'] if ponto else 0
+        hoje = date.today().strftime("%Y-%m-%d")
+        inicio = time.perf_counter()
+
+        lotes = em_lotes(ler_linhas(self.caminho, pular), self.tamanho_lote)
+        for lote, (validas, erros) in self._validar(lotes, hoje):
+            self._gravar_lote(lote, validas, erros)
+            if ao_gravar_lote:
+                ao_gravar_lote(self._relatorio(inicio, pular))
+
+        with self.db.transaction():
+            self._gravar_ponto(pular + self.lidas, 0, 0, concluida=True)
+        return self._relatorio(inicio, pular)
+
+    def _validar(self, lotes: Iterator[list], hoje: str) -> Iterator[tuple[list, tuple]]:
+        """
+        Valida os lotes em paralelo, preservando a ordem.
+
+        No máximo dois lotes por processo ficam em andamento, para que o
+        arquivo continue sendo lido sob demanda.
+        """
+        if self.processos <= 0:
+            for lote in lotes:
+                yield lote, validar_lote(lote, hoje)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.processos) as pool:
+            yield from self._validar_no_pool(pool, lotes, hoje)
+
+    def _validar_no_pool(self, pool: Executor, lotes: Iterator[list],
+                         hoje: str) -> Iterator[tuple[list, tuple]]:
+        pendentes = deque()
+        for lote in lotes:
+            pendentes.append((lote, pool.submit(validar_lote, lote, hoje)))
+            if len(pendentes) >= 2 * self.processos:
+                lote_pronto, futuro = pendentes.popleft()
+                yield lote_pronto, futuro.result()
+        while pendentes:
+            lote_pronto, futuro = pendentes.popleft()
+            yield lote_pronto, futuro.result()
+
+    def _gravar_lote(self, lote: list, validas: list, erros: list):
+        """Grava um lote validado e o ponto de retomada em uma única transação."""
+        erros = list(erros)
+        importadas = 0
+        with self.db.transaction():
+            ids_anunciantes = self._resolver_anunciantes(l['anunciante'] for _, l in validas)
+
+            # Veículos agrupados por anunciante, na ordem do arquivo
+            grupos = {}
+            for numero, linha in validas:
+                anunciante_id = ids_anunciantes.get(linha['anunciante'])
+                if anunciante_id is None:
+                    tipo, chave = linha['anunciante']
+                    erros.append((numero, f"anunciante não encontrado ({tipo}: {chave})"))
+                    continue
+                grupos.setdefault(anunciante_id, []).append((numero, linha))
+
+            anuncios = []
+            for anunciante_id, linhas in grupos.items():
+                veiculos = [Veiculo(l['marca'], l['modelo'], l['ano'], l['preco'],
+                                    l['quilometragem']) for _, l in linhas]
+                resultado = self.veiculo_repo.salvar_muitos(veiculos, anunciante_id)
+                for posicao, mensagem in resultado.erros:
+                    erros.append((linhas[posicao][0], mensagem))
+
+                for (numero, linha), veiculo, veiculo_id in zip(linhas, veiculos, resultado.ids):
+                    if veiculo_id is None:
+                        continue
+                    importadas += 1
+                    if linha['status']:
+                        anuncio = Anuncio(linha['data_publicacao'], linha['status'],
+                                          veiculo, None)
+                        anuncios.append((numero, (anuncio, veiculo_id, anunciante_id)))
+
+            if anuncios:
+                resultado = self.anuncio_repo.salvar_muitos([item for _, item in anuncios])
+                for posicao, mensagem in resultado.erros:
+                    # A linha é importada inteira ou rejeitada: sem o anúncio,
+                    # o veículo dela também sai
+                    numero, (_, veiculo_id, _) = anuncios[posicao]
+                    self.veiculo_repo.deletar(veiculo_id)
+                    importadas -= 1
+                    erros.append((numero, mensagem))
+
+            self._gravar_ponto(lote[-1][0], importadas, len(erros))
+
+        self.lidas += len(lote)
+        self.importadas += importadas
+        self.rejeitadas += len(erros)
+        restantes = self.max_erros - len(self.erros)
+        if restantes > 0:
+            self.erros.extend(sorted(erros)[:restantes])
+
+    def _resolver_anunciantes(self, chaves) -> dict:
+        """
+        Converte chaves ('cpf' | 'email', valor) em IDs de anunciantes.
+
+        Os resultados ficam guardados durante a importação; apenas as chaves
+        ainda desconhecidas são consultadas, em uma única query por lote.
+        """
+        faltantes = {chave for chave in chaves if chave not in self._anunciantes}
+        if not faltantes:
+            return self._anunciantes
+
+        # O CPF pode ter sido gravado a partir de um int (sem zeros à esquerda)
+        cpfs = {}
+        for tipo, valor in faltantes:
+            if tipo == 'cpf':
+                cpfs[valor] = cpfs[valor.lstrip('0')] = valor
+        emails = [valor for tipo, valor in faltantes if tipo == 'email']
+
+        rows = self.db.fetch_all(f"""
+            SELECT u.id, u.cpf, u.email
+            FROM usuarios u
+            JOIN anunciantes an ON an.usuario_id = u.id
+            WHERE u.cpf IN ({', '.join('?' * len(cpfs)) or 'NULL'})
+               OR u.email IN ({', '.join('?' * len(emails)) or 'NULL'})
+        """, tuple(cpfs) + tuple(emails))
+
+        for row in rows:
+            if row['cpf'] in cpfs:
+                self._anunciantes[('cpf', cpfs[row['cpf']])] = row['id']
+            self._anunciantes[('email', row['email'])] = row['id']
+        for chave in faltantes:
+            self._anunciantes.setdefault(chave, None)
+        return self._anunciantes
+
+    def _relatorio(self, inicio: float, pular: int) -> dict:
+        segundos = time.perf_counter() - inicio
+        return {
+            'lidas': self.lidas,
+            'importadas': self.importadas,
+            'rejeitadas': self.rejeitadas,
+            'segundos': segundos,
+            'linhas_por_segundo': self.lidas / segundos if segundos > 0 else 0.0,
+            'retomada_em': pular,
+        }
+
+
+def main():
+    """Função principal do importador."""
+    parser = argparse.ArgumentParser(description="Importa veículos e anúncios de CSV/JSONL.")
+    parser.add_argument('arquivo', help="arquivo .csv ou .jsonl")
+    parser.add_argument('--lote', type=int, default=1000, help="linhas por transação")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="processos de validação (0 = sem pool)")
+    parser.add_argument('--reiniciar', action='store_true',
+                        help="ignora o ponto de retomada e importa desde o início")
+    parser.add_argument('--perfil', choices=list(PERFIS),
+                        help="perfil das conexões (padrão: CATALOGO_DB_PERFIL ou carga-em-massa)")
+    args = parser.parse_args()
+    caminho = args.arquivo
+
+    print("\n" + "="*60)
+    print("📥 IMPORTAÇÃO DE CATÁLOGO")
+    print("="*60)
+
+    if not os.path.exists(caminho):
+        print(f"✗ Arquivo não encontrado: {caminho}")
+        return 1
+
+    db = Database(profile=obter_perfil(args.perfil, padrao='carga-em-massa').nome)
+    print(f"⚙️  Perfil do banco: {db.profile.descricao()}")
+    db.create_tables()
+
+    importador = Importador(db, caminho, args.lote, args.processos)
+    if args.reiniciar:
+        importador.reiniciar()
+
+    ponto = importador.ponto_de_retomada()
+    if ponto and ponto['concluida']:
+        print(f"✓ {caminho} já foi importado ({ponto['importadas']} veículos).")
+        print("  Use --reiniciar para importar novamente.")
+        return 0
+    if ponto:
+        print(f"↻ Retomando após a linha {ponto['linhas_processadas']}")
+
+    def progresso(parcial: dict):
+        print(f"  → {parcial['lidas']} linhas lidas, {parcial['importadas']} importadas "
+              f"({parcial['linhas_por_segundo']:.0f} linhas/s)")
+
+    relatorio = importador.executar(progresso)
+
+    print("\n" + "="*60)
+    print(f"✅ Importadas: {relatorio['importadas']}")
+    print(f"❌ Rejeitadas: {relatorio['rejeitadas']}")
+    print(f"⏱️  {relatorio['lidas']} linhas em {relatorio['segundos']:.2f}s "
+          f"({relatorio['linhas_por_segundo']:.0f} linhas/s)")
+    for numero, mensagem in importador.erros[:10]:
+        print(f"  linha {numero}: {mensagem}")
+    if relatorio['rejeitadas'] > 10:
+        print(f"  ... e mais {relatorio['rejeitadas'] - 10} erros")
+    print("="*60 + "\n")
+
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Importação interrompida. Execute novamente para retomar.")
+        sys.exit(1)
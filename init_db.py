@@ -11,11 +11,18 @@ Uso:
     python init_db.py              # Cria tabelas e insere admin padrão
     python init_db.py --reset      # Reseta o banco e recria tudo
     python init_db.py --with-data  # Inclui dados de exemplo
+    python init_db.py --reset --generate --usuarios 100000 --veiculos 1000000
+                                   # Gera um catálogo sintético grande
+                                   # (mesma --semente, mesmo catálogo)
 """
 
+import argparse
 import sys
 import os
 from database import Database
+from estatisticas import Estatisticas
+from gerador import GeradorCatalogo
+from perfis import obter_perfil
 from datetime import datetime
 
 
@@ -30,19 +37,20 @@ def criar_admin_padrao(db: Database):
     print("\n📌 Criando administrador padrão...")
     
     try:
-        # Inserir usuário
-        cursor = db.execute("""
-            INSERT INTO usuarios (cpf, nome, email, senha, tipo)
-            VALUES (?, ?, ?, ?, ?)
-        """, ("00000000000", "Administrador", "admin@admin.com", "admin123", "admin"))
-        
-        usuario_id = cursor.lastrowid
-        
-        # Inserir registro específico de admin
-        db.execute("""
-            INSERT INTO admins (usuario_id, admin_id)
-            VALUES (?, ?)
-        """, (usuario_id, 1))
+        with db.transaction():
+            # Inserir usuário
+            cursor = db.execute("""
+                INSERT INTO usuarios (cpf, nome, email, senha, tipo)
+                VALUES (?, ?, ?, ?, ?)
+            """, ("00000000000", "Administrador", "admin@admin.com", "admin123", "admin"))
+
+            usuario_id = cursor.lastrowid
+
+            # Inserir registro específico de admin
+            db.execute("""
+                INSERT INTO admins (usuario_id, admin_id)
+                VALUES (?, ?)
+            """, (usuario_id, 1))
         
         print("✓ Admin criado com sucesso!")
         print(f"  Email: admin@admin.com")
@@ -60,149 +68,151 @@ def criar_dados_exemplo(db: Database):
     print("\n📌 Inserindo dados de exemplo...")
     
     try:
-        # ========== ANUNCIANTES ==========
-        print("  → Criando anunciantes...")
-        
-        # Anunciante 1
-        cursor = db.execute("""
-            INSERT INTO usuarios (cpf, nome, email, senha, tipo)
-            VALUES (?, ?, ?, ?, ?)
-        """, ("12345678900", "João Silva", "joao@email.com", "senha123", "anunciante"))
-        
-        anunciante1_id = cursor.lastrowid
-        db.execute("""
-            INSERT INTO anunciantes (usuario_id, telefone)
-            VALUES (?, ?)
-        """, (anunciante1_id, "(11) 98765-4321"))
-        
-        # Anunciante 2
-        cursor = db.execute("""
-            INSERT INTO usuarios (cpf, nome, email, senha, tipo)
-            VALUES (?, ?, ?, ?, ?)
-        """, ("98765432100", "Maria Santos", "maria@email.com", "senha456", "anunciante"))
-        
-        anunciante2_id = cursor.lastrowid
-        db.execute("""
-            INSERT INTO anunciantes (usuario_id, telefone)
-            VALUES (?, ?)
-        """, (anunciante2_id, "(21) 99999-8888"))
-        
-        # Anunciante 3
-        cursor = db.execute("""
-            INSERT INTO usuarios (cpf, nome, email, senha, tipo)
-            VALUES (?, ?, ?, ?, ?)
-        """, ("11111111111", "Pedro Costa", "pedro@email.com", "senha789", "anunciante"))
-        
-        anunciante3_id = cursor.lastrowid
-        db.execute("""
-            INSERT INTO anunciantes (usuario_id, telefone)
-            VALUES (?, ?)
-        """, (anunciante3_id, "(31) 97777-6666"))
-        
-        print(f"    ✓ 3 anunciantes criados")
-        
-        # ========== CLIENTES ==========
-        print("  → Criando clientes...")
-        
-        # Cliente 1
-        cursor = db.execute("""
-            INSERT INTO usuarios (cpf, nome, email, senha, tipo)
-            VALUES (?, ?, ?, ?, ?)
-        """, ("22222222222", "Ana Lima", "ana@email.com", "senha000", "cliente"))
-        
-        cliente1_id = cursor.lastrowid
-        db.execute("""
-            INSERT INTO clientes (usuario_id)
-            VALUES (?)
-        """, (cliente1_id,))
-        
-        # Cliente 2
-        cursor = db.execute("""
-            INSERT INTO usuarios (cpf, nome, email, senha, tipo)
-            VALUES (?, ?, ?, ?, ?)
-        """, ("33333333333", "Carlos Souza", "carlos@email.com", "senha111", "cliente"))
-        
-        cliente2_id = cursor.lastrowid
-        db.execute("""
-            INSERT INTO clientes (usuario_id)
-            VALUES (?)
-        """, (cliente2_id,))
-        
-        print(f"    ✓ 2 clientes criados")
-        
-        # ========== VEÍCULOS ==========
-        print("  → Criando veículos...")
-        
-        veiculos = [
-            # Veículos do Anunciante 1
-            ("Toyota", "Corolla", 2020, 85000.00, 50000, anunciante1_id),
-            ("Honda", "Civic", 2019, 75000.00, 40000, anunciante1_id),
-            
-            # Veículos do Anunciante 2
-            ("Ford", "Ka", 2018, 35000.00, 45000, anunciante2_id),
-            ("Volkswagen", "Gol", 2018, 45000.00, 60000, anunciante2_id),
-            ("Chevrolet", "Onix", 2021, 60000.00, 30000, anunciante2_id),
-            
-            # Veículos do Anunciante 3
-            ("Toyota", "Hilux", 2021, 150000.00, 20000, anunciante3_id),
-            ("Fiat", "Palio", 2015, 28000.00, 70000, anunciante3_id),
-        ]
-        
-        veiculo_ids = []
-        for veiculo in veiculos:
+        # Todos os inserts são confirmados em um único commit
+        with db.transaction():
+            # ========== ANUNCIANTES ==========
+            print("  → Criando anunciantes...")
+
+            # Anunciante 1
             cursor = db.execute("""
-                INSERT INTO veiculos (marca, modelo, ano, preco, quilometragem, anunciante_id)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, veiculo)
-            veiculo_ids.append(cursor.lastrowid)
-        
-        print(f"    ✓ {len(veiculos)} veículos criados")
-        
-        # ========== ANÚNCIOS ==========
-        print("  → Criando anúncios...")
-        
-        data_atual = datetime.now().strftime("%Y-%m-%d")
-        
-        anuncios = [
-            # Anúncios aprovados
-            (data_atual, "Aprovado", veiculo_ids[0], anunciante1_id),
-            (data_atual, "Aprovado", veiculo_ids[1], anunciante1_id),
-            (data_atual, "Aprovado", veiculo_ids[2], anunciante2_id),
-            (data_atual, "Aprovado", veiculo_ids[4], anunciante2_id),
-            
-            # Anúncios pendentes
-            (data_atual, "Pendente", veiculo_ids[3], anunciante2_id),
-            (data_atual, "Pendente", veiculo_ids[5], anunciante3_id),
-            
-            # Anúncio rejeitado
-            (data_atual, "Rejeitado", veiculo_ids[6], anunciante3_id),
-        ]
-        
-        for anuncio in anuncios:
+                INSERT INTO usuarios (cpf, nome, email, senha, tipo)
+                VALUES (?, ?, ?, ?, ?)
+            """, ("12345678900", "João Silva", "joao@email.com", "senha123", "anunciante"))
+
+            anunciante1_id = cursor.lastrowid
             db.execute("""
-                INSERT INTO anuncios (data_publicacao, status, veiculo_id, anunciante_id)
-                VALUES (?, ?, ?, ?)
-            """, anuncio)
-        
-        print(f"    ✓ {len(anuncios)} anúncios criados")
-        
-        # ========== HISTÓRICO DE PESQUISAS ==========
-        print("  → Criando histórico de pesquisas...")
-        
-        pesquisas = [
-            (cliente1_id, "Toyota"),
-            (cliente1_id, "Honda"),
-            (cliente2_id, "Ford"),
-            (cliente2_id, "Volkswagen"),
-        ]
-        
-        for pesquisa in pesquisas:
+                INSERT INTO anunciantes (usuario_id, telefone)
+                VALUES (?, ?)
+            """, (anunciante1_id, "(11) 98765-4321"))
+
+            # Anunciante 2
+            cursor = db.execute("""
+                INSERT INTO usuarios (cpf, nome, email, senha, tipo)
+                VALUES (?, ?, ?, ?, ?)
+            """, ("98765432100", "Maria Santos", "maria@email.com", "senha456", "anunciante"))
+
+            anunciante2_id = cursor.lastrowid
             db.execute("""
-                INSERT INTO historico_pesquisas (cliente_id, filtro)
+                INSERT INTO anunciantes (usuario_id, telefone)
                 VALUES (?, ?)
-            """, pesquisa)
-        
-        print(f"    ✓ {len(pesquisas)} pesquisas no histórico")
+            """, (anunciante2_id, "(21) 99999-8888"))
+
+            # Anunciante 3
+            cursor = db.execute("""
+                INSERT INTO usuarios (cpf, nome, email, senha, tipo)
+                VALUES (?, ?, ?, ?, ?)
+            """, ("11111111111", "Pedro Costa", "pedro@email.com", "senha789", "anunciante"))
+
+            anunciante3_id = cursor.lastrowid
+            db.execute("""
+                INSERT INTO anunciantes (usuario_id, telefone)
+                VALUES (?, ?)
+            """, (anunciante3_id, "(31) 97777-6666"))
+
+            print(f"    ✓ 3 anunciantes criados")
+
+            # ========== CLIENTES ==========
+            print("  → Criando clientes...")
+
+            # Cliente 1
+            cursor = db.execute("""
+                INSERT INTO usuarios (cpf, nome, email, senha, tipo)
+                VALUES (?, ?, ?, ?, ?)
+            """, ("22222222222", "Ana Lima", "ana@email.com", "senha000", "cliente"))
+
+            cliente1_id = cursor.lastrowid
+            db.execute("""
+                INSERT INTO clientes (usuario_id)
+                VALUES (?)
+            """, (cliente1_id,))
+
+            # Cliente 2
+            cursor = db.execute("""
+                INSERT INTO usuarios (cpf, nome, email, senha, tipo)
+                VALUES (?, ?, ?, ?, ?)
+            """, ("33333333333", "Carlos Souza", "carlos@email.com", "senha111", "cliente"))
+
+            cliente2_id = cursor.lastrowid
+            db.execute("""
+                INSERT INTO clientes (usuario_id)
+                VALUES (?)
+            """, (cliente2_id,))
+
+            print(f"    ✓ 2 clientes criados")
+
+            # ========== VEÍCULOS ==========
+            print("  → Criando veículos...")
+
+            veiculos = [
+                # Veículos do Anunciante 1
+                ("Toyota", "Corolla", 2020, 85000.00, 50000, anunciante1_id),
+                ("Honda", "Civic", 2019, 75000.00, 40000, anunciante1_id),
+
+                # Veículos do Anunciante 2
+                ("Ford", "Ka", 2018, 35000.00, 45000, anunciante2_id),
+                ("Volkswagen", "Gol", 2018, 45000.00, 60000, anunciante2_id),
+                ("Chevrolet", "Onix", 2021, 60000.00, 30000, anunciante2_id),
+
+                # Veículos do Anunciante 3
+                ("Toyota", "Hilux", 2021, 150000.00, 20000, anunciante3_id),
+                ("Fiat", "Palio", 2015, 28000.00, 70000, anunciante3_id),
+            ]
+
+            veiculo_ids = []
+            for veiculo in veiculos:
+                cursor = db.execute("""
+                    INSERT INTO veiculos (marca, modelo, ano, preco, quilometragem, anunciante_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, veiculo)
+                veiculo_ids.append(cursor.lastrowid)
+
+            print(f"    ✓ {len(veiculos)} veículos criados")
+
+            # ========== ANÚNCIOS ==========
+            print("  → Criando anúncios...")
+
+            data_atual = datetime.now().strftime("%Y-%m-%d")
+
+            anuncios = [
+                # Anúncios aprovados
+                (data_atual, "Aprovado", veiculo_ids[0], anunciante1_id),
+                (data_atual, "Aprovado", veiculo_ids[1], anunciante1_id),
+                (data_atual, "Aprovado", veiculo_ids[2], anunciante2_id),
+                (data_atual, "Aprovado", veiculo_ids[4], anunciante2_id),
+
+                # Anúncios pendentes
+                (data_atual, "Pendente", veiculo_ids[3], anunciante2_id),
+                (data_atual, "Pendente", veiculo_ids[5], anunciante3_id),
+
+                # Anúncio rejeitado
+                (data_atual, "Rejeitado", veiculo_ids[6], anunciante3_id),
+            ]
+
+            for anuncio in anuncios:
+                db.execute("""
+                    INSERT INTO anuncios (data_publicacao, status, veiculo_id, anunciante_id)
+                    VALUES (?, ?, ?, ?)
+                """, anuncio)
+
+            print(f"    ✓ {len(anuncios)} anúncios criados")
+
+            # ========== HISTÓRICO DE PESQUISAS ==========
+            print("  → Criando histórico de pesquisas...")
+
+            pesquisas = [
+                (cliente1_id, "Toyota"),
+                (cliente1_id, "Honda"),
+                (cliente2_id, "Ford"),
+                (cliente2_id, "Volkswagen"),
+            ]
+
+            for pesquisa in pesquisas:
+                db.execute("""
+                    INSERT INTO historico_pesquisas (cliente_id, filtro)
+                    VALUES (?, ?)
+                """, pesquisa)
+
+            print(f"    ✓ {len(pesquisas)} pesquisas no histórico")
         
         print("\n✓ Dados de exemplo inseridos com sucesso!")
         
@@ -211,6 +221,33 @@ def criar_dados_exemplo(db: Database):
         raise
 
 
+def gerar_catalogo(db: Database, usuarios: int, veiculos: int, semente: int, lote: int):
+    """
+    Gera um catálogo sintético reprodutível (veja gerador.py).
+    
+    Usuários, veículos, anúncios e históricos de pesquisa com distribuições
+    realistas, gravados em lotes para servir de base a testes de desempenho.
+    """
+    print(f"\n📌 Gerando catálogo sintético (semente {semente})...")
+    print(f"  → {usuarios} usuários e {veiculos} veículos, {lote} linhas por transação")
+    
+    gerador = GeradorCatalogo(db, usuarios=usuarios, veiculos=veiculos,
+                              semente=semente, tamanho_lote=lote)
+    
+    def progresso(parcial: dict):
+        print(f"  → {parcial['usuarios']} usuários, {parcial['veiculos']} veículos "
+              f"({parcial['linhas_por_segundo']:.0f} linhas/s)")
+    
+    relatorio = gerador.executar(progresso)
+    
+    print(f"\n✓ Catálogo gerado: {relatorio['usuarios']} usuários "
+          f"({relatorio['admins']} admins, {relatorio['anunciantes']} anunciantes, "
+          f"{relatorio['clientes']} clientes), {relatorio['veiculos']} veículos, "
+          f"{relatorio['anuncios']} anúncios, {relatorio['historico_pesquisas']} pesquisas")
+    print(f"⏱️  {relatorio['linhas']} linhas em {relatorio['segundos']:.2f}s "
+          f"({relatorio['linhas_por_segundo']:.0f} linhas/s, com índices e resumos)")
+
+
 def exibir_estatisticas(db: Database):
     """Exibe estatísticas do banco de dados após inicialização."""
     print("\n" + "="*60)
@@ -218,29 +255,26 @@ def exibir_estatisticas(db: Database):
     print("="*60)
     
     try:
-        # Contar usuários por tipo
-        result = db.fetch_one("SELECT COUNT(*) as total FROM usuarios WHERE tipo = 'admin'")
-        print(f"👨‍💼 Administradores: {result['total']}")
-        
-        result = db.fetch_one("SELECT COUNT(*) as total FROM usuarios WHERE tipo = 'anunciante'")
-        print(f"👤 Anunciantes: {result['total']}")
-        
-        result = db.fetch_one("SELECT COUNT(*) as total FROM usuarios WHERE tipo = 'cliente'")
-        print(f"🧑 Clientes: {result['total']}")
-        
-        # Contar veículos
-        result = db.fetch_one("SELECT COUNT(*) as total FROM veiculos")
-        print(f"🚗 Veículos: {result['total']}")
-        
-        # Contar anúncios por status
-        result = db.fetch_one("SELECT COUNT(*) as total FROM anuncios WHERE status = 'Aprovado'")
-        print(f"✅ Anúncios aprovados: {result['total']}")
-        
-        result = db.fetch_one("SELECT COUNT(*) as total FROM anuncios WHERE status = 'Pendente'")
-        print(f"⏳ Anúncios pendentes: {result['total']}")
-        
-        result = db.fetch_one("SELECT COUNT(*) as total FROM anuncios WHERE status = 'Rejeitado'")
-        print(f"❌ Anúncios rejeitados: {result['total']}")
+        # Contadores mantidos por gatilhos (migração 9): uma única leitura
+        resumo = Estatisticas().resumo(limite_marcas=5)
+        usuarios, anuncios = resumo['usuarios'], resumo['anuncios']
+        
+        print(f"👨‍💼 Administradores: {usuarios['admin']}")
+        print(f"👤 Anunciantes: {usuarios['anunciante']}")
+        print(f"🧑 Clientes: {usuarios['cliente']}")
+        print(f"🚗 Veículos: {resumo['veiculos']}")
+        print(f"✅ Anúncios aprovados: {anuncios['Aprovado']}")
+        print(f"⏳ Anúncios pendentes: {anuncios['Pendente']}")
+        print(f"❌ Anúncios rejeitados: {anuncios['Rejeitado']}")
+        
+        if resumo['marcas']:
+            print("\n🏷️  Marcas com mais veículos:")
+            for marca in resumo['marcas']:
+                preco, ano = marca['preco'], marca['ano']
+                print(f"  {marca['marca']}: {marca['veiculos']} veículo(s), "
+                      f"R$ {preco['min']:.2f} a R$ {preco['max']:.2f} "
+                      f"(média R$ {preco['media']:.2f}), "
+                      f"anos {ano['min']:.0f}-{ano['max']:.0f}")
         
     except Exception as e:
         print(f"✗ Erro ao exibir estatísticas: {e}")
@@ -256,17 +290,36 @@ def main():
     print("="*60)
     
     # Verificar argumentos
-    reset = "--reset" in sys.argv
-    with_data = "--with-data" in sys.argv
+    parser = argparse.ArgumentParser(description="Cria e inicializa o banco de dados.")
+    parser.add_argument('--reset', action='store_true', help="remove o banco existente")
+    parser.add_argument('--with-data', action='store_true', help="inclui dados de exemplo")
+    parser.add_argument('--generate', action='store_true',
+                        help="gera um catálogo sintético (veja --usuarios e --veiculos)")
+    parser.add_argument('--usuarios', type=int, default=10000,
+                        help="usuários do catálogo gerado (padrão: 10000)")
+    parser.add_argument('--veiculos', type=int, default=100000,
+                        help="veículos do catálogo gerado (padrão: 100000)")
+    parser.add_argument('--semente', type=int, default=42,
+                        help="semente do catálogo gerado (padrão: 42)")
+    parser.add_argument('--lote', type=int, default=50000,
+                        help="linhas por transação na geração (padrão: 50000)")
+    args = parser.parse_args()
+    reset = args.reset
+    with_data = args.with_data
     
-    # Inicializar banco
-    db = Database()
+    # Inicializar banco (a geração usa o perfil de carga em massa)
+    db = Database(profile=obter_perfil(padrao='carga-em-massa').nome if args.generate else None)
+    print(f"⚙️  Perfil do banco: {db.profile.descricao()}")
     
     # Reset se solicitado
     if reset:
         print("\n⚠️  MODO RESET: Removendo banco existente...")
         if os.path.exists(db._db_path):
             os.remove(db._db_path)
+            # Arquivos do modo WAL que sobraram de uma execução interrompida
+            for sufixo in ('-wal', '-shm'):
+                if os.path.exists(db._db_path + sufixo):
+                    os.remove(db._db_path + sufixo)
             print("✓ Banco de dados removido")
         else:
             print("  (Nenhum banco existente encontrado)")
@@ -286,6 +339,10 @@ def main():
     if with_data:
         criar_dados_exemplo(db)
     
+    # Gerar catálogo sintético se solicitado
+    if args.generate:
+        gerar_catalogo(db, args.usuarios, args.veiculos, args.semente, args.lote)
+    
     # Exibir estatísticas
     exibir_estatisticas(db)
     
@@ -295,7 +352,7 @@ def main():
     print("\n✅ Inicialização concluída com sucesso!")
     print(f"📁 Banco de dados: {db._db_path}")
     
-    if not with_data:
+    if not with_data and not args.generate:
         print("\n💡 Dica: Use 'python init_db.py --with-data' para incluir dados de exemplo")
     
     print("\n" + "="*60 + "\n")
@@ -0,0 +1,275 @@
+"""
+Instrumentação das consultas feitas por ``Database``.
+
+Cada chamada a ``execute``, ``executemany``, ``fetch_one``, ``fetch_all`` e
+``iter_query`` é medida e agregada pelo SQL normalizado (espaços colapsados,
+literais e listas ``IN (?, ?, ...)`` trocados por marcadores): quantidade de
+chamadas, tempo total, p50, p99, máximo e linhas retornadas (ou afetadas).
+
+As consultas mais lentas que um limite configurável vão para o log de
+consultas lentas, junto com o método que as chamou (por exemplo,
+``AnuncioRepository.buscar_por_id``).
+
+Configuração por variáveis de ambiente:
+    CATALOGO_DB_LENTO_MS   limite, em milissegundos, do log de consultas lentas
+    CATALOGO_DB_LOG_LENTO  arquivo do log (padrão: saída de erro)
+
+Exemplo:
+    db = Database()
+    db.instrumentation.configurar_log_lento(50, "consultas_lentas.log")
+    ...
+    print(db.instrumentation.relatorio())
+"""
+
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+# Arquivos cujos quadros são pulados ao procurar quem fez a consulta
+_PASTA = os.path.dirname(os.path.abspath(__file__))
+_INTERNOS = {os.path.join(_PASTA, nome) for nome in ('instrumentacao.py', 'database.py', 'cache.py')}
+# Arquivos cujas funções auxiliares de topo (``_facetas``, ``_contagem``...)
+# também são puladas: o log mostra o método do repositório que as chamou
+_AUXILIARES = {os.path.join(_PASTA, 'repository.py')}
+
+_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACOS = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalizar_sql(sql: str) -> str:
+    """
+    Forma canônica de um comando SQL, usada para agrupar as medições.
+
+    ``SELECT * FROM t WHERE id IN (1, 2,  3)`` e
+    ``SELECT * FROM t WHERE id IN (?, ?)`` viram
+    ``SELECT * FROM t WHERE id IN (...)``.
+    """
+    sql = _TEXTO.sub("?", sql)
+    sql = _NUMERO.sub("?", sql)
+    sql = _ESPACOS.sub(" ", sql).strip()
+    return _LISTA.sub("(...)", sql)
+
+
+def chamador() -> str:
+    """
+    Primeiro quadro da pilha fora da camada de banco de dados.
+
+    Funções de topo com ``_`` em repository.py também são puladas.
+
+    Returns:
+        str: ``Classe.metodo (arquivo:linha)``; funções locais e lambdas
+        aparecem como o método que as definiu.
+    """
+    quadro = sys._getframe(1)
+    while quadro is not None:
+        arquivo = os.path.abspath(quadro.f_code.co_filename)
+        if arquivo not in _INTERNOS and not arquivo.endswith('contextlib.py'):
+            nome = getattr(quadro.f_code, 'co_qualname', quadro.f_code.co_name)
+            nome = nome.split('.<locals>', 1)[0]
+            auxiliar = arquivo in _AUXILIARES and nome.startswith('_') and '.' not in nome
+            if not auxiliar:
+                return f"{nome} ({os.path.basename(arquivo)}:{quadro.f_lineno})"
+        quadro = quadro.f_back
+    return "?"
+
+
+class _Medicoes:
+    """Medições acumuladas de um comando normalizado."""
+
+    __slots__ = ('chamadas', 'total', 'maximo', 'linhas', 'amostras')
+
+    def __init__(self):
+        self.chamadas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.linhas = 0
+        self.amostras: List[float] = []
+
+    def registrar(self, segundos: float, linhas: int, max_amostras: int):
+        self.chamadas += 1
+        self.total += segundos
+        self.linhas += linhas
+        if segundos > self.maximo:
+            self.maximo = segundos
+        # Amostragem de reservatório: memória fixa, percentis representativos
+        # de todas as chamadas (não só das últimas)
+        if len(self.amostras) < max_amostras:
+            self.amostras.append(segundos)
+        else:
+            posicao = random.randrange(self.chamadas)
+            if posicao < max_amostras:
+                self.amostras[posicao] = segundos
+
+
+def _percentil(ordenadas: List[float], fracao: float) -> float:
+    """Percentil pelo método do posto mais próximo (lista já ordenada)."""
+    if not ordenadas:
+        return 0.0
+    posicao = max(math.ceil(fracao * len(ordenadas)) - 1, 0)
+    return ordenadas[posicao]
+
+
+class Instrumentacao:
+    """
+    Coleta de tempos por comando SQL e log de consultas lentas.
+
+    Attributes:
+        ativa: Desligue para não medir nada.
+        lento_ms: Consultas com pelo menos esse tempo vão para o log de
+            consultas lentas (None desliga o log).
+        max_amostras: Tempos guardados por comando para os percentis.
+    """
+
+    def __init__(self, lento_ms: Optional[float] = None, arquivo_lento: Optional[str] = None,
+                 max_amostras: int = 1024):
+        """
+        Args:
+            lento_ms: Limite do log de consultas lentas (padrão: variável de
+                ambiente CATALOGO_DB_LENTO_MS; sem ela, log desligado).
+            arquivo_lento: Arquivo do log (padrão: CATALOGO_DB_LOG_LENTO ou a
+                saída de erro).
+            max_amostras: Tempos guardados por comando para os percentis.
+        """
+        self.ativa = True
+        self.max_amostras = max_amostras
+        self._medicoes = {}
+        self._lock = threading.Lock()
+        self._log: Optional[TextIO] = None
+        self._arquivo_lento: Optional[str] = None
+        self._gravacao: Optional[Dict[str, Tuple[str, tuple]]] = None
+        if lento_ms is None and os.environ.get('CATALOGO_DB_LENTO_MS'):
+            lento_ms = float(os.environ['CATALOGO_DB_LENTO_MS'])
+        self.configurar_log_lento(lento_ms,
+                                  arquivo_lento or os.environ.get('CATALOGO_DB_LOG_LENTO'))
+
+    def configurar_log_lento(self, lento_ms: Optional[float], arquivo: Optional[str] = None):
+        """
+        Define o limite e o destino do log de consultas lentas.
+
+        Args:
+            lento_ms: Limite em milissegundos (None desliga o log).
+            arquivo: Arquivo onde as linhas são acrescentadas (None: saída de erro).
+        """
+        with self._lock:
+            if self._log is not None and self._log is not sys.stderr:
+                self._log.close()
+            self._log = None
+            self.lento_ms = lento_ms
+            self._arquivo_lento = arquivo
+
+    def registrar(self, sql: str, segundos: float, linhas: int = 0, params=()):
+        """
+        Acrescenta uma medição.
+
+        Args:
+            sql: Comando como foi executado.
+            segundos: Tempo gasto no SQLite.
+            linhas: Linhas retornadas (ou afetadas, para escritas).
+            params: Parâmetros do comando (guardados apenas durante ``gravar``).
+        """
+        if not self.ativa:
+            return
+        chave = normalizar_sql(sql)
+        with self._lock:
+            medicoes = self._medicoes.get(chave)
+            if medicoes is None:
+                medicoes = self._medicoes[chave] = _Medicoes()
+            medicoes.registrar(segundos, linhas, self.max_amostras)
+            if self._gravacao is not None and chave not in self._gravacao:
+                self._gravacao[chave] = (sql, tuple(params))
+        if self.lento_ms is not None and segundos * 1000 >= self.lento_ms:
+            self._registrar_lenta(chave, segundos, linhas)
+
+    def estatisticas(self, ordenar_por: str = 'total_ms',
+                     limite: Optional[int] = None) -> List[dict]:
+        """
+        Medições agregadas por comando normalizado.
+
+        Args:
+            ordenar_por: Campo usado para ordenar, decrescente (``total_ms``,
+                ``chamadas``, ``p99_ms``, ``linhas``...).
+            limite: Número máximo de comandos.
+
+        Returns:
+            List[dict]: sql, chamadas, total_ms, media_ms, p50_ms, p99_ms,
+            max_ms e linhas de cada comando.
+        """
+        with self._lock:
+            itens = [(sql, m.chamadas, m.total, m.maximo, m.linhas, sorted(m.amostras))
+                     for sql, m in self._medicoes.items()]
+        resultado = [{
+            'sql': sql,
+            'chamadas': chamadas,
+            'total_ms': total * 1000,
+            'media_ms': total * 1000 / chamadas,
+            'p50_ms': _percentil(amostras, 0.50) * 1000,
+            'p99_ms': _percentil(amostras, 0.99) * 1000,
+            'max_ms': maximo * 1000,
+            'linhas': linhas,
+        } for sql, chamadas, total, maximo, linhas, amostras in itens]
+        resultado.sort(key=lambda item: item[ordenar_por], reverse=True)
+        return resultado[:limite] if limite is not None else resultado
+
+    def relatorio(self, limite: Optional[int] = 20, largura_sql: int = 70) -> str:
+        """Tabela de texto com os comandos que mais consumiram tempo."""
+        estatisticas = self.estatisticas(limite=limite)
+        if not estatisticas:
+            return "Nenhuma consulta registrada."
+        linhas = [f"{'chamadas':>8} {'total ms':>10} {'p50 ms':>8} {'p99 ms':>8} "
+                  f"{'linhas':>8}  sql"]
+        for item in estatisticas:
+            sql = item['sql']
+            if len(sql) > largura_sql:
+                sql = sql[:largura_sql - 3] + "..."
+            linhas.append(f"{item['chamadas']:>8} {item['total_ms']:>10.2f} "
+                          f"{item['p50_ms']:>8.2f} {item['p99_ms']:>8.2f} "
+                          f"{item['linhas']:>8}  {sql}")
+        return "\n".join(linhas)
+
+    @contextmanager
+    def gravar(self) -> Iterator[Dict[str, Tuple[str, tuple]]]:
+        """
+        Guarda, durante o bloco, um exemplo de cada comando executado.
+
+        Yields:
+            dict: SQL normalizado -> (SQL original, parâmetros) da primeira
+            execução; preenchido à medida que os comandos rodam.
+        """
+        gravacao = {}
+        with self._lock:
+            anterior, self._gravacao = self._gravacao, gravacao
+        try:
+            yield gravacao
+        finally:
+            with self._lock:
+                self._gravacao = anterior
+
+    def limpar(self):
+        """Descarta as medições acumuladas."""
+        with self._lock:
+            self._medicoes.clear()
+
+    def fechar(self):
+        """Fecha o arquivo do log de consultas lentas, se houver."""
+        self.configurar_log_lento(self.lento_ms, self._arquivo_lento)
+
+    def _registrar_lenta(self, sql: str, segundos: float, linhas: int):
+        """Escreve uma linha no log de consultas lentas."""
+        linha = (f"{time.strftime('%Y-%m-%d %H:%M:%S')} | {segundos * 1000:.1f} ms | "
+                 f"{linhas} linha(s) | {chamador()} | {sql}\n")
+        with self._lock:
+            if self._log is None:
+                self._log = (open(self._arquivo_lento, 'a', encoding='utf-8')
+                             if self._arquivo_lento else sys.stderr)
+            self._log.write(linha)
+            self._log.flush()
@@ -3,6 +3,7 @@ from tkinter import ttk, simpledialog, messagebox
 from PIL import Image, ImageTk
 import main
 import os
+import sys
 
 
 class PlaceholderEntry(tk.Entry):
@@ -671,7 +672,7 @@ class App:
         filtro = simpledialog.askstring('Buscar', 'Filtro (marca/modelo):')
         if not filtro:
             return
-        resultados = [a for a in main.anuncioList if filtro.lower() in a.veiculo.marca.lower() or filtro.lower() in a.veiculo.modelo.lower()]
+        resultados = main.BuscarAnuncios(self.current_user, filtro)
         top = tk.Toplevel(self.root)
         top.title('Resultados da Busca (Anúncios)')
         lb = tk.Listbox(top, width=120)
@@ -725,54 +726,59 @@ class App:
         top = tk.Toplevel(self.root)
         top.title('Painel Admin')
 
-        lb = tk.Listbox(top, width=100)
+        # Seleção múltipla: Ctrl/Shift + clique
+        lb = tk.Listbox(top, width=100, selectmode='extended')
         lb.pack(padx=10, pady=10)
-        pendentes = [a for a in main.anuncioList if a.status.lower() == 'pendente']
-        for a in pendentes:
-            v = a.veiculo
-            lb.insert('end', f'ID:{a.id} | {v.marca} {v.modelo} ({v.ano}) | Anunciante: {getattr(a.anunciante, "nome", "Desconhecido")}')
 
-        def aprovar():
-            sel = lb.curselection()
-            if not sel:
-                return
-            text = lb.get(sel[0])
-            aid = int(text.split('|')[0].replace('ID:', '').strip())
-            from repository import AnuncioRepository
-            anuncio_repo = AnuncioRepository()
-            anuncio = anuncio_repo.buscar_por_id(aid)
-            if anuncio:
-                anuncio_repo.atualizar_status(aid, 'Aprovado')
-                messagebox.showinfo('Admin', 'Anúncio aprovado.')
-                top.destroy()
-            else:
-                messagebox.showerror('Erro', 'Anúncio não encontrado.')
+        def carregar():
+            lb.delete(0, 'end')
+            for a in main.anuncio_repo.listar_por_status('Pendente'):
+                v = a.veiculo
+                lb.insert('end', f'ID:{a.id} | {v.marca} {v.modelo} ({v.ano}) | Anunciante: {getattr(a.anunciante, "nome", "Desconhecido")}')
 
-        def rejeitar():
-            sel = lb.curselection()
-            if not sel:
+        def ids_selecionados():
+            return [int(lb.get(i).split('|')[0].replace('ID:', '').strip()) for i in lb.curselection()]
+
+        def moderar(novo_status):
+            ids = ids_selecionados()
+            if not ids:
                 return
-            text = lb.get(sel[0])
-            aid = int(text.split('|')[0].replace('ID:', '').strip())
-            from repository import AnuncioRepository
-            anuncio_repo = AnuncioRepository()
-            anuncio = anuncio_repo.buscar_por_id(aid)
-            if anuncio:
-                anuncio_repo.atualizar_status(aid, 'Rejeitado')
-                messagebox.showinfo('Admin', 'Anúncio rejeitado.')
-                top.destroy()
-            else:
-                messagebox.showerror('Erro', 'Anúncio não encontrado.')
+            alterados = main.anuncio_repo.atualizar_status_em_lote(ids, novo_status, 'Pendente')
+            messagebox.showinfo('Admin', f'{len(alterados)} anúncio(s) {novo_status.lower()}(s).')
+            carregar()
+
+        def aprovar_filtro():
+            filtro = filtro_entry.get().strip()
+            descricao = f" que casam com '{filtro}'" if filtro else ""
+            if not messagebox.askyesno('Admin', f'Aprovar todos os anúncios pendentes{descricao}?'):
+                return
+            alterados = main.anuncio_repo.atualizar_status_por_filtro('Aprovado', filtro)
+            messagebox.showinfo('Admin', f'{len(alterados)} anúncio(s) aprovado(s).')
+            carregar()
+
+        carregar()
 
-        tk.Button(top, text='Aprovar selecionado', command=aprovar).pack(side='left', padx=8, pady=6)
-        tk.Button(top, text='Rejeitar selecionado', command=rejeitar).pack(side='left', padx=8, pady=6)
+        tk.Button(top, text='Aprovar selecionados', command=lambda: moderar('Aprovado')).pack(side='left', padx=8, pady=6)
+        tk.Button(top, text='Rejeitar selecionados', command=lambda: moderar('Rejeitado')).pack(side='left', padx=8, pady=6)
+        filtro_entry = tk.Entry(top, width=30)
+        filtro_entry.pack(side='left', padx=8, pady=6)
+        tk.Button(top, text='Aprovar todos do filtro', command=aprovar_filtro).pack(side='left', padx=8, pady=6)
 
 
 def main_gui():
     root = tk.Tk()
     # App será em tela inteira
     app = App(root)
-    root.mainloop()
+    db = main.Database()
+    print(f"⚙️  Perfil do banco: {db.profile.descricao()}")
+    # Uma sessão por janela: cada registro vira um único objeto em memória
+    try:
+        with db.session():
+            root.mainloop()
+    finally:
+        if '--stats' in sys.argv:
+            print("\n📈 Consultas ao banco (por tempo total):")
+            print(db.instrumentation.relatorio())
 
 
 if __name__ == '__main__':
@@ -5,6 +5,8 @@ from models.User import Usuario
 from models.Vehicle import Veiculo
 from models.Client import Cliente
 from typing import List
+import sys
+import time
 from repository import (
     UsuarioRepository, 
     VeiculoRepository, 
@@ -12,12 +14,14 @@ from repository import (
     ClienteRepository
 )
 from database import Database
+from moderacao import FilaModeracao
 
 # Inicializar repositórios
 usuario_repo = UsuarioRepository()
 veiculo_repo = VeiculoRepository()
 anuncio_repo = AnuncioRepository()
 cliente_repo = ClienteRepository()
+fila_moderacao = FilaModeracao()
 
 
 # =============================================================================
@@ -28,19 +32,74 @@ class VirtualList:
     """
     Lista virtual que se comporta como uma lista mas delega para repositórios.
     Isso mantém compatibilidade com a interface existente enquanto usa banco de dados.
+    
+    Nada é carregado por inteiro: len() usa SELECT COUNT(*), a iteração é
+    feita em streaming (iter_todos) e o acesso por índice/fatia busca apenas
+    as páginas necessárias. Contagem e páginas ficam num snapshot que expira
+    após `ttl` segundos ou em qualquer escrita no banco.
     """
-    def __init__(self, repo, list_method):
+    def __init__(self, repo, list_method, count_method='contar', iter_method='iter_todos',
+                 page_size=100, ttl=2.0):
         self.repo = repo
         self.list_method = list_method
+        self.count_method = count_method
+        self.iter_method = iter_method
+        self.page_size = page_size
+        self.ttl = ttl
+        self._versao = None
+        self._criado_em = 0.0
+        self._tamanho = None
+        self._paginas = {}
+    
+    def _snapshot(self):
+        # Descarta o snapshot se houve escrita no banco (deste ou de outro
+        # processo) ou se expirou
+        self.repo.db.check_changes()
+        versao = self.repo.db.write_version
+        agora = time.monotonic()
+        if versao != self._versao or agora - self._criado_em > self.ttl:
+            self._versao = versao
+            self._criado_em = agora
+            self._tamanho = None
+            self._paginas = {}
+    
+    def _pagina(self, numero):
+        self._snapshot()
+        if numero not in self._paginas:
+            listar = getattr(self.repo, self.list_method)
+            anterior = self._paginas.get(numero - 1)
+            if anterior:
+                # Janela por chave: continua do último id da página anterior
+                itens = listar(after_id=anterior[-1].id, limit=self.page_size)
+            else:
+                itens = listar(limit=self.page_size, offset=numero * self.page_size)
+            self._paginas[numero] = itens
+        return self._paginas[numero]
     
     def __iter__(self):
-        return iter(getattr(self.repo, self.list_method)())
+        return iter(getattr(self.repo, self.iter_method)())
     
     def __len__(self):
-        return len(getattr(self.repo, self.list_method)())
+        self._snapshot()
+        if self._tamanho is None:
+            self._tamanho = getattr(self.repo, self.count_method)()
+        return self._tamanho
+    
+    def __bool__(self):
+        return len(self) > 0
     
     def __getitem__(self, index):
-        return getattr(self.repo, self.list_method)()[index]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("índice fora do intervalo")
+        pagina = self._pagina(index // self.page_size)
+        try:
+            return pagina[index % self.page_size]
+        except IndexError:
+            raise IndexError("índice fora do intervalo") from None
     
     def append(self, item):
         # Não faz nada - items já são salvos pelas funções Create*
@@ -193,16 +252,7 @@ def search_announcements(current_user):
         return
     filtro = _input("Filtro (marca/modelo): ").strip()
     
-    # Salvar pesquisa no histórico
-    if hasattr(current_user, 'id'):
-        cliente_repo.salvar_pesquisa(current_user.id, filtro)
-    
-    # Buscar veículos no banco
-    veiculos_encontrados = veiculo_repo.buscar(filtro)
-    
-    # Buscar anúncios aprovados desses veículos
-    todos_anuncios = anuncio_repo.listar_por_status("Aprovado")
-    resultados = [a for a in todos_anuncios if a.veiculo.id in [v.id for v in veiculos_encontrados]]
+    resultados = BuscarAnuncios(current_user, filtro)
     
     if not resultados:
         print("Nenhum anúncio encontrado.")
@@ -230,9 +280,11 @@ def admin_manage_flow(current_user):
     while True:
         print("\n--- Painel do Admin ---")
         print("1. Listar anúncios pendentes")
-        print("2. Aprovar anúncio")
-        print("3. Rejeitar anúncio")
+        print("2. Aprovar anúncios (um ou mais IDs)")
+        print("3. Rejeitar anúncios (um ou mais IDs)")
         print("4. Gerenciar usuários (listar/excluir)")
+        print("5. Aprovar todos os pendentes que casam com um filtro")
+        print("6. Moderar um lote da fila (reservado só para você)")
         print("0. Voltar")
         op = _input("Escolha: ").strip()
         if op == '1':
@@ -243,22 +295,27 @@ def admin_manage_flow(current_user):
                 v = a.veiculo
                 print(f"ID:{a.id} | {v.marca} {v.modelo} ({v.ano})")
         elif op in ('2', '3'):
-            id_str = _input("ID do anúncio: ").strip()
-            try:
-                aid = int(id_str)
-            except Exception:
+            ids = _parse_ids(_input("IDs dos anúncios (separados por vírgula ou espaço): "))
+            if not ids:
                 print("ID inválido.")
                 continue
-            anuncio = anuncio_repo.buscar_por_id(aid)
-            if not anuncio:
-                print("Anúncio não encontrado.")
+            novo_status = 'Aprovado' if op == '2' else 'Rejeitado'
+            alterados = anuncio_repo.atualizar_status_em_lote(ids, novo_status)
+            print(f"{len(alterados)} anúncio(s) {novo_status.lower()}(s).")
+            ignorados = sorted(set(ids) - set(alterados))
+            if ignorados:
+                print(f"Não encontrados ou já {novo_status.lower()}s: {', '.join(map(str, ignorados))}")
+        elif op == '5':
+            filtro = _input("Filtro de marca/modelo (vazio = todos os pendentes): ").strip()
+            descricao = f" que casam com '{filtro}'" if filtro else ""
+            confirma = _input(f"Aprovar todos os anúncios pendentes{descricao}? (s/N): ").strip().lower()
+            if confirma != 's':
+                print("Operação cancelada.")
                 continue
-            if op == '2':
-                anuncio_repo.atualizar_status(aid, 'Aprovado')
-                print("Anúncio aprovado.")
-            else:
-                anuncio_repo.atualizar_status(aid, 'Rejeitado')
-                print("Anúncio rejeitado.")
+            alterados = anuncio_repo.atualizar_status_por_filtro('Aprovado', filtro)
+            print(f"{len(alterados)} anúncio(s) aprovado(s).")
+        elif op == '6':
+            moderar_lote_da_fila(current_user)
         elif op == '4':
             print("Usuários cadastrados:")
             usuarios = usuario_repo.listar_todos()
@@ -279,6 +336,37 @@ def admin_manage_flow(current_user):
         else:
             print("Opção inválida.")
 
+def moderar_lote_da_fila(current_user):
+    # Reserva um lote da fila; outros admins não veem esses anúncios até a
+    # reserva ser concluída, liberada ou expirar
+    lote = fila_moderacao.reivindicar(current_user.id, quantidade=10)
+    if not lote:
+        print("Fila de moderação vazia.")
+        return
+    minutos = fila_moderacao.duracao / 60
+    print(f"Lote reservado por {minutos:.0f} minuto(s):")
+    for a in lote:
+        v = a.veiculo
+        print(f"ID:{a.id} | {a.dataPublicacao} | {v.marca} {v.modelo} ({v.ano})")
+    try:
+        for novo_status, rotulo in (('Aprovado', 'aprovar'), ('Rejeitado', 'rejeitar')):
+            ids = _parse_ids(_input(f"IDs para {rotulo} (vazio = nenhum): "))
+            if ids:
+                alterados = fila_moderacao.concluir(current_user.id, ids, novo_status)
+                print(f"{len(alterados)} anúncio(s) {novo_status.lower()}(s).")
+    finally:
+        # O que não foi moderado volta para a fila
+        devolvidos = fila_moderacao.liberar(current_user.id)
+        if devolvidos:
+            print(f"{len(devolvidos)} anúncio(s) devolvido(s) à fila.")
+
+def _parse_ids(texto: str) -> List[int]:
+    # "1, 2 3" -> [1, 2, 3]; retorna [] se algum valor não for um número
+    partes = texto.replace(',', ' ').split()
+    if not all(p.isdigit() for p in partes):
+        return []
+    return [int(p) for p in partes]
+
 def Login(email, senha):
     # Retorna o objeto de usuário quando login bem-sucedido, senão None
     resultado = usuario_repo.buscar_por_email(email)
@@ -293,6 +381,13 @@ def Login(email, senha):
     
     return None
     
+def BuscarAnuncios(cliente, filtro, limit=None, offset=0) -> List[Anuncio]:
+    # Salvar pesquisa no histórico
+    if hasattr(cliente, 'id'):
+        cliente_repo.salvar_pesquisa(cliente.id, filtro)
+    # Anúncios aprovados cujo veículo casa com o filtro (uma única consulta)
+    return anuncio_repo.buscar_aprovados(filtro, limit=limit, offset=offset)
+
 def AnuncianteCriarAnuncio(anunciante, carro):
     a = anunciante.criarAnuncio(carro)
     # Salvar no banco de dados
@@ -482,6 +577,7 @@ def main():
 if __name__ == '__main__':
     # Inicializar banco de dados se não existir
     db = Database()
+    print(f"⚙️  Perfil do banco: {db.profile.descricao()}")
     try:
         db.create_tables()
         # Verificar se admin existe
@@ -493,5 +589,12 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"Erro ao conectar ao banco: {e}")
     
-    main()
+    # Uma sessão por execução: cada registro vira um único objeto em memória
+    try:
+        with db.session():
+            main()
+    finally:
+        if '--stats' in sys.argv:
+            print("\n📈 Consultas ao banco (por tempo total):")
+            print(db.instrumentation.relatorio())
 
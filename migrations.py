@@ -0,0 +1,478 @@
+"""
+Migrações versionadas do esquema do banco de dados.
+
+A versão do esquema fica gravada no próprio arquivo SQLite, em
+``PRAGMA user_version``. Cada migração é aplicada uma única vez, em ordem
+crescente de versão e dentro de uma transação própria: se falhar, o banco
+permanece na versão anterior.
+
+Para alterar o esquema, acrescente uma nova função ao final de MIGRACOES;
+nunca altere uma migração já publicada.
+"""
+
+import sqlite3
+from typing import Callable, List, Tuple
+
+
+def _v1_esquema_inicial(db):
+    """Tabelas originais do sistema (idempotente para bancos legados)."""
+    
+    # Tabela de Usuários
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cpf TEXT NOT NULL UNIQUE,
+            nome TEXT NOT NULL,
+            email TEXT NOT NULL UNIQUE,
+            senha TEXT NOT NULL,
+            tipo TEXT NOT NULL CHECK(tipo IN ('admin', 'anunciante', 'cliente')),
+            logado INTEGER DEFAULT 0
+        )
+    """)
+    
+    # Tabela de Admins (campos específicos)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS admins (
+            usuario_id INTEGER PRIMARY KEY,
+            admin_id INTEGER NOT NULL UNIQUE,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Tabela de Anunciantes (campos específicos)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS anunciantes (
+            usuario_id INTEGER PRIMARY KEY,
+            telefone TEXT NOT NULL,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Tabela de Clientes (campos específicos)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS clientes (
+            usuario_id INTEGER PRIMARY KEY,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Tabela de Histórico de Pesquisas
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS historico_pesquisas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL,
+            filtro TEXT NOT NULL,
+            data_pesquisa TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(usuario_id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Tabela de Veículos
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS veiculos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            marca TEXT NOT NULL,
+            modelo TEXT NOT NULL,
+            ano INTEGER NOT NULL,
+            preco REAL NOT NULL,
+            quilometragem INTEGER NOT NULL,
+            anunciante_id INTEGER,
+            FOREIGN KEY (anunciante_id) REFERENCES anunciantes(usuario_id) ON DELETE SET NULL
+        )
+    """)
+    
+    # Tabela de Anúncios
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS anuncios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_publicacao TEXT NOT NULL,
+            status TEXT NOT NULL CHECK(status IN ('Pendente', 'Aprovado', 'Rejeitado')),
+            veiculo_id INTEGER NOT NULL UNIQUE,
+            anunciante_id INTEGER NOT NULL,
+            FOREIGN KEY (veiculo_id) REFERENCES veiculos(id) ON DELETE CASCADE,
+            FOREIGN KEY (anunciante_id) REFERENCES anunciantes(usuario_id) ON DELETE CASCADE
+        )
+    """)
+
+
+def _v2_indices(db):
+    """Índices secundários usados pelos repositórios."""
+    
+    # Filtros por status/anunciante (listar_por_status, listar_por_anunciante)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_anuncios_status ON anuncios(status)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_anuncios_anunciante ON anuncios(anunciante_id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_anunciante ON veiculos(anunciante_id)")
+    
+    # Histórico do cliente já na ordem de exibição
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_historico_cliente
+        ON historico_pesquisas(cliente_id, data_pesquisa)
+    """)
+    
+    # Busca por marca/modelo
+    db.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_marca_modelo ON veiculos(marca, modelo)")
+    
+    # Índices parciais: vitrine de aprovados e fila de pendentes, ambos
+    # ordenados por data de publicação. O de aprovados cobre as colunas
+    # usadas no join, dispensando a leitura da tabela.
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_anuncios_aprovados_data
+        ON anuncios(data_publicacao, veiculo_id, anunciante_id)
+        WHERE status = 'Aprovado'
+    """)
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_anuncios_pendentes_data
+        ON anuncios(data_publicacao)
+        WHERE status = 'Pendente'
+    """)
+
+
+def _v3_busca_textual(db):
+    """
+    Índice FTS5 sobre marca/modelo, sincronizado por triggers.
+    
+    Se o SQLite não tiver sido compilado com FTS5, a migração não cria nada e
+    VeiculoRepository.buscar continua usando LIKE.
+    """
+    try:
+        db.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS veiculos_fts USING fts5(
+                marca, modelo,
+                content='veiculos', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"⚠️  FTS5 indisponível, busca textual usará LIKE: {e}")
+        return
+    
+    db.execute("""
+        CREATE TRIGGER IF NOT EXISTS veiculos_fts_ai AFTER INSERT ON veiculos BEGIN
+            INSERT INTO veiculos_fts (rowid, marca, modelo)
+            VALUES (new.id, new.marca, new.modelo);
+        END
+    """)
+    db.execute("""
+        CREATE TRIGGER IF NOT EXISTS veiculos_fts_ad AFTER DELETE ON veiculos BEGIN
+            INSERT INTO veiculos_fts (veiculos_fts, rowid, marca, modelo)
+            VALUES ('delete', old.id, old.marca, old.modelo);
+        END
+    """)
+    db.execute("""
+        CREATE TRIGGER IF NOT EXISTS veiculos_fts_au AFTER UPDATE OF marca, modelo ON veiculos BEGIN
+            INSERT INTO veiculos_fts (veiculos_fts, rowid, marca, modelo)
+            VALUES ('delete', old.id, old.marca, old.modelo);
+            INSERT INTO veiculos_fts (rowid, marca, modelo)
+            VALUES (new.id, new.marca, new.modelo);
+        END
+    """)
+    
+    # Indexa os veículos já existentes
+    db.execute("INSERT INTO veiculos_fts (veiculos_fts) VALUES ('rebuild')")
+
+
+def _v4_indices_busca_filtrada(db):
+    """Índices compostos para a busca por faixas (preço, ano, km) e marca."""
+    
+    # Marca (IN) + faixa/ordenação de preço
+    db.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_marca_preco ON veiculos(marca, preco)")
+    # Faixa/ordenação de preço sem marca
+    db.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_preco ON veiculos(preco)")
+    # Faixa de ano, com o preço disponível no próprio índice
+    db.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_ano_preco ON veiculos(ano, preco)")
+    # Quilometragem máxima
+    db.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_km ON veiculos(quilometragem)")
+
+
+def _v5_indice_tipo_usuario(db):
+    """Índice para listar usuários por tipo em ordem de id (paginação)."""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_usuarios_tipo ON usuarios(tipo)")
+
+
+def _v6_registro_alteracoes(db):
+    """
+    Contador de alterações por tabela, mantido por gatilhos.
+    
+    Permite que outros processos descubram, com uma leitura barata, quais
+    tabelas mudaram desde a última verificação (veja alteracoes.py).
+    """
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS alteracoes (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    
+    for tabela in ('usuarios', 'admins', 'anunciantes', 'veiculos', 'anuncios'):
+        db.execute("INSERT OR IGNORE INTO alteracoes (tabela) VALUES (?)", (tabela,))
+        for operacao in ('INSERT', 'UPDATE', 'DELETE'):
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS alteracoes_{tabela}_{operacao.lower()}
+                AFTER {operacao} ON {tabela} BEGIN
+                    UPDATE alteracoes SET versao = versao + 1 WHERE tabela = '{tabela}';
+                END
+            """)
+
+
+def _v7_importacoes(db):
+    """Pontos de retomada das importações de catálogo (importador.py)."""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS importacoes (
+            arquivo TEXT PRIMARY KEY,
+            linhas_processadas INTEGER NOT NULL DEFAULT 0,
+            importadas INTEGER NOT NULL DEFAULT 0,
+            rejeitadas INTEGER NOT NULL DEFAULT 0,
+            concluida INTEGER NOT NULL DEFAULT 0,
+            atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _v8_fila_moderacao(db):
+    """Reservas (leases) da fila de moderação (moderacao.py)."""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS moderacao_leases (
+            anuncio_id INTEGER PRIMARY KEY,
+            admin_id INTEGER NOT NULL,
+            expira_em REAL NOT NULL,
+            FOREIGN KEY (anuncio_id) REFERENCES anuncios(id) ON DELETE CASCADE
+        )
+    """)
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_moderacao_leases_admin
+        ON moderacao_leases(admin_id, expira_em)
+    """)
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_moderacao_leases_expira
+        ON moderacao_leases(expira_em)
+    """)
+
+
+# Colunas de estatisticas_marca: (prefixo, coluna de veiculos, tipo de mínimo/máximo)
+_CAMPOS_MARCA = (('preco', 'preco', 'REAL'), ('km', 'quilometragem', 'INTEGER'),
+                 ('ano', 'ano', 'INTEGER'))
+
+
+def _contar(tabela: str, valor: str, delta: str) -> str:
+    """Comando de gatilho que soma ``delta`` ao contador (tabela, valor)."""
+    return f"""
+        INSERT INTO contagens (tabela, valor, total) VALUES ('{tabela}', {valor}, {delta})
+        ON CONFLICT (tabela, valor) DO UPDATE SET total = total + excluded.total;"""
+
+
+def _somar_veiculo_marca() -> str:
+    """Comando de gatilho que acrescenta NEW às estatísticas da marca."""
+    colunas = ", ".join(f"{p}_soma, {p}_soma_q, {p}_min, {p}_max" for p, _, _ in _CAMPOS_MARCA)
+    valores = ", ".join(f"new.{c}, new.{c} * new.{c}, new.{c}, new.{c}" for _, c, _ in _CAMPOS_MARCA)
+    atualizacoes = ",\n            ".join(
+        f"{p}_soma = {p}_soma + excluded.{p}_soma, "
+        f"{p}_soma_q = {p}_soma_q + excluded.{p}_soma_q, "
+        f"{p}_min = MIN({p}_min, excluded.{p}_min), "
+        f"{p}_max = MAX({p}_max, excluded.{p}_max)"
+        for p, _, _ in _CAMPOS_MARCA)
+    return f"""
+        INSERT INTO estatisticas_marca (marca, veiculos, {colunas})
+        VALUES (new.marca, 1, {valores})
+        ON CONFLICT (marca) DO UPDATE SET veiculos = veiculos + 1,
+            {atualizacoes};"""
+
+
+def _subtrair_veiculo_marca() -> str:
+    """
+    Comandos de gatilho que retiram OLD das estatísticas da marca.
+    
+    Somas são apenas decrementadas; mínimo e máximo só são relidos da tabela
+    quando o valor removido era um deles.
+    """
+    somas = ", ".join(f"{p}_soma = {p}_soma - old.{c}, {p}_soma_q = {p}_soma_q - old.{c} * old.{c}"
+                      for p, c, _ in _CAMPOS_MARCA)
+    comandos = [f"""
+        UPDATE estatisticas_marca SET veiculos = veiculos - 1, {somas}
+        WHERE marca = old.marca;
+        DELETE FROM estatisticas_marca WHERE marca = old.marca AND veiculos <= 0;"""]
+    for p, c, _ in _CAMPOS_MARCA:
+        comandos.append(f"""
+        UPDATE estatisticas_marca
+        SET {p}_min = (SELECT MIN({c}) FROM veiculos WHERE marca = old.marca),
+            {p}_max = (SELECT MAX({c}) FROM veiculos WHERE marca = old.marca)
+        WHERE marca = old.marca AND (old.{c} <= {p}_min OR old.{c} >= {p}_max);""")
+    return "".join(comandos)
+
+
+def _v9_estatisticas(db):
+    """
+    Tabelas de resumo para as estatísticas (estatisticas.py), mantidas por gatilhos.
+    
+    ``contagens`` guarda usuários por tipo, anúncios por status e o total de
+    veículos; ``estatisticas_marca`` guarda, por marca, quantidade, soma, soma
+    dos quadrados, mínimo e máximo de preço, quilometragem e ano. Os painéis
+    leem poucas linhas, qualquer que seja o tamanho das tabelas.
+    """
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS contagens (
+            tabela TEXT NOT NULL,
+            valor TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (tabela, valor)
+        ) WITHOUT ROWID
+    """)
+    colunas = ",\n            ".join(
+        f"{p}_soma REAL NOT NULL, {p}_soma_q REAL NOT NULL, {p}_min {tipo}, {p}_max {tipo}"
+        for p, _, tipo in _CAMPOS_MARCA)
+    db.execute(f"""
+        CREATE TABLE IF NOT EXISTS estatisticas_marca (
+            marca TEXT PRIMARY KEY,
+            veiculos INTEGER NOT NULL,
+            {colunas}
+        )
+    """)
+    
+    # Contadores por tipo de usuário e status de anúncio
+    for tabela, coluna in (('usuarios', 'tipo'), ('anuncios', 'status')):
+        db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS contagens_{tabela}_insert
+            AFTER INSERT ON {tabela} BEGIN{_contar(tabela, f'new.{coluna}', 1)}
+            END
+        """)
+        db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS contagens_{tabela}_delete
+            AFTER DELETE ON {tabela} BEGIN{_contar(tabela, f'old.{coluna}', -1)}
+            END
+        """)
+        db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS contagens_{tabela}_update
+            AFTER UPDATE OF {coluna} ON {tabela}
+            WHEN old.{coluna} IS NOT new.{coluna} BEGIN{_contar(tabela, f'old.{coluna}', -1)}{_contar(tabela, f'new.{coluna}', 1)}
+            END
+        """)
+    
+    # Total de veículos e estatísticas por marca
+    db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS estatisticas_veiculos_insert
+        AFTER INSERT ON veiculos BEGIN{_contar('veiculos', "''", 1)}{_somar_veiculo_marca()}
+        END
+    """)
+    db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS estatisticas_veiculos_delete
+        AFTER DELETE ON veiculos BEGIN{_contar('veiculos', "''", -1)}{_subtrair_veiculo_marca()}
+        END
+    """)
+    db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS estatisticas_veiculos_update
+        AFTER UPDATE OF marca, preco, quilometragem, ano ON veiculos
+        WHEN old.marca IS NOT new.marca OR old.preco IS NOT new.preco
+          OR old.quilometragem IS NOT new.quilometragem OR old.ano IS NOT new.ano
+        BEGIN{_subtrair_veiculo_marca()}{_somar_veiculo_marca()}
+        END
+    """)
+    
+    # Dados já existentes, em uma passada agrupada por tabela
+    recalcular_estatisticas(db)
+
+
+def recalcular_estatisticas(db):
+    """
+    Refaz as tabelas de resumo a partir dos dados (consultas agrupadas).
+    
+    Usada pela migração 9 e para corrigir os resumos caso as tabelas tenham
+    sido alteradas com os gatilhos desativados.
+    """
+    db.execute("DELETE FROM contagens")
+    # Os valores possíveis sempre aparecem, mesmo com total zero
+    for tipo in ('admin', 'anunciante', 'cliente'):
+        db.execute("INSERT INTO contagens VALUES ('usuarios', ?, 0)", (tipo,))
+    for status in ('Pendente', 'Aprovado', 'Rejeitado'):
+        db.execute("INSERT INTO contagens VALUES ('anuncios', ?, 0)", (status,))
+    for tabela, coluna in (('usuarios', 'tipo'), ('anuncios', 'status')):
+        db.execute(f"""
+            INSERT OR REPLACE INTO contagens (tabela, valor, total)
+            SELECT '{tabela}', {coluna}, COUNT(*) FROM {tabela} GROUP BY {coluna}
+        """)
+    db.execute("""
+        INSERT INTO contagens (tabela, valor, total)
+        SELECT 'veiculos', '', COUNT(*) FROM veiculos
+    """)
+    
+    db.execute("DELETE FROM estatisticas_marca")
+    colunas = ", ".join(f"{p}_soma, {p}_soma_q, {p}_min, {p}_max" for p, _, _ in _CAMPOS_MARCA)
+    agregados = ", ".join(f"SUM({c}), SUM({c} * {c}), MIN({c}), MAX({c})" for _, c, _ in _CAMPOS_MARCA)
+    db.execute(f"""
+        INSERT INTO estatisticas_marca (marca, veiculos, {colunas})
+        SELECT marca, COUNT(*), {agregados} FROM veiculos GROUP BY marca
+    """)
+
+
+def _v10_indices_por_data(db):
+    """
+    Troca os índices parciais por data de publicação (migração 2) por um
+    índice (status, data_publicacao).
+    
+    Sem estatísticas (ANALYZE), o planejador prefere a igualdade em
+    idx_anuncios_status e ordena o resultado em uma árvore B temporária, e
+    os índices parciais nunca eram usados. Com o status na frente, a
+    igualdade e a ordenação (data_publicacao e id, nos dois sentidos) saem
+    do mesmo índice: vitrine de aprovados, busca por mais recentes e a fila
+    de moderação dos pendentes.
+    
+    Remove também idx_veiculos_marca_modelo: a busca textual usa o FTS5
+    (migração 3) e o filtro por marca usa idx_veiculos_marca_preco.
+    """
+    db.execute("DROP INDEX IF EXISTS idx_anuncios_aprovados_data")
+    db.execute("DROP INDEX IF EXISTS idx_anuncios_pendentes_data")
+    db.execute("DROP INDEX IF EXISTS idx_veiculos_marca_modelo")
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_anuncios_status_data
+        ON anuncios(status, data_publicacao)
+    """)
+
+
+# (versão, descrição, função) em ordem crescente de versão
+MIGRACOES: List[Tuple[int, str, Callable]] = [
+    (1, "esquema inicial", _v1_esquema_inicial),
+    (2, "índices secundários", _v2_indices),
+    (3, "busca textual FTS5", _v3_busca_textual),
+    (4, "índices da busca filtrada", _v4_indices_busca_filtrada),
+    (5, "índice de usuários por tipo", _v5_indice_tipo_usuario),
+    (6, "registro de alterações por tabela", _v6_registro_alteracoes),
+    (7, "pontos de retomada das importações", _v7_importacoes),
+    (8, "fila de moderação com reservas", _v8_fila_moderacao),
+    (9, "tabelas de resumo das estatísticas", _v9_estatisticas),
+    (10, "índice de anúncios por status e data", _v10_indices_por_data),
+]
+
+
+def versao_atual(db) -> int:
+    """Retorna a versão do esquema gravada no banco."""
+    row = db.fetch_one("PRAGMA user_version")
+    return row[0]
+
+
+def aplicar_migracoes(db, alvo: int = None) -> List[int]:
+    """
+    Aplica as migrações pendentes.
+    
+    Args:
+        db: Instância de Database.
+        alvo: Versão máxima a aplicar (padrão: a mais recente).
+        
+    Returns:
+        List[int]: Versões aplicadas nesta chamada.
+    """
+    aplicadas = []
+    
+    for versao, descricao, migracao in MIGRACOES:
+        if alvo is not None and versao > alvo:
+            break
+        
+        with db.transaction():
+            # Relida dentro da transação: outro processo pode ter migrado antes
+            if versao <= versao_atual(db):
+                continue
+            migracao(db)
+            db.execute(f"PRAGMA user_version = {versao}")
+        
+        aplicadas.append(versao)
+        print(f"✓ Migração {versao} aplicada: {descricao}")
+    
+    return aplicadas
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Callable, List, Optional
 from models.Vehicle import Veiculo
 from models.User import Usuario
 
@@ -10,13 +10,19 @@ class Cliente(Usuario):
         super().__init__(Cliente._proximo_id, cpf, nome, email, senha)
         Cliente._proximo_id += 1
         self._historicoPesquisas: List[str] = []
+        # Carregador opcional do histórico, executado no primeiro acesso
+        self._carregarHistorico: Optional[Callable[[], List[str]]] = None
 
     @property
     def historicoPesquisas(self) -> List[str]:
+        if self._carregarHistorico is not None:
+            self._historicoPesquisas = self._carregarHistorico()
+            self._carregarHistorico = None
         return self._historicoPesquisas
 
     @historicoPesquisas.setter
     def historicoPesquisas(self, valor: List[str]):
+        self._carregarHistorico = None
         self._historicoPesquisas = valor
 
     def buscarVeiculos(self, filtro: str, listaVeiculos: List[Veiculo]) -> List[Veiculo]:
@@ -24,7 +30,7 @@ class Cliente(Usuario):
         Busca veículos cujo modelo ou marca contenha o filtro.
         Também salva o filtro no histórico.
         """
-        self._historicoPesquisas.append(filtro)
+        self.historicoPesquisas.append(filtro)
 
         resultado = [
             v for v in listaVeiculos
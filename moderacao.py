@@ -0,0 +1,201 @@
+"""
+Fila de moderação compartilhada entre vários administradores.
+
+Em vez de todos olharem o início de ``listar_por_status('Pendente')``, cada
+admin reserva (lease) um lote de anúncios pendentes por um tempo limitado.
+Anúncios reservados não aparecem para os outros admins; se a reserva expirar
+sem que o anúncio seja moderado, ele volta para a fila.
+
+Reservar, concluir e liberar são transações curtas (BEGIN IMMEDIATE), então
+são atômicas mesmo entre processos diferentes, e a moderação em si acontece
+fora delas: quanto mais moderadores, mais anúncios processados.
+
+Exemplo:
+    fila = FilaModeracao()
+    lote = fila.reivindicar(admin.id, quantidade=20)
+    fila.concluir(admin.id, [a.id for a in lote if ok(a)], 'Aprovado')
+    fila.liberar(admin.id)   # devolve o que sobrou
+"""
+
+import json
+import time
+from typing import List, Optional
+
+from database import Database
+from models.Advertisement import Anuncio
+from repository import AnuncioRepository
+
+
+class FilaModeracao:
+    """
+    Fila de anúncios pendentes com reservas por tempo limitado.
+
+    Attributes:
+        duracao: Duração de cada reserva, em segundos.
+    """
+
+    def __init__(self, duracao: float = 300.0):
+        """
+        Args:
+            duracao: Duração das reservas, em segundos (padrão: 5 minutos).
+        """
+        self.db = Database()
+        self.anuncio_repo = AnuncioRepository()
+        self.duracao = duracao
+
+    def reivindicar(self, admin_id: int, quantidade: int = 10) -> List[Anuncio]:
+        """
+        Reserva até ``quantidade`` anúncios pendentes para o admin.
+
+        As reservas ainda válidas do próprio admin são renovadas e contam no
+        total; o restante vem da fila, dos mais antigos (data_publicacao)
+        para os mais novos.
+
+        Args:
+            admin_id: ID (usuário) do administrador.
+            quantidade: Tamanho máximo do lote.
+
+        Returns:
+            List[Anuncio]: Anúncios reservados, na ordem da fila.
+        """
+        agora = time.time()
+        expira_em = agora + self.duracao
+
+        with self.db.transaction():
+            # Reservas vencidas voltam para a fila (idx_moderacao_leases_expira)
+            self.db.execute("""
+                DELETE FROM moderacao_leases WHERE expira_em <= ?
+            """, (agora,))
+            # Reservas do admin cujo anúncio já foi moderado por outro caminho
+            # (idx_moderacao_leases_admin + chave primária de anuncios); as
+            # dos outros admins saem quando eles reivindicarem ou vencerem
+            self.db.execute("""
+                DELETE FROM moderacao_leases
+                WHERE admin_id = ?
+                  AND NOT EXISTS (SELECT 1 FROM anuncios a
+                                  WHERE a.id = moderacao_leases.anuncio_id
+                                    AND a.status = 'Pendente')
+            """, (admin_id,))
+
+            renovados = self.db.execute("""
+                UPDATE moderacao_leases SET expira_em = ?
+                WHERE admin_id = ?
+                RETURNING anuncio_id
+            """, (expira_em, admin_id)).fetchall()
+
+            novos = []
+            faltam = quantidade - len(renovados)
+            if faltam > 0:
+                novos = self.db.execute("""
+                    INSERT INTO moderacao_leases (anuncio_id, admin_id, expira_em)
+                    SELECT a.id, ?, ? FROM anuncios a
+                    WHERE a.status = 'Pendente'
+                      AND NOT EXISTS (SELECT 1 FROM moderacao_leases l
+                                      WHERE l.anuncio_id = a.id)
+                    ORDER BY a.data_publicacao, a.id
+                    LIMIT ?
+                    RETURNING anuncio_id
+                """, (admin_id, expira_em, faltam)).fetchall()
+
+            ids = [row[0] for row in renovados] + [row[0] for row in novos]
+            anuncios = self.anuncio_repo.buscar_por_ids(ids)
+
+        return sorted(anuncios, key=lambda a: (a.dataPublicacao, a.id))
+
+    def renovar(self, admin_id: int, ids: Optional[List[int]] = None) -> List[int]:
+        """
+        Estende as reservas válidas do admin (todas, ou só ``ids``).
+
+        Returns:
+            List[int]: IDs cujas reservas foram estendidas.
+        """
+        agora = time.time()
+        condicao, params = self._condicao_ids(ids)
+        with self.db.transaction():
+            rows = self.db.execute(f"""
+                UPDATE moderacao_leases SET expira_em = ?
+                WHERE admin_id = ? AND expira_em > ?{condicao}
+                RETURNING anuncio_id
+            """, (agora + self.duracao, admin_id, agora) + params).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def liberar(self, admin_id: int, ids: Optional[List[int]] = None) -> List[int]:
+        """
+        Devolve à fila as reservas do admin (todas, ou só ``ids``).
+
+        Returns:
+            List[int]: IDs devolvidos.
+        """
+        condicao, params = self._condicao_ids(ids)
+        with self.db.transaction():
+            rows = self.db.execute(f"""
+                DELETE FROM moderacao_leases
+                WHERE admin_id = ?{condicao}
+                RETURNING anuncio_id
+            """, (admin_id,) + params).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def concluir(self, admin_id: int, ids: List[int], novo_status: str) -> List[int]:
+        """
+        Modera anúncios reservados pelo admin e encerra suas reservas.
+
+        Só são alterados os anúncios cuja reserva ainda pertence ao admin e
+        não expirou; os demais (reserva vencida e pega por outro admin, por
+        exemplo) ficam de fora. Tudo acontece em uma única transação.
+
+        Args:
+            admin_id: ID (usuário) do administrador.
+            ids: IDs dos anúncios.
+            novo_status: 'Aprovado' ou 'Rejeitado'.
+
+        Returns:
+            List[int]: IDs que mudaram de status.
+        """
+        if not ids:
+            return []
+        agora = time.time()
+        condicao, params = self._condicao_ids(ids)
+        with self.db.transaction():
+            rows = self.db.execute(f"""
+                DELETE FROM moderacao_leases
+                WHERE admin_id = ? AND expira_em > ?{condicao}
+                RETURNING anuncio_id
+            """, (admin_id, agora) + params).fetchall()
+            return self.anuncio_repo.atualizar_status_em_lote(
+                [row[0] for row in rows], novo_status, status_atual='Pendente')
+
+    def aprovar(self, admin_id: int, ids: List[int]) -> List[int]:
+        """Aprova anúncios reservados pelo admin (veja ``concluir``)."""
+        return self.concluir(admin_id, ids, 'Aprovado')
+
+    def rejeitar(self, admin_id: int, ids: List[int]) -> List[int]:
+        """Rejeita anúncios reservados pelo admin (veja ``concluir``)."""
+        return self.concluir(admin_id, ids, 'Rejeitado')
+
+    def situacao(self) -> dict:
+        """
+        Retorna o tamanho da fila.
+
+        Returns:
+            dict: disponiveis (pendentes sem reserva válida) e reservados.
+        """
+        row = self.db.fetch_one("""
+            SELECT COUNT(*) AS pendentes,
+                   COUNT(l.anuncio_id) AS reservados
+            FROM anuncios a
+            LEFT JOIN moderacao_leases l
+                   ON l.anuncio_id = a.id AND l.expira_em > ?
+            WHERE a.status = 'Pendente'
+        """, (time.time(),))
+        return {
+            'disponiveis': row['pendentes'] - row['reservados'],
+            'reservados': row['reservados'],
+        }
+
+    @staticmethod
+    def _condicao_ids(ids: Optional[List[int]]) -> tuple[str, tuple]:
+        """Filtro opcional por lista de IDs (um único parâmetro JSON)."""
+        if ids is None:
+            return "", ()
+        return (" AND anuncio_id IN (SELECT value FROM json_each(?))",
+                (json.dumps([int(i) for i in ids]),))
@@ -0,0 +1,136 @@
+"""
+Perfis de configuração das conexões SQLite.
+
+Cada perfil reúne os PRAGMAs que afetam desempenho e concorrência, aplicados
+a toda conexão aberta pelos pools de ``Database``:
+
+- ``interativo`` (padrão): CLI e interface gráfica. WAL, para que leitores e
+  o escritor não se bloqueiem, e ``synchronous=NORMAL``, seguro em WAL.
+- ``carga-em-massa``: importações e geração de dados. Cache e mmap maiores e
+  ``synchronous=OFF``: uma queda de energia pode perder (ou corromper) as
+  últimas transações, o que se resolve repetindo a carga.
+- ``somente-leitura``: processos que só consultam (exportação, painéis).
+  Cache e mmap maiores e espera mais longa pelo lock. As conexões são
+  abertas com ``mode=ro`` e ``query_only``, e ``Database.create_tables`` não
+  aplica migrações: o processo nunca escreve no arquivo.
+
+Todos ligam ``foreign_keys``, sem o qual o SQLite ignora os ``ON DELETE
+CASCADE`` do esquema.
+
+O perfil é escolhido pelo argumento ``profile`` de ``Database``, pela
+variável de ambiente ``CATALOGO_DB_PERFIL`` ou, na falta de ambos, pelo
+padrão do programa.
+"""
+
+import os
+import sqlite3
+from typing import Dict, List, Optional
+
+VARIAVEL_AMBIENTE = 'CATALOGO_DB_PERFIL'
+PERFIL_PADRAO = 'interativo'
+
+
+class PerfilConexao:
+    """
+    Conjunto de PRAGMAs aplicado a cada conexão.
+
+    Attributes:
+        nome: Nome do perfil.
+        journal_mode: Modo do journal (persistente no arquivo).
+        synchronous: OFF, NORMAL ou FULL.
+        cache_size: Páginas (positivo) ou KiB (negativo) de cache por conexão.
+        mmap_size: Bytes do arquivo mapeados em memória (0 desliga).
+        temp_store: DEFAULT, FILE ou MEMORY.
+        busy_timeout: Milissegundos de espera por um lock antes de falhar.
+        foreign_keys: Aplica as chaves estrangeiras.
+        somente_leitura: Conexões não escrevem (``query_only``) e o esquema
+            não é migrado.
+    """
+
+    def __init__(self, nome: str, journal_mode: str = 'WAL', synchronous: str = 'NORMAL',
+                 cache_size: int = -32768, mmap_size: int = 256 * 2**20,
+                 temp_store: str = 'MEMORY', busy_timeout: int = 5000,
+                 foreign_keys: bool = True, somente_leitura: bool = False):
+        self.nome = nome
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.temp_store = temp_store
+        self.busy_timeout = busy_timeout
+        self.foreign_keys = foreign_keys
+        self.somente_leitura = somente_leitura
+
+    def pragmas(self, somente_leitura: bool = False) -> List[str]:
+        """
+        Comandos PRAGMA do perfil.
+
+        Args:
+            somente_leitura: Conexão aberta com ``mode=ro``, que não pode
+                mudar o modo do journal.
+        """
+        comandos = []
+        if not somente_leitura and not self.somente_leitura:
+            comandos.append(f"PRAGMA journal_mode = {self.journal_mode}")
+        comandos += [
+            f"PRAGMA synchronous = {self.synchronous}",
+            f"PRAGMA cache_size = {self.cache_size}",
+            f"PRAGMA mmap_size = {self.mmap_size}",
+            f"PRAGMA temp_store = {self.temp_store}",
+            f"PRAGMA busy_timeout = {self.busy_timeout}",
+            f"PRAGMA foreign_keys = {'ON' if self.foreign_keys else 'OFF'}",
+            # Sempre explícito: ao trocar de perfil, a conexão reaproveitada
+            # de um banco em memória precisa voltar a aceitar escritas
+            f"PRAGMA query_only = {'ON' if self.somente_leitura else 'OFF'}",
+        ]
+        return comandos
+
+    def aplicar(self, conn: sqlite3.Connection, somente_leitura: bool = False):
+        """Aplica o perfil a uma conexão recém-aberta."""
+        for comando in self.pragmas(somente_leitura):
+            conn.execute(comando).fetchall()
+
+    def descricao(self) -> str:
+        """Resumo de uma linha, para exibir ao iniciar os programas."""
+        cache = (f"{-self.cache_size // 1024} MiB" if self.cache_size < 0
+                 else f"{self.cache_size} páginas")
+        return (f"{self.nome} (journal={self.journal_mode}, synchronous={self.synchronous}, "
+                f"cache={cache}, mmap={self.mmap_size // 2**20} MiB, "
+                f"temp_store={self.temp_store}, busy_timeout={self.busy_timeout} ms, "
+                f"foreign_keys={'ON' if self.foreign_keys else 'OFF'}, "
+                f"query_only={'ON' if self.somente_leitura else 'OFF'})")
+
+    def __repr__(self) -> str:
+        return f"PerfilConexao({self.descricao()})"
+
+
+PERFIS: Dict[str, PerfilConexao] = {
+    'interativo': PerfilConexao('interativo'),
+    'carga-em-massa': PerfilConexao(
+        'carga-em-massa', synchronous='OFF', cache_size=-262144,
+        mmap_size=1024 * 2**20, busy_timeout=60000),
+    'somente-leitura': PerfilConexao(
+        'somente-leitura', cache_size=-131072, mmap_size=1024 * 2**20,
+        busy_timeout=10000, somente_leitura=True),
+}
+
+
+def obter_perfil(nome: Optional[str] = None, padrao: str = PERFIL_PADRAO) -> PerfilConexao:
+    """
+    Resolve o perfil a usar.
+
+    Args:
+        nome: Perfil pedido explicitamente (tem prioridade).
+        padrao: Perfil usado se nem ``nome`` nem a variável de ambiente
+            estiverem definidos.
+
+    Raises:
+        ValueError: Se o nome não for de um perfil conhecido.
+    """
+    nome = nome or os.environ.get(VARIAVEL_AMBIENTE) or padrao
+    try:
+        return PERFIS[nome]
+    except KeyError:
+        raise ValueError(
+            f"Perfil de conexão desconhecido: {nome} (use {', '.join(PERFIS)})"
+        ) from None
@@ -3,7 +3,11 @@ Camada de repositórios para persistência de dados no banco SQLite.
 Cada classe Repository é responsável pelas operações CRUD de uma entidade.
 """
 
-from typing import List, Optional
+import base64
+import json
+import re
+import sqlite3
+from typing import Callable, Iterator, List, Optional, Union
 from database import Database
 from models.User import Usuario
 from models.Admin import Admin
@@ -13,9 +17,354 @@ from models.Vehicle import Veiculo
 from models.Advertisement import Anuncio
 
 
+class ResultadoBusca:
+    """
+    Resultado de uma busca filtrada.
+    
+    Attributes:
+        itens: Objetos da página pedida (Veiculo ou Anuncio).
+        total: Quantidade total de registros que atendem aos filtros.
+        facetas: Contagens por faceta sobre todos os registros filtrados:
+            {'marca': {marca: n}, 'ano': {início da faixa: n},
+             'preco': {início da faixa: n}}.
+    """
+    
+    def __init__(self, itens: list, total: int, facetas: dict):
+        self.itens = itens
+        self.total = total
+        self.facetas = facetas
+
+
+class Pagina:
+    """
+    Página de uma listagem paginada por chave (keyset).
+    
+    A próxima página é obtida passando ``token`` (ou ``proximo_id``) como
+    ``after_id`` para o mesmo método ``listar_pagina``. Como a consulta
+    continua a partir do último id visto, o custo de cada página não cresce
+    com o tamanho da tabela.
+    
+    Attributes:
+        itens: Objetos desta página, em ordem crescente de id.
+        proximo_id: after_id da próxima página, ou None se esta é a última.
+    """
+    
+    def __init__(self, itens: list, proximo_id: Optional[int]):
+        self.itens = itens
+        self.proximo_id = proximo_id
+    
+    @property
+    def tem_mais(self) -> bool:
+        """Indica se existe uma próxima página."""
+        return self.proximo_id is not None
+    
+    @property
+    def token(self) -> Optional[str]:
+        """Token opaco de continuação, ou None se esta é a última página."""
+        if self.proximo_id is None:
+            return None
+        return base64.urlsafe_b64encode(str(self.proximo_id).encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def decodificar(after_id: Union[int, str, None]) -> Optional[int]:
+        """Aceita um id ou um token de continuação e retorna o id."""
+        if after_id is None or isinstance(after_id, int):
+            return after_id
+        try:
+            padding = "=" * (-len(after_id) % 4)
+            return int(base64.urlsafe_b64decode(after_id + padding).decode())
+        except ValueError:
+            raise ValueError(f"Token de paginação inválido: {after_id}") from None
+
+
+class ResultadoLote:
+    """
+    Resultado de uma gravação em lote (``salvar_muitos``).
+    
+    Attributes:
+        ids: IDs atribuídos, na ordem de entrada; None nas posições que
+            falharam.
+        erros: Lista de (posição na entrada, mensagem do SQLite) das linhas
+            rejeitadas por alguma restrição (ex.: email duplicado).
+    """
+    
+    def __init__(self, ids: List[Optional[int]], erros: List[tuple[int, str]]):
+        self.ids = ids
+        self.erros = erros
+    
+    @property
+    def sucesso(self) -> bool:
+        """Indica se todas as linhas foram gravadas."""
+        return not self.erros
+
+
+def _keyset(coluna: str, condicoes: list, params: list,
+            after_id: Optional[int], limit: Optional[int],
+            offset: int = 0) -> tuple[str, tuple]:
+    """
+    Monta o WHERE/ORDER BY/LIMIT de uma listagem paginada por chave.
+    
+    Args:
+        coluna: Coluna de id usada como chave (ex.: 'a.id').
+        condicoes: Condições de filtro já existentes.
+        params: Parâmetros das condições.
+        after_id: Retorna apenas registros com id maior que este.
+        limit: Número máximo de registros (None = sem limite).
+        offset: Registros a pular (apenas para acesso por posição).
+        
+    Returns:
+        tuple: (trecho SQL, parâmetros).
+    """
+    condicoes = list(condicoes)
+    params = list(params)
+    if after_id is not None:
+        condicoes.append(f"{coluna} > ?")
+        params.append(after_id)
+    
+    sql = ""
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    sql += f" ORDER BY {coluna}"
+    if limit is not None or offset:
+        sql += " LIMIT ?"
+        params.append(-1 if limit is None else limit)
+    if offset:
+        sql += " OFFSET ?"
+        params.append(offset)
+    return sql, tuple(params)
+
+
+def _paginar(listar: Callable[..., list], after_id: Union[int, str, None],
+             limit: int, **filtros) -> Pagina:
+    """Chama um método listar_* pedindo um registro a mais para saber se há próxima página."""
+    if limit < 1:
+        raise ValueError("O limite da página deve ser pelo menos 1.")
+    itens = listar(after_id=Pagina.decodificar(after_id), limit=limit + 1, **filtros)
+    if len(itens) > limit:
+        itens = itens[:limit]
+        return Pagina(itens, itens[-1].id)
+    return Pagina(itens, None)
+
+
+def _filtros_veiculo(preco_min=None, preco_max=None, ano_min=None, ano_max=None,
+                     km_max=None, marcas=None) -> tuple[list[str], list]:
+    """
+    Monta as condições SQL (sobre o alias ``v``) dos filtros da busca.
+    
+    Returns:
+        tuple: (lista de condições, lista de parâmetros).
+    """
+    condicoes = []
+    params = []
+    
+    if preco_min is not None:
+        condicoes.append("v.preco >= ?")
+        params.append(preco_min)
+    if preco_max is not None:
+        condicoes.append("v.preco <= ?")
+        params.append(preco_max)
+    if ano_min is not None:
+        condicoes.append("v.ano >= ?")
+        params.append(ano_min)
+    if ano_max is not None:
+        condicoes.append("v.ano <= ?")
+        params.append(ano_max)
+    if km_max is not None:
+        condicoes.append("v.quilometragem <= ?")
+        params.append(km_max)
+    if marcas:
+        marcas = list(marcas)
+        condicoes.append(f"v.marca IN ({', '.join('?' for _ in marcas)})")
+        params.extend(marcas)
+    
+    return condicoes, params
+
+
+def _facetas(db, origem: str, params: list, faixa_ano: int, faixa_preco: float) -> tuple[int, dict]:
+    """
+    Calcula as facetas de marca, ano e preço em uma única consulta.
+    
+    O conjunto filtrado é materializado uma vez (CTE) e agrupado três vezes.
+    
+    Args:
+        db: Instância de Database.
+        origem: Trecho ``FROM ... WHERE ...`` que define os registros filtrados.
+        params: Parâmetros de ``origem``.
+        faixa_ano: Largura das faixas de ano.
+        faixa_preco: Largura das faixas de preço.
+        
+    Returns:
+        tuple: (total de registros, dicionário de facetas).
+    """
+    rows = db.fetch_all(f"""
+        WITH filtrados AS MATERIALIZED (
+            SELECT v.marca, v.ano, v.preco {origem}
+        )
+        SELECT 'marca' AS faceta, marca AS valor, COUNT(*) AS total
+        FROM filtrados GROUP BY marca
+        UNION ALL
+        SELECT 'ano', (ano / ?) * ?, COUNT(*)
+        FROM filtrados GROUP BY 2
+        UNION ALL
+        SELECT 'preco', CAST(preco / ? AS INTEGER) * ?, COUNT(*)
+        FROM filtrados GROUP BY 2
+    """, tuple(params) + (faixa_ano, faixa_ano, faixa_preco, faixa_preco))
+    
+    facetas = {'marca': {}, 'ano': {}, 'preco': {}}
+    for row in rows:
+        facetas[row['faceta']][row['valor']] = row['total']
+    total = sum(facetas['marca'].values())
+    return total, facetas
+
+
+def _canonico(db: Database, tabela: str, entidade_id: int, construir: Callable[[], object],
+              classe: Optional[type] = None, colunas: Optional[Callable[[], dict]] = None):
+    """
+    Retorna o objeto da sessão para (tabela, id), construindo-o se preciso.
+    
+    Sem sessão ativa (``Database.session``) o objeto é sempre construído. Se
+    o objeto já estava no mapa, recebe os valores da linha recém-lida: uma
+    escrita feita fora dos repositórios (SQL direto, outro processo) é
+    corrigida na próxima consulta que passar pela linha.
+    
+    Args:
+        db: Banco de dados.
+        tabela: Tabela da entidade.
+        entidade_id: Chave primária.
+        construir: Monta o objeto a partir da linha já lida.
+        classe: Só reaproveita o objeto em cache se for desta classe.
+        colunas: Atributos do objeto e seus valores na linha já lida.
+    """
+    mapa = db.identity_map()
+    if mapa is None:
+        return construir()
+    existente = mapa.obter(tabela, entidade_id)
+    if existente is not None:
+        if classe is None or isinstance(existente, classe):
+            if colunas is not None:
+                mapa.atualizar(tabela, entidade_id, colunas())
+            return existente
+        # Mesma chave vista como outro tipo: não substitui o objeto canônico
+        return construir()
+    objeto = construir()
+    if objeto is None:
+        return None
+    return mapa.registrar(tabela, entidade_id, objeto)
+
+
+def _contagem(db: Database, tabela: str, valor: Optional[str] = None) -> int:
+    """
+    Lê um contador da tabela ``contagens`` (mantida por gatilhos, migração 9).
+    
+    Sem ``valor``, soma os contadores da tabela (ex.: todos os usuários).
+    """
+    if valor is None:
+        row = db.fetch_one("SELECT SUM(total) FROM contagens WHERE tabela = ?", (tabela,))
+    else:
+        row = db.fetch_one("""
+            SELECT total FROM contagens WHERE tabela = ? AND valor = ?
+        """, (tabela, valor))
+    return (row[0] or 0) if row else 0
+
+
+def _em_cache(db: Database, tabela: str, entidade_id: int, classe: Optional[type] = None):
+    """Retorna o objeto já carregado na sessão atual, ou None."""
+    mapa = db.identity_map()
+    if mapa is None:
+        return None
+    existente = mapa.obter(tabela, entidade_id)
+    if classe is not None and not isinstance(existente, classe):
+        return None
+    return existente
+
+
+def _registrar(db: Database, tabela: str, entidade_id: int, objeto):
+    """Associa um objeto recém-gravado ao seu id na sessão atual."""
+    # A nova linha muda as listagens da tabela guardadas no cache
+    db.invalidate(tabela, entidade_id)
+    objeto._id = entidade_id
+    mapa = db.identity_map()
+    if mapa is not None:
+        mapa.registrar(tabela, entidade_id, objeto)
+
+
+def _registrar_lote(db: Database, tabela: str, ids: List[int], objetos: list):
+    """Como ``_registrar``, para as linhas de um executemany (uma invalidação)."""
+    if ids:
+        db.invalidate(tabela, ids[0])
+    mapa = db.identity_map()
+    for entidade_id, objeto in zip(ids, objetos):
+        objeto._id = entidade_id
+        if mapa is not None:
+            mapa.registrar(tabela, entidade_id, objeto)
+
+
+def _ids_inseridos(db: Database, quantidade: int) -> List[int]:
+    """
+    IDs atribuídos pelo último executemany de ``quantidade`` INSERTs.
+    
+    Deve ser chamada dentro da transação do lote: com o lock de escrita
+    reservado (BEGIN IMMEDIATE) nenhum outro escritor intervém, e o SQLite
+    atribui rowids consecutivos (maior id + 1) às linhas inseridas.
+    """
+    ultimo = db.fetch_one("SELECT last_insert_rowid()")[0]
+    return list(range(ultimo - quantidade + 1, ultimo + 1))
+
+
+def _salvar_em_lote(db: Database, inserir_lote: Callable[[], List[int]],
+                    salvar_um: Callable[..., int], itens: list) -> ResultadoLote:
+    """
+    Grava um lote com executemany, caindo para linha a linha se preciso.
+    
+    O caminho rápido grava tudo em uma única transação. Se alguma linha violar
+    uma restrição, o lote é desfeito e regravado linha a linha (ainda em uma
+    única transação), registrando as linhas rejeitadas sem abortar as demais.
+    
+    Args:
+        db: Banco de dados.
+        inserir_lote: Grava todos os itens e retorna os IDs em ordem.
+        salvar_um: Grava um item (recebe os elementos da tupla) e retorna o ID.
+        itens: Tuplas de argumentos de ``salvar_um``.
+    """
+    if not itens:
+        return ResultadoLote([], [])
+    
+    try:
+        with db.transaction():
+            return ResultadoLote(inserir_lote(), [])
+    except sqlite3.IntegrityError:
+        pass
+    
+    ids, erros = [], []
+    with db.transaction():
+        for posicao, item in enumerate(itens):
+            try:
+                ids.append(salvar_um(*item))
+            except sqlite3.IntegrityError as e:
+                ids.append(None)
+                erros.append((posicao, str(e)))
+    return ResultadoLote(ids, erros)
+
+
+# Listagens de anúncios dependem também dos veículos e anunciantes embutidos
+_ETIQUETAS_LISTA_ANUNCIOS = (('anuncios', None), ('veiculos', None), ('usuarios', None))
+
+
 class UsuarioRepository:
     """Repositório para operações com Usuários."""
     
+    # Usuário + dados específicos do tipo em uma única consulta
+    _SELECT_USUARIOS = """
+        SELECT u.id, u.cpf, u.nome, u.email, u.senha, u.tipo, u.logado,
+               ad.admin_id, an.telefone
+        FROM usuarios u
+        LEFT JOIN admins ad ON ad.usuario_id = u.id
+        LEFT JOIN anunciantes an ON an.usuario_id = u.id
+    """
+    
+    # Classe de domínio de cada tipo de usuário
+    _CLASSES = {'admin': Admin, 'anunciante': Anunciante, 'cliente': Cliente}
+    
     def __init__(self):
         self.db = Database()
     
@@ -31,36 +380,91 @@ class UsuarioRepository:
         Returns:
             int: ID do usuário salvo.
         """
-        # Inserir na tabela usuarios
-        cursor = self.db.execute("""
-            INSERT INTO usuarios (cpf, nome, email, senha, tipo, logado)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (str(usuario.cpf), usuario.nome, usuario.email, 
-              usuario._senha, tipo, int(usuario._logado)))
+        # usuarios + tabela do tipo são gravados em uma única transação
+        with self.db.transaction():
+            # Inserir na tabela usuarios
+            cursor = self.db.execute("""
+                INSERT INTO usuarios (cpf, nome, email, senha, tipo, logado)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (str(usuario.cpf), usuario.nome, usuario.email, 
+                  usuario._senha, tipo, int(usuario._logado)))
         
-        usuario_id = cursor.lastrowid
+            usuario_id = cursor.lastrowid
         
-        # Inserir dados específicos
-        if tipo == 'admin' and dados_especificos:
-            self.db.execute("""
-                INSERT INTO admins (usuario_id, admin_id)
-                VALUES (?, ?)
-            """, (usuario_id, dados_especificos['admin_id']))
+            # Inserir dados específicos
+            if tipo == 'admin' and dados_especificos:
+                self.db.execute("""
+                    INSERT INTO admins (usuario_id, admin_id)
+                    VALUES (?, ?)
+                """, (usuario_id, dados_especificos['admin_id']))
         
-        elif tipo == 'anunciante' and dados_especificos:
-            self.db.execute("""
-                INSERT INTO anunciantes (usuario_id, telefone)
-                VALUES (?, ?)
-            """, (usuario_id, dados_especificos['telefone']))
+            elif tipo == 'anunciante' and dados_especificos:
+                self.db.execute("""
+                    INSERT INTO anunciantes (usuario_id, telefone)
+                    VALUES (?, ?)
+                """, (usuario_id, dados_especificos['telefone']))
         
-        elif tipo == 'cliente':
-            self.db.execute("""
-                INSERT INTO clientes (usuario_id)
-                VALUES (?)
-            """, (usuario_id,))
+            elif tipo == 'cliente':
+                self.db.execute("""
+                    INSERT INTO clientes (usuario_id)
+                    VALUES (?)
+                """, (usuario_id,))
         
+        _registrar(self.db, 'usuarios', usuario_id, usuario)
         return usuario_id
     
+    def salvar_muitos(self, usuarios: list) -> ResultadoLote:
+        """
+        Salva vários usuários em uma única transação.
+        
+        As tabelas usuarios e de cada tipo são gravadas com executemany.
+        Linhas que violam restrições (CPF ou email repetido) são informadas em
+        ``erros`` sem impedir a gravação das demais.
+        
+        Args:
+            usuarios: Tuplas (usuario, tipo) ou (usuario, tipo,
+                dados_especificos), como nos argumentos de ``salvar``.
+            
+        Returns:
+            ResultadoLote: IDs na ordem de entrada e linhas rejeitadas.
+        """
+        itens = [tuple(item) + (None,) * (3 - len(item)) for item in usuarios]
+        
+        def inserir_lote():
+            self.db.executemany("""
+                INSERT INTO usuarios (cpf, nome, email, senha, tipo, logado)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(str(u.cpf), u.nome, u.email, u._senha, tipo, int(u._logado))
+                  for u, tipo, _ in itens])
+            ids = _ids_inseridos(self.db, len(itens))
+            
+            admins, anunciantes, clientes = [], [], []
+            for usuario_id, (_, tipo, dados) in zip(ids, itens):
+                if tipo == 'admin' and dados:
+                    admins.append((usuario_id, dados['admin_id']))
+                elif tipo == 'anunciante' and dados:
+                    anunciantes.append((usuario_id, dados['telefone']))
+                elif tipo == 'cliente':
+                    clientes.append((usuario_id,))
+            
+            if admins:
+                self.db.executemany("""
+                    INSERT INTO admins (usuario_id, admin_id) VALUES (?, ?)
+                """, admins)
+            if anunciantes:
+                self.db.executemany("""
+                    INSERT INTO anunciantes (usuario_id, telefone) VALUES (?, ?)
+                """, anunciantes)
+            if clientes:
+                self.db.executemany("""
+                    INSERT INTO clientes (usuario_id) VALUES (?)
+                """, clientes)
+            
+            _registrar_lote(self.db, 'usuarios', ids, [usuario for usuario, _, _ in itens])
+            return ids
+        
+        return _salvar_em_lote(self.db, inserir_lote, self.salvar, itens)
+    
     def buscar_por_id(self, usuario_id: int, tipo: str) -> Optional[Usuario]:
         """
         Busca um usuário por ID.
@@ -72,9 +476,15 @@ class UsuarioRepository:
         Returns:
             Optional[Usuario]: Objeto Usuario ou None.
         """
-        row = self.db.fetch_one("""
-            SELECT * FROM usuarios WHERE id = ?
-        """, (usuario_id,))
+        usuario = _em_cache(self.db, 'usuarios', usuario_id, self._CLASSES.get(tipo))
+        if usuario is not None:
+            return usuario
+        
+        row = self.db.cached(
+            ('usuarios.id', usuario_id),
+            lambda: self.db.fetch_one(
+                self._SELECT_USUARIOS + " WHERE u.id = ?", (usuario_id,)),
+            [('usuarios', usuario_id)])
         
         if not row:
             return None
@@ -88,9 +498,11 @@ class UsuarioRepository:
         Returns:
             Optional[tuple]: (Usuario, tipo) ou None.
         """
-        row = self.db.fetch_one("""
-            SELECT * FROM usuarios WHERE email = ?
-        """, (email,))
+        row = self.db.cached(
+            ('usuarios.email', email),
+            lambda: self.db.fetch_one(
+                self._SELECT_USUARIOS + " WHERE u.email = ?", (email,)),
+            lambda row: [('usuarios', row['id'])])
         
         if not row:
             return None
@@ -99,22 +511,26 @@ class UsuarioRepository:
         usuario = self._row_to_usuario(row, tipo)
         return (usuario, tipo)
     
-    def listar_todos(self, tipo: Optional[str] = None) -> List[Usuario]:
+    def listar_todos(self, tipo: Optional[str] = None, after_id: Optional[int] = None,
+                     limit: Optional[int] = None, offset: int = 0) -> List[Usuario]:
         """
         Lista todos os usuários, opcionalmente filtrados por tipo.
         
+        Os dados de admins/anunciantes vêm na mesma consulta; o histórico de
+        pesquisas dos clientes só é carregado quando acessado.
+        
         Args:
             tipo: Tipo de usuário para filtrar (opcional).
+            after_id: Retorna apenas usuários com id maior que este.
+            limit: Número máximo de usuários (None = todos).
+            offset: Usuários a pular (prefira after_id para paginar).
             
         Returns:
-            List[Usuario]: Lista de usuários.
+            List[Usuario]: Lista de usuários, em ordem de id.
         """
-        if tipo:
-            rows = self.db.fetch_all("""
-                SELECT * FROM usuarios WHERE tipo = ?
-            """, (tipo,))
-        else:
-            rows = self.db.fetch_all("SELECT * FROM usuarios")
+        condicoes, params = (["u.tipo = ?"], [tipo]) if tipo else ([], [])
+        sql, params = _keyset("u.id", condicoes, params, after_id, limit, offset)
+        rows = self.db.fetch_all(self._SELECT_USUARIOS + sql, params)
         
         usuarios = []
         for row in rows:
@@ -124,6 +540,41 @@ class UsuarioRepository:
         
         return usuarios
     
+    def contar(self, tipo: Optional[str] = None) -> int:
+        """Retorna a quantidade de usuários (opcionalmente de um tipo)."""
+        return _contagem(self.db, 'usuarios', tipo)
+    
+    def iter_todos(self, tipo: Optional[str] = None,
+                   chunk_size: int = 500) -> Iterator[Usuario]:
+        """
+        Percorre os usuários sem carregar a tabela inteira em memória.
+        
+        Args:
+            tipo: Tipo de usuário para filtrar (opcional).
+            chunk_size: Linhas lidas do banco por vez.
+            
+        Yields:
+            Usuario: Cada usuário, em ordem de id.
+        """
+        condicoes, params = (["u.tipo = ?"], [tipo]) if tipo else ([], [])
+        sql, params = _keyset("u.id", condicoes, params, None, None)
+        for row in self.db.iter_query(self._SELECT_USUARIOS + sql, params, chunk_size):
+            usuario = self._row_to_usuario(row, row['tipo'])
+            if usuario:
+                yield usuario
+    
+    def listar_pagina(self, after_id: Union[int, str, None] = None, limit: int = 50,
+                      tipo: Optional[str] = None) -> Pagina:
+        """
+        Retorna uma página de usuários (paginação por chave).
+        
+        Args:
+            after_id: Id ou token de continuação da página anterior.
+            limit: Tamanho da página.
+            tipo: Tipo de usuário para filtrar (opcional).
+        """
+        return _paginar(self.listar_todos, after_id, limit, tipo=tipo)
+    
     def atualizar(self, usuario_id: int, dados: dict):
         """
         Atualiza os dados de um usuário.
@@ -145,40 +596,65 @@ class UsuarioRepository:
             valores.append(usuario_id)
             query = f"UPDATE usuarios SET {', '.join(updates)} WHERE id = ?"
             self.db.execute(query, tuple(valores))
+            
+            # O objeto carregado continua sendo o mesmo, com os novos valores
+            alteracoes = {f"_{campo}": valor for campo, valor in dados.items()
+                          if campo in campos_permitidos}
+            if '_logado' in alteracoes:
+                alteracoes['_logado'] = bool(alteracoes['_logado'])
+            self.db.invalidate('usuarios', usuario_id, alteracoes)
     
     def deletar(self, usuario_id: int):
         """Remove um usuário do banco de dados."""
         self.db.execute("DELETE FROM usuarios WHERE id = ?", (usuario_id,))
+        self.db.invalidate('usuarios', usuario_id)
+        # Veículos e anúncios carregados podem apontar para o usuário removido
+        self.db.invalidate('veiculos')
+        self.db.invalidate('anuncios')
     
     def _row_to_usuario(self, row, tipo: str) -> Optional[Usuario]:
-        """Converte uma linha do banco em objeto Usuario."""
+        """Converte uma linha de _SELECT_USUARIOS em objeto Usuario."""
+        return _canonico(self.db, 'usuarios', row['id'],
+                         lambda: self._novo_usuario(row, tipo),
+                         self._CLASSES.get(tipo),
+                         lambda: self._colunas_usuario(row, tipo))
+    
+    @staticmethod
+    def _colunas_usuario(row, tipo: str) -> dict:
+        """Atributos de um Usuario já carregado e seus valores na linha."""
+        colunas = {
+            '_cpf': int(row['cpf']),
+            '_nome': row['nome'],
+            '_email': row['email'],
+            '_senha': row['senha'],
+        }
+        if tipo == 'admin' and row['admin_id'] is not None:
+            colunas['_adminID'] = row['admin_id']
+        elif tipo == 'anunciante' and row['telefone'] is not None:
+            colunas['_telefone'] = row['telefone']
+        return colunas
+    
+    def _novo_usuario(self, row, tipo: str) -> Optional[Usuario]:
+        """Monta um novo objeto Usuario a partir da linha."""
         if tipo == 'admin':
-            admin_row = self.db.fetch_one("""
-                SELECT admin_id FROM admins WHERE usuario_id = ?
-            """, (row['id'],))
-            
-            if admin_row:
+            if row['admin_id'] is not None:
                 return Admin(
                     id=row['id'],
                     cpf=int(row['cpf']),
                     nome=row['nome'],
                     email=row['email'],
                     senha=row['senha'],
-                    adminID=admin_row['admin_id']
+                    adminID=row['admin_id']
                 )
         
         elif tipo == 'anunciante':
-            anunciante_row = self.db.fetch_one("""
-                SELECT telefone FROM anunciantes WHERE usuario_id = ?
-            """, (row['id'],))
-            
-            if anunciante_row:
+            if row['telefone'] is not None:
                 anunciante = Anunciante(
                     cpf=int(row['cpf']),
                     nome=row['nome'],
                     email=row['email'],
                     senha=row['senha'],
-                    telefone=anunciante_row['telefone']
+                    telefone=row['telefone']
                 )
                 # Ajustar o ID para corresponder ao banco
                 anunciante._id = row['id']
@@ -194,17 +670,21 @@ class UsuarioRepository:
             # Ajustar o ID para corresponder ao banco
             cliente._id = row['id']
             
-            # Carregar histórico de pesquisas
-            historico = self.db.fetch_all("""
-                SELECT filtro FROM historico_pesquisas
-                WHERE cliente_id = ?
-                ORDER BY data_pesquisa
-            """, (row['id'],))
-            
-            cliente._historicoPesquisas = [h['filtro'] for h in historico]
+            # Histórico de pesquisas carregado apenas no primeiro acesso
+            cliente_id = row['id']
+            cliente._carregarHistorico = lambda: self.carregar_historico(cliente_id)
             return cliente
         
         return None
+    
+    def carregar_historico(self, cliente_id: int) -> List[str]:
+        """Retorna o histórico de pesquisas do cliente, do mais antigo ao mais recente."""
+        rows = self.db.fetch_all("""
+            SELECT filtro FROM historico_pesquisas
+            WHERE cliente_id = ?
+            ORDER BY data_pesquisa
+        """, (cliente_id,))
+        return [row['filtro'] for row in rows]
 
 
 class VeiculoRepository:
@@ -230,41 +710,137 @@ class VeiculoRepository:
         """, (veiculo.marca, veiculo.modelo, veiculo.ano, 
               veiculo.preco, veiculo.quilometragem, anunciante_id))
         
+        _registrar(self.db, 'veiculos', cursor.lastrowid, veiculo)
         return cursor.lastrowid
     
+    def salvar_muitos(self, veiculos: List[Veiculo],
+                      anunciante_id: Optional[int] = None) -> ResultadoLote:
+        """
+        Salva vários veículos (ex.: o estoque de uma revenda) em uma única
+        transação, com executemany.
+        
+        Args:
+            veiculos: Objetos Veiculo.
+            anunciante_id: ID do anunciante de todos os veículos (opcional).
+            
+        Returns:
+            ResultadoLote: IDs na ordem de entrada e linhas rejeitadas.
+        """
+        itens = [(veiculo, anunciante_id) for veiculo in veiculos]
+        
+        def inserir_lote():
+            self.db.executemany("""
+                INSERT INTO veiculos (marca, modelo, ano, preco, quilometragem, anunciante_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(v.marca, v.modelo, v.ano, v.preco, v.quilometragem, anunciante_id)
+                  for v in veiculos])
+            ids = _ids_inseridos(self.db, len(veiculos))
+            _registrar_lote(self.db, 'veiculos', ids, veiculos)
+            return ids
+        
+        return _salvar_em_lote(self.db, inserir_lote, self.salvar, itens)
+    
     def buscar_por_id(self, veiculo_id: int) -> Optional[Veiculo]:
         """Busca um veículo por ID."""
-        row = self.db.fetch_one("""
-            SELECT * FROM veiculos WHERE id = ?
-        """, (veiculo_id,))
+        veiculo = _em_cache(self.db, 'veiculos', veiculo_id)
+        if veiculo is not None:
+            return veiculo
+        
+        row = self.db.cached(
+            ('veiculos.id', veiculo_id),
+            lambda: self.db.fetch_one("""
+                SELECT * FROM veiculos WHERE id = ?
+            """, (veiculo_id,)),
+            [('veiculos', veiculo_id)])
         
         if not row:
             return None
         
         return self._row_to_veiculo(row)
     
-    def listar_todos(self) -> List[Veiculo]:
-        """Lista todos os veículos."""
-        rows = self.db.fetch_all("SELECT * FROM veiculos")
+    def listar_todos(self, after_id: Optional[int] = None,
+                     limit: Optional[int] = None, offset: int = 0) -> List[Veiculo]:
+        """Lista todos os veículos em ordem de id (opcionalmente a partir de after_id)."""
+        sql, params = _keyset("id", [], [], after_id, limit, offset)
+        rows = self.db.fetch_all("SELECT * FROM veiculos" + sql, params)
         return [self._row_to_veiculo(row) for row in rows]
     
-    def listar_por_anunciante(self, anunciante_id: int) -> List[Veiculo]:
+    def listar_por_anunciante(self, anunciante_id: int, after_id: Optional[int] = None,
+                              limit: Optional[int] = None) -> List[Veiculo]:
         """Lista veículos de um anunciante específico."""
-        rows = self.db.fetch_all("""
-            SELECT * FROM veiculos WHERE anunciante_id = ?
-        """, (anunciante_id,))
+        sql, params = _keyset("id", ["anunciante_id = ?"], [anunciante_id],
+                              after_id, limit)
+        rows = self.db.fetch_all("SELECT * FROM veiculos" + sql, params)
         return [self._row_to_veiculo(row) for row in rows]
     
+    def contar(self, anunciante_id: Optional[int] = None) -> int:
+        """Retorna a quantidade de veículos (opcionalmente de um anunciante)."""
+        if anunciante_id is not None:
+            row = self.db.fetch_one("""
+                SELECT COUNT(*) FROM veiculos WHERE anunciante_id = ?
+            """, (anunciante_id,))
+            return row[0]
+        return _contagem(self.db, 'veiculos', '')
+    
+    def iter_todos(self, anunciante_id: Optional[int] = None,
+                   chunk_size: int = 500) -> Iterator[Veiculo]:
+        """
+        Percorre os veículos sem carregar a tabela inteira em memória.
+        
+        Args:
+            anunciante_id: Restringe aos veículos de um anunciante (opcional).
+            chunk_size: Linhas lidas do banco por vez.
+            
+        Yields:
+            Veiculo: Cada veículo, em ordem de id.
+        """
+        condicoes, params = ((["anunciante_id = ?"], [anunciante_id])
+                             if anunciante_id is not None else ([], []))
+        sql, params = _keyset("id", condicoes, params, None, None)
+        for row in self.db.iter_query("SELECT * FROM veiculos" + sql, params, chunk_size):
+            yield self._row_to_veiculo(row)
+    
+    def listar_pagina(self, after_id: Union[int, str, None] = None, limit: int = 50,
+                      anunciante_id: Optional[int] = None) -> Pagina:
+        """
+        Retorna uma página de veículos (paginação por chave).
+        
+        Args:
+            after_id: Id ou token de continuação da página anterior.
+            limit: Tamanho da página.
+            anunciante_id: Restringe aos veículos de um anunciante (opcional).
+        """
+        if anunciante_id is not None:
+            return _paginar(self.listar_por_anunciante, after_id, limit,
+                            anunciante_id=anunciante_id)
+        return _paginar(self.listar_todos, after_id, limit)
+    
     def buscar(self, filtro: str) -> List[Veiculo]:
         """
         Busca veículos por marca ou modelo.
         
+        Usa o índice FTS5 ``veiculos_fts`` quando disponível: cada termo do
+        filtro casa com o início de uma palavra da marca ou do modelo, todos
+        os termos precisam casar e o resultado vem ordenado por relevância
+        (BM25). Sem FTS5, ou quando o filtro não tem termos pesquisáveis, cai
+        na busca por substring com LIKE.
+        
         Args:
             filtro: Texto para buscar em marca ou modelo.
             
         Returns:
             List[Veiculo]: Lista de veículos encontrados.
         """
+        consulta = self._consulta_fts(filtro)
+        if consulta and self.db.has_table('veiculos_fts'):
+            rows = self.db.fetch_all("""
+                SELECT v.* FROM veiculos_fts f
+                JOIN veiculos v ON v.id = f.rowid
+                WHERE veiculos_fts MATCH ?
+                ORDER BY f.rank
+            """, (consulta,))
+            return [self._row_to_veiculo(row) for row in rows]
+        
         rows = self.db.fetch_all("""
             SELECT * FROM veiculos 
             WHERE LOWER(marca) LIKE ? OR LOWER(modelo) LIKE ?
@@ -272,6 +848,87 @@ class VeiculoRepository:
         
         return [self._row_to_veiculo(row) for row in rows]
     
+    # Ordenações aceitas por buscar_filtrado (nunca interpolar texto do usuário).
+    # Cada uma é a ordem de um índice (o id é o rowid no fim de cada entrada),
+    # percorrido de trás para frente nas decrescentes: sem filtro, ou com
+    # filtro na mesma coluna, a página sai do índice sem ordenação.
+    _ORDENACOES = {
+        'preco': 'v.preco, v.id',                                # idx_veiculos_preco
+        'preco_desc': 'v.preco DESC, v.id DESC',
+        'ano': 'v.ano, v.preco, v.id',                           # idx_veiculos_ano_preco
+        'ano_desc': 'v.ano DESC, v.preco DESC, v.id DESC',
+        'km': 'v.quilometragem, v.id',                           # idx_veiculos_km
+        'recentes': 'v.id DESC',                                 # chave primária
+    }
+    
+    def buscar_filtrado(self, preco_min: Optional[float] = None,
+                        preco_max: Optional[float] = None,
+                        ano_min: Optional[int] = None, ano_max: Optional[int] = None,
+                        km_max: Optional[int] = None,
+                        marcas: Optional[List[str]] = None,
+                        ordem: str = 'preco', limit: int = 20, offset: int = 0,
+                        faixa_ano: int = 5, faixa_preco: float = 10000) -> ResultadoBusca:
+        """
+        Busca veículos por faixas de preço/ano, quilometragem máxima e marcas.
+        
+        Todos os filtros são opcionais e combinados com AND. As marcas são
+        comparadas exatamente (como cadastradas) para aproveitar os índices.
+        
+        Sem filtros, com filtro só na coluna da ordenação ou com uma única
+        marca e ordem de preço, a página é lida do índice já na ordem.
+        Quando o filtro e a ordenação usam colunas diferentes (ex.: faixa de
+        preço ordenada por ano), o SQLite busca as linhas pelo índice do
+        filtro e ordena só as filtradas, guardando as ``limit + offset``
+        primeiras.
+        
+        Args:
+            preco_min, preco_max: Faixa de preço (inclusiva).
+            ano_min, ano_max: Faixa de ano (inclusiva).
+            km_max: Quilometragem máxima.
+            marcas: Lista de marcas aceitas.
+            ordem: Uma das chaves de _ORDENACOES.
+            limit: Tamanho da página.
+            offset: Quantidade de veículos a pular.
+            faixa_ano: Largura das faixas da faceta de ano.
+            faixa_preco: Largura das faixas da faceta de preço.
+            
+        Returns:
+            ResultadoBusca: Página de veículos, total e facetas.
+        """
+        if ordem not in self._ORDENACOES:
+            raise ValueError(f"Ordenação inválida: {ordem}")
+        
+        condicoes, params = _filtros_veiculo(preco_min, preco_max, ano_min,
+                                             ano_max, km_max, marcas)
+        origem = "FROM veiculos v"
+        if condicoes:
+            origem += " WHERE " + " AND ".join(condicoes)
+        
+        rows = self.db.fetch_all(f"""
+            SELECT v.* {origem}
+            ORDER BY {self._ORDENACOES[ordem]}
+            LIMIT ? OFFSET ?
+        """, tuple(params) + (limit, offset))
+        total, facetas = _facetas(self.db, origem, params, faixa_ano, faixa_preco)
+        
+        return ResultadoBusca([self._row_to_veiculo(row) for row in rows], total, facetas)
+    
+    @staticmethod
+    def _consulta_fts(filtro: str) -> Optional[str]:
+        """
+        Converte o texto digitado em uma consulta FTS5 segura.
+        
+        Cada palavra vira um termo de prefixo entre aspas ("toy"* AND "cor"*),
+        o que também neutraliza a sintaxe de operadores do FTS5.
+        
+        Returns:
+            Optional[str]: Consulta MATCH, ou None se não houver termos.
+        """
+        termos = re.findall(r"\w+", filtro.lower())
+        if not termos:
+            return None
+        return " AND ".join(f'"{termo}"*' for termo in termos)
+    
     def atualizar(self, veiculo_id: int, dados: dict):
         """Atualiza os dados de um veículo."""
         campos_permitidos = ['marca', 'modelo', 'ano', 'preco', 'quilometragem']
@@ -287,13 +944,35 @@ class VeiculoRepository:
             valores.append(veiculo_id)
             query = f"UPDATE veiculos SET {', '.join(updates)} WHERE id = ?"
             self.db.execute(query, tuple(valores))
+            
+            self.db.invalidate('veiculos', veiculo_id,
+                               {f"_{campo}": valor for campo, valor in dados.items()
+                                if campo in campos_permitidos})
     
     def deletar(self, veiculo_id: int):
         """Remove um veículo do banco de dados."""
         self.db.execute("DELETE FROM veiculos WHERE id = ?", (veiculo_id,))
+        self.db.invalidate('veiculos', veiculo_id)
+        self.db.invalidate('anuncios')
     
     def _row_to_veiculo(self, row) -> Veiculo:
         """Converte uma linha do banco em objeto Veiculo."""
+        return _canonico(self.db, 'veiculos', row['id'], lambda: self._novo_veiculo(row),
+                         colunas=lambda: self._colunas_veiculo(row))
+    
+    @staticmethod
+    def _colunas_veiculo(row) -> dict:
+        """Atributos de um Veiculo já carregado e seus valores na linha."""
+        return {
+            '_marca': row['marca'],
+            '_modelo': row['modelo'],
+            '_ano': row['ano'],
+            '_preco': row['preco'],
+            '_quilometragem': row['quilometragem'],
+        }
+    
+    def _novo_veiculo(self, row) -> Veiculo:
+        """Monta um novo objeto Veiculo a partir da linha."""
         veiculo = Veiculo(
             marca=row['marca'],
             modelo=row['modelo'],
@@ -309,6 +988,33 @@ class VeiculoRepository:
 class AnuncioRepository:
     """Repositório para operações com Anúncios."""
     
+    # Anúncio + veículo + anunciante em uma única consulta. As colunas do
+    # veículo mantêm os nomes originais para reaproveitar _row_to_veiculo.
+    _COLUNAS_ANUNCIOS = """
+        SELECT a.id AS anuncio_id, a.data_publicacao, a.status,
+               a.anunciante_id,
+               v.id, v.marca, v.modelo, v.ano, v.preco, v.quilometragem,
+               v.anunciante_id AS veiculo_anunciante_id,
+               u.cpf AS anunciante_cpf, u.nome AS anunciante_nome,
+               u.email AS anunciante_email, u.senha AS anunciante_senha,
+               an.telefone AS anunciante_telefone
+    """
+    _SELECT_ANUNCIOS = _COLUNAS_ANUNCIOS + """
+        FROM anuncios a
+        JOIN veiculos v ON v.id = a.veiculo_id
+        LEFT JOIN usuarios u ON u.id = a.anunciante_id
+        LEFT JOIN anunciantes an ON an.usuario_id = a.anunciante_id
+    """
+    # Mesmas colunas, percorrendo os veículos primeiro: CROSS JOIN fixa a
+    # ordem das tabelas no SQLite, para que as ordenações por colunas do
+    # veículo usem os índices de veiculos (ver buscar_filtrado)
+    _SELECT_ANUNCIOS_POR_VEICULO = _COLUNAS_ANUNCIOS + """
+        FROM veiculos v
+        CROSS JOIN anuncios a ON a.veiculo_id = v.id
+        LEFT JOIN usuarios u ON u.id = a.anunciante_id
+        LEFT JOIN anunciantes an ON an.usuario_id = a.anunciante_id
+    """
+    
     def __init__(self):
         self.db = Database()
         self.veiculo_repo = VeiculoRepository()
@@ -330,65 +1036,445 @@ class AnuncioRepository:
             VALUES (?, ?, ?, ?)
         """, (anuncio.dataPublicacao, anuncio.status, veiculo_id, anunciante_id))
         
+        _registrar(self.db, 'anuncios', cursor.lastrowid, anuncio)
         return cursor.lastrowid
     
+    def salvar_muitos(self, anuncios: list) -> ResultadoLote:
+        """
+        Salva vários anúncios em uma única transação, com executemany.
+        
+        Args:
+            anuncios: Tuplas (anuncio, veiculo_id, anunciante_id), como nos
+                argumentos de ``salvar``.
+            
+        Returns:
+            ResultadoLote: IDs na ordem de entrada e linhas rejeitadas.
+        """
+        itens = [tuple(item) for item in anuncios]
+        
+        def inserir_lote():
+            self.db.executemany("""
+                INSERT INTO anuncios (data_publicacao, status, veiculo_id, anunciante_id)
+                VALUES (?, ?, ?, ?)
+            """, [(a.dataPublicacao, a.status, veiculo_id, anunciante_id)
+                  for a, veiculo_id, anunciante_id in itens])
+            ids = _ids_inseridos(self.db, len(itens))
+            _registrar_lote(self.db, 'anuncios', ids, [anuncio for anuncio, _, _ in itens])
+            return ids
+        
+        return _salvar_em_lote(self.db, inserir_lote, self.salvar, itens)
+    
     def buscar_por_id(self, anuncio_id: int) -> Optional[Anuncio]:
         """Busca um anúncio por ID."""
-        row = self.db.fetch_one("""
-            SELECT * FROM anuncios WHERE id = ?
-        """, (anuncio_id,))
+        anuncio = _em_cache(self.db, 'anuncios', anuncio_id)
+        if anuncio is not None:
+            return anuncio
+        
+        row = self.db.cached(
+            ('anuncios.id', anuncio_id),
+            lambda: self.db.fetch_one(
+                self._SELECT_ANUNCIOS + " WHERE a.id = ?", (anuncio_id,)),
+            lambda row: [('anuncios', anuncio_id), ('veiculos', row['id']),
+                         ('usuarios', row['anunciante_id'])])
         
         if not row:
             return None
         
         return self._row_to_anuncio(row)
     
-    def listar_todos(self) -> List[Anuncio]:
-        """Lista todos os anúncios."""
-        rows = self.db.fetch_all("SELECT * FROM anuncios")
-        return [self._row_to_anuncio(row) for row in rows]
+    def buscar_por_ids(self, ids: List[int]) -> List[Anuncio]:
+        """Busca vários anúncios em uma única consulta, na ordem de ``ids``."""
+        if not ids:
+            return []
+        rows = self.db.fetch_all(
+            self._SELECT_ANUNCIOS + " WHERE a.id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(ids)),))
+        por_id = {anuncio.id: anuncio for anuncio in self._rows_to_anuncios(rows)}
+        return [por_id[anuncio_id] for anuncio_id in ids if anuncio_id in por_id]
+    
+    def listar_todos(self, after_id: Optional[int] = None,
+                     limit: Optional[int] = None, offset: int = 0) -> List[Anuncio]:
+        """Lista todos os anúncios em ordem de id (opcionalmente a partir de after_id)."""
+        sql, params = _keyset("a.id", [], [], after_id, limit, offset)
+        rows = self.db.fetch_all(self._SELECT_ANUNCIOS + sql, params)
+        return self._rows_to_anuncios(rows)
     
-    def listar_por_anunciante(self, anunciante_id: int) -> List[Anuncio]:
+    def listar_por_anunciante(self, anunciante_id: int, after_id: Optional[int] = None,
+                              limit: Optional[int] = None) -> List[Anuncio]:
         """Lista anúncios de um anunciante específico."""
-        rows = self.db.fetch_all("""
-            SELECT * FROM anuncios WHERE anunciante_id = ?
-        """, (anunciante_id,))
-        return [self._row_to_anuncio(row) for row in rows]
+        sql, params = _keyset("a.id", ["a.anunciante_id = ?"], [anunciante_id],
+                              after_id, limit)
+        rows = self.db.fetch_all(self._SELECT_ANUNCIOS + sql, params)
+        return self._rows_to_anuncios(rows)
     
-    def listar_por_status(self, status: str) -> List[Anuncio]:
+    def listar_por_status(self, status: str, after_id: Optional[int] = None,
+                          limit: Optional[int] = None) -> List[Anuncio]:
         """Lista anúncios por status."""
-        rows = self.db.fetch_all("""
-            SELECT * FROM anuncios WHERE status = ?
-        """, (status,))
-        return [self._row_to_anuncio(row) for row in rows]
+        sql, params = _keyset("a.id", ["a.status = ?"], [status], after_id, limit)
+        rows = self.db.cached(
+            ('anuncios.status', status, after_id, limit),
+            lambda: tuple(self.db.fetch_all(self._SELECT_ANUNCIOS + sql, params)),
+            _ETIQUETAS_LISTA_ANUNCIOS)
+        return self._rows_to_anuncios(rows)
+    
+    def contar(self, status: Optional[str] = None) -> int:
+        """Retorna a quantidade de anúncios (opcionalmente de um status)."""
+        return _contagem(self.db, 'anuncios', status)
+    
+    def iter_todos(self, status: Optional[str] = None,
+                   anunciante_id: Optional[int] = None,
+                   chunk_size: int = 500) -> Iterator[Anuncio]:
+        """
+        Percorre os anúncios (com veículo e anunciante) sob demanda.
+        
+        Args:
+            status: Restringe a um status (opcional).
+            anunciante_id: Restringe aos anúncios de um anunciante (opcional).
+            chunk_size: Linhas lidas do banco por vez.
+            
+        Yields:
+            Anuncio: Cada anúncio, em ordem de id.
+        """
+        condicoes, params = [], []
+        if status is not None:
+            condicoes.append("a.status = ?")
+            params.append(status)
+        if anunciante_id is not None:
+            condicoes.append("a.anunciante_id = ?")
+            params.append(anunciante_id)
+        sql, params = _keyset("a.id", condicoes, params, None, None)
+        
+        anunciantes = {}
+        for row in self.db.iter_query(self._SELECT_ANUNCIOS + sql, params, chunk_size):
+            yield self._row_to_anuncio(row, anunciantes)
+    
+    # Colunas exportadas (exportador.py): sem a senha do anunciante
+    _SELECT_EXPORTACAO = """
+        SELECT a.id AS anuncio_id, a.data_publicacao, a.status,
+               v.id AS veiculo_id, v.marca, v.modelo, v.ano, v.preco, v.quilometragem,
+               a.anunciante_id, u.nome AS anunciante_nome,
+               u.email AS anunciante_email, an.telefone AS anunciante_telefone
+        FROM anuncios a
+        JOIN veiculos v ON v.id = a.veiculo_id
+        LEFT JOIN usuarios u ON u.id = a.anunciante_id
+        LEFT JOIN anunciantes an ON an.usuario_id = a.anunciante_id
+    """
+    
+    def iter_exportacao(self, status: Optional[str] = 'Aprovado',
+                        data_inicio: Optional[str] = None, data_fim: Optional[str] = None,
+                        anunciante_id: Optional[int] = None,
+                        chunk_size: int = 1000) -> Iterator:
+        """
+        Percorre as linhas de exportação dos anúncios direto do cursor.
+        
+        Não monta objetos: cada linha é lida, entregue e descartada, então a
+        memória usada não depende da quantidade de anúncios.
+        
+        Args:
+            status: Restringe a um status (None para todos).
+            data_inicio: Data de publicação mínima (YYYY-MM-DD).
+            data_fim: Data de publicação máxima, inclusive (YYYY-MM-DD).
+            anunciante_id: Restringe aos anúncios de um anunciante.
+            chunk_size: Linhas lidas do banco por vez.
+            
+        Yields:
+            sqlite3.Row: Colunas de _SELECT_EXPORTACAO, em ordem de id.
+        """
+        condicoes, params = [], []
+        if status is not None:
+            condicoes.append("a.status = ?")
+            params.append(status)
+        if data_inicio is not None:
+            condicoes.append("a.data_publicacao >= ?")
+            params.append(data_inicio)
+        if data_fim is not None:
+            condicoes.append("a.data_publicacao < date(?, '+1 day')")
+            params.append(data_fim)
+        if anunciante_id is not None:
+            condicoes.append("a.anunciante_id = ?")
+            params.append(anunciante_id)
+        sql, params = _keyset("a.id", condicoes, params, None, None)
+        
+        return self.db.iter_query(self._SELECT_EXPORTACAO + sql, params, chunk_size)
+    
+    def listar_pagina(self, after_id: Union[int, str, None] = None, limit: int = 50,
+                      status: Optional[str] = None,
+                      anunciante_id: Optional[int] = None) -> Pagina:
+        """
+        Retorna uma página de anúncios (paginação por chave).
+        
+        Args:
+            after_id: Id ou token de continuação da página anterior.
+            limit: Tamanho da página.
+            status: Restringe a um status (opcional).
+            anunciante_id: Restringe aos anúncios de um anunciante (opcional).
+        """
+        if status is not None and anunciante_id is not None:
+            raise ValueError("Filtre por status ou por anunciante, não ambos.")
+        if status is not None:
+            return _paginar(self.listar_por_status, after_id, limit, status=status)
+        if anunciante_id is not None:
+            return _paginar(self.listar_por_anunciante, after_id, limit,
+                            anunciante_id=anunciante_id)
+        return _paginar(self.listar_todos, after_id, limit)
+    
+    def buscar_aprovados(self, filtro: str, limit: Optional[int] = None,
+                         offset: int = 0) -> List[Anuncio]:
+        """
+        Busca anúncios aprovados cujo veículo casa com o filtro de marca/modelo.
+        
+        Tudo é resolvido em uma única consulta: com FTS5 o resultado vem
+        ordenado por relevância; sem FTS5 (ou com filtro vazio) usa LIKE e
+        ordena dos mais recentes para os mais antigos.
+        
+        Args:
+            filtro: Texto para buscar em marca ou modelo.
+            limit: Número máximo de anúncios (None = todos).
+            offset: Quantidade de anúncios a pular.
+            
+        Returns:
+            List[Anuncio]: Anúncios aprovados encontrados.
+        """
+        paginacao = (-1 if limit is None else limit, offset)
+        consulta = self.veiculo_repo._consulta_fts(filtro)
+        
+        if consulta and self.db.has_table('veiculos_fts'):
+            rows = self.db.fetch_all(self._SELECT_ANUNCIOS + """
+                JOIN veiculos_fts f ON f.rowid = v.id
+                WHERE veiculos_fts MATCH ? AND a.status = 'Aprovado'
+                ORDER BY f.rank
+                LIMIT ? OFFSET ?
+            """, (consulta,) + paginacao)
+        else:
+            termo = f"%{filtro.lower()}%"
+            rows = self.db.fetch_all(self._SELECT_ANUNCIOS + """
+                WHERE a.status = 'Aprovado'
+                  AND (LOWER(v.marca) LIKE ? OR LOWER(v.modelo) LIKE ?)
+                ORDER BY a.data_publicacao DESC, a.id DESC
+                LIMIT ? OFFSET ?
+            """, (termo, termo) + paginacao)
+        
+        return self._rows_to_anuncios(rows)
+    
+    # Ordenações aceitas por buscar_filtrado
+    _ORDENACOES = dict(VeiculoRepository._ORDENACOES,
+                       recentes='a.data_publicacao DESC, a.id DESC')
+    
+    def buscar_filtrado(self, preco_min: Optional[float] = None,
+                        preco_max: Optional[float] = None,
+                        ano_min: Optional[int] = None, ano_max: Optional[int] = None,
+                        km_max: Optional[int] = None,
+                        marcas: Optional[List[str]] = None,
+                        ordem: str = 'recentes', limit: int = 20, offset: int = 0,
+                        faixa_ano: int = 5, faixa_preco: float = 10000) -> ResultadoBusca:
+        """
+        Busca anúncios aprovados pelos filtros do veículo.
+        
+        Mesmos filtros e facetas de VeiculoRepository.buscar_filtrado, mas
+        restrito a veículos com anúncio aprovado.
+        
+        A ordem 'recentes' percorre idx_anuncios_status_data; as demais
+        percorrem os veículos pelo índice da ordenação e conferem o anúncio
+        de cada um (a maior parte dos anúncios está aprovada).
+        
+        Returns:
+            ResultadoBusca: Página de anúncios, total e facetas.
+        """
+        if ordem not in self._ORDENACOES:
+            raise ValueError(f"Ordenação inválida: {ordem}")
+        
+        condicoes, params = _filtros_veiculo(preco_min, preco_max, ano_min,
+                                             ano_max, km_max, marcas)
+        where = " AND ".join(["a.status = 'Aprovado'"] + condicoes)
+        origem = f"""
+            FROM anuncios a JOIN veiculos v ON v.id = a.veiculo_id
+            WHERE {where}
+        """
+        select = (self._SELECT_ANUNCIOS if ordem == 'recentes'
+                  else self._SELECT_ANUNCIOS_POR_VEICULO)
+        
+        rows = self.db.fetch_all(select + f"""
+            WHERE {where}
+            ORDER BY {self._ORDENACOES[ordem]}
+            LIMIT ? OFFSET ?
+        """, tuple(params) + (limit, offset))
+        total, facetas = _facetas(self.db, origem, params, faixa_ano, faixa_preco)
+        
+        return ResultadoBusca(self._rows_to_anuncios(rows), total, facetas)
     
     def atualizar_status(self, anuncio_id: int, novo_status: str):
         """Atualiza o status de um anúncio."""
         self.db.execute("""
             UPDATE anuncios SET status = ? WHERE id = ?
         """, (novo_status, anuncio_id))
+        self.db.invalidate('anuncios', anuncio_id, {'_status': novo_status})
+    
+    def atualizar_status_em_lote(self, ids: List[int], novo_status: str,
+                                 status_atual: Optional[str] = None) -> List[int]:
+        """
+        Atualiza o status de vários anúncios com um único UPDATE.
+        
+        Args:
+            ids: IDs dos anúncios.
+            novo_status: Status a gravar.
+            status_atual: Só altera anúncios que estejam neste status
+                (ex.: 'Pendente'), evitando reverter uma moderação já feita.
+            
+        Returns:
+            List[int]: IDs que de fato mudaram de status (inexistentes, já no
+            novo status ou fora de ``status_atual`` ficam de fora).
+        """
+        ids = [int(anuncio_id) for anuncio_id in ids]
+        if not ids:
+            return []
+        
+        condicoes = ["id IN (SELECT value FROM json_each(?))", "status <> ?"]
+        params = [novo_status, json.dumps(ids), novo_status]
+        if status_atual is not None:
+            condicoes.append("status = ?")
+            params.append(status_atual)
+        
+        return self._atualizar_status_onde(condicoes, params, novo_status)
+    
+    def atualizar_status_por_filtro(self, novo_status: str, filtro: str = "",
+                                    status_atual: str = 'Pendente',
+                                    anunciante_id: Optional[int] = None) -> List[int]:
+        """
+        Atualiza o status de todos os anúncios em ``status_atual`` cujo
+        veículo casa com o filtro de marca/modelo (mesma regra de ``buscar``).
+        
+        Ex.: aprovar todos os pendentes de "toyota corolla".
+        
+        Args:
+            novo_status: Status a gravar.
+            filtro: Texto para buscar em marca ou modelo (vazio = todos).
+            status_atual: Status dos anúncios afetados.
+            anunciante_id: Restringe aos anúncios de um anunciante (opcional).
+            
+        Returns:
+            List[int]: IDs que mudaram de status.
+        """
+        condicoes = ["status = ?"]
+        params = [novo_status, status_atual]
+        
+        consulta = self.veiculo_repo._consulta_fts(filtro)
+        if consulta and self.db.has_table('veiculos_fts'):
+            condicoes.append("""veiculo_id IN (
+                SELECT rowid FROM veiculos_fts WHERE veiculos_fts MATCH ?)""")
+            params.append(consulta)
+        elif filtro.strip():
+            termo = f"%{filtro.lower()}%"
+            condicoes.append("""veiculo_id IN (
+                SELECT id FROM veiculos WHERE LOWER(marca) LIKE ? OR LOWER(modelo) LIKE ?)""")
+            params.extend([termo, termo])
+        if anunciante_id is not None:
+            condicoes.append("anunciante_id = ?")
+            params.append(anunciante_id)
+        
+        return self._atualizar_status_onde(condicoes, params, novo_status)
+    
+    def _atualizar_status_onde(self, condicoes: list, params: list,
+                               novo_status: str) -> List[int]:
+        """UPDATE ... RETURNING comum às atualizações de status em lote."""
+        with self.db.transaction():
+            cursor = self.db.execute(f"""
+                UPDATE anuncios SET status = ?
+                WHERE {' AND '.join(condicoes)}
+                RETURNING id
+            """, tuple(params))
+            alterados = sorted(row[0] for row in cursor.fetchall())
+        
+        for anuncio_id in alterados:
+            self.db.invalidate('anuncios', anuncio_id, {'_status': novo_status})
+        return alterados
     
     def deletar(self, anuncio_id: int):
         """Remove um anúncio do banco de dados."""
         self.db.execute("DELETE FROM anuncios WHERE id = ?", (anuncio_id,))
+        self.db.invalidate('anuncios', anuncio_id)
     
-    def _row_to_anuncio(self, row) -> Optional[Anuncio]:
-        """Converte uma linha do banco em objeto Anuncio."""
-        veiculo = self.veiculo_repo.buscar_por_id(row['veiculo_id'])
-        
-        if not veiculo:
-            return None
+    def _rows_to_anuncios(self, rows) -> List[Anuncio]:
+        """
+        Converte as linhas de _SELECT_ANUNCIOS em objetos Anuncio.
         
-        # Criar anúncio com dados simplificados
+        Anúncios do mesmo anunciante compartilham o mesmo objeto Anunciante.
+        """
+        anunciantes = {}
+        return [self._row_to_anuncio(row, anunciantes) for row in rows]
+    
+    def _row_to_anuncio(self, row, anunciantes: Optional[dict] = None) -> Anuncio:
+        """Converte uma linha de _SELECT_ANUNCIOS em objeto Anuncio."""
+        return _canonico(self.db, 'anuncios', row['anuncio_id'],
+                         lambda: self._novo_anuncio(row, anunciantes),
+                         colunas=lambda: self._colunas_anuncio(row, anunciantes))
+    
+    def _colunas_anuncio(self, row, anunciantes: Optional[dict] = None) -> dict:
+        """Atributos de um Anuncio já carregado e seus valores na linha."""
+        veiculo, anunciante = self._relacionados(row, anunciantes)
+        return {
+            '_dataPublicacao': row['data_publicacao'],
+            '_status': row['status'],
+            '_veiculo': veiculo,
+            '_anunciante': anunciante,
+        }
+    
+    def _novo_anuncio(self, row, anunciantes: Optional[dict] = None) -> Anuncio:
+        """Monta um novo objeto Anuncio a partir da linha."""
+        veiculo, anunciante = self._relacionados(row, anunciantes)
         anuncio = Anuncio(
             dataPublicacao=row['data_publicacao'],
             status=row['status'],
             veiculo=veiculo,
-            anunciante=None  # Simplified - avoid circular references
+            anunciante=anunciante
         )
-        anuncio._id = row['id']
+        anuncio._id = row['anuncio_id']
         
         return anuncio
+    
+    def _relacionados(self, row, anunciantes: Optional[dict] = None) -> tuple:
+        """Veículo e anunciante de uma linha de _SELECT_ANUNCIOS."""
+        veiculo = self.veiculo_repo._row_to_veiculo(row)
+        
+        anunciante_id = row['anunciante_id']
+        if anunciantes is not None and anunciante_id in anunciantes:
+            anunciante = anunciantes[anunciante_id]
+        else:
+            anunciante = self._row_to_anunciante(row)
+            if anunciantes is not None:
+                anunciantes[anunciante_id] = anunciante
+        
+        if anunciante and row['veiculo_anunciante_id'] == anunciante_id:
+            veiculo.anunciante = anunciante
+        
+        return veiculo, anunciante
+    
+    def _row_to_anunciante(self, row) -> Optional[Anunciante]:
+        """Monta o Anunciante a partir das colunas anunciante_* da consulta."""
+        if row['anunciante_telefone'] is None:
+            return None
+        
+        return _canonico(self.db, 'usuarios', row['anunciante_id'],
+                         lambda: self._novo_anunciante(row), Anunciante,
+                         lambda: {
+                             '_cpf': int(row['anunciante_cpf']),
+                             '_nome': row['anunciante_nome'],
+                             '_email': row['anunciante_email'],
+                             '_senha': row['anunciante_senha'],
+                             '_telefone': row['anunciante_telefone'],
+                         })
+    
+    def _novo_anunciante(self, row) -> Anunciante:
+        """Monta um novo Anunciante a partir das colunas anunciante_*."""
+        anunciante = Anunciante(
+            cpf=int(row['anunciante_cpf']),
+            nome=row['anunciante_nome'],
+            email=row['anunciante_email'],
+            senha=row['anunciante_senha'],
+            telefone=row['anunciante_telefone']
+        )
+        # Ajustar o ID para corresponder ao banco
+        anunciante._id = row['anunciante_id']
+        return anunciante
 
 
 class ClienteRepository:
@@ -409,6 +1495,7 @@ class ClienteRepository:
             INSERT INTO historico_pesquisas (cliente_id, filtro)
             VALUES (?, ?)
         """, (cliente_id, filtro))
+        self._expirar_historico(cliente_id)
     
     def obter_historico(self, cliente_id: int) -> List[str]:
         """
@@ -433,3 +1520,10 @@ class ClienteRepository:
         self.db.execute("""
             DELETE FROM historico_pesquisas WHERE cliente_id = ?
         """, (cliente_id,))
+        self._expirar_historico(cliente_id)
+    
+    def _expirar_historico(self, cliente_id: int):
+        """Faz o Cliente carregado na sessão reler o histórico no próximo acesso."""
+        usuario_repo = UsuarioRepository()
+        self.db.invalidate('usuarios', cliente_id, {
+            '_carregarHistorico': lambda: usuario_repo.carregar_historico(cliente_id)})
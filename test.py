@@ -5,6 +5,13 @@ Sistema de Testes - Catálogo de Veículos POO
 Testa todas as classes e validações do sistema
 """
 
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
 from models.Vehicle import Veiculo
 from models.Client import Cliente
 from models.Announcer import Anunciante
@@ -49,6 +56,32 @@ class TestResult:
         print("="*60)
 
 
+@contextmanager
+def banco_temporario(**opcoes):
+    """Database novo em uma pasta temporária; o singleton anterior é restaurado ao sair"""
+    from database import Database
+    pasta = tempfile.mkdtemp(prefix='teste_')
+    anterior = Database._instance
+    Database._instance = None
+    db = Database(os.path.join(pasta, 'teste.db'), **opcoes)
+    try:
+        db.create_tables()
+        yield db
+    finally:
+        try:
+            db.close()
+        finally:
+            Database._instance = anterior
+            shutil.rmtree(pasta, ignore_errors=True)
+
+
+def contar_consultas(db, funcao):
+    """Executa funcao e retorna (resultado, quantidade de comandos SQL emitidos)"""
+    db.instrumentation.limpar()
+    resultado = funcao()
+    return resultado, sum(item['chamadas'] for item in db.instrumentation.estatisticas())
+
+
 def test_veiculo():
     """Testa a classe Veiculo"""
     print("\n" + "="*60)
@@ -653,6 +686,1578 @@ def test_admin():
     return result
 
 
+def test_pool_e_transacoes():
+    """Testa o pool de conexões, connect/close e as transações com savepoints"""
+    print("\n" + "="*60)
+    print("TESTANDO POOL DE CONEXÕES E TRANSAÇÕES")
+    print("="*60)
+    result = TestResult()
+    
+    from database import ConnectionPool
+    
+    print("\n📌 Teste 1: Pool limitado esgota e devolve conexões")
+    pasta = tempfile.mkdtemp(prefix='teste_')
+    pool = ConnectionPool(os.path.join(pasta, 'pool.db'), max_size=2, timeout=0.2)
+    try:
+        a, b = pool.acquire(), pool.acquire()
+        result.test("Conexões distintas", a is not b)
+        try:
+            pool.acquire()
+            result.test("Pool esgotado espera e desiste", False, "acquire não expirou")
+        except TimeoutError:
+            result.test("Pool esgotado espera e desiste", True)
+        pool.release(a)
+        result.test("Conexão devolvida é reaproveitada", pool.acquire() is a)
+        pool.release(a)
+        pool.release(b)
+        pool.close_all()
+    except Exception as e:
+        result.test("Pool limitado", False, str(e))
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    
+    with banco_temporario(pool_size=2) as db:
+        pool = db._get_pool()
+        
+        print("\n📌 Teste 2: connect() devolve a conexão ao sair do bloco")
+        try:
+            with db.connect() as conn:
+                with db.connect() as interna:
+                    result.test("connect aninhado reutiliza a conexão", interna is conn)
+                result.test("Leituras usam a conexão fixada",
+                            db.fetch_one("SELECT 1 AS um")['um'] == 1 and pool._borrowed == 1)
+            result.test("Conexão devolvida ao pool", pool._borrowed == 0)
+        except Exception as e:
+            result.test("connect() como bloco", False, str(e))
+        
+        print("\n📌 Teste 3: Resultado de execute() lido antes de devolver a conexão")
+        try:
+            resultado = db.execute("""
+                INSERT INTO usuarios (cpf, nome, email, senha, tipo)
+                VALUES ('1', 'Teste', 't@t.com', 'senha123', 'cliente') RETURNING id
+            """)
+            result.test("Conexão já devolvida", pool._borrowed == 0)
+            linha = resultado.fetchone()
+            result.test("Linhas do RETURNING disponíveis",
+                        linha is not None and linha['id'] == resultado.lastrowid)
+            result.test("rowcount do comando", resultado.rowcount == 1)
+            
+            versao = db.write_version
+            db.execute("SELECT COUNT(*) FROM usuarios")
+            db.execute("PRAGMA user_version")
+            db.execute("UPDATE usuarios SET nome = 'Nenhum' WHERE id = -1")
+            result.test("Leituras e comandos sem efeito não avançam write_version",
+                        db.write_version == versao, f"{versao} -> {db.write_version}")
+            db.execute("UPDATE usuarios SET nome = 'Teste 2'")
+            result.test("Escrita avança write_version", db.write_version > versao)
+        except Exception as e:
+            result.test("Resultado de execute()", False, str(e))
+        
+        print("\n📌 Teste 4: Savepoint desfeito sem abortar a transação externa")
+        try:
+            with db.transaction():
+                db.execute("UPDATE usuarios SET nome = 'Externa'")
+                try:
+                    with db.transaction():
+                        db.execute("UPDATE usuarios SET nome = 'Interna'")
+                        raise ValueError("desfaz o savepoint")
+                except ValueError:
+                    pass
+                result.test("Savepoint desfeito",
+                            db.fetch_one("SELECT nome FROM usuarios")['nome'] == 'Externa')
+            result.test("Transação externa confirmada",
+                        db.fetch_one("SELECT nome FROM usuarios")['nome'] == 'Externa')
+            try:
+                with db.transaction():
+                    db.execute("UPDATE usuarios SET nome = 'Perdida'")
+                    raise ValueError("desfaz tudo")
+            except ValueError:
+                pass
+            result.test("Rollback da transação",
+                        db.fetch_one("SELECT nome FROM usuarios")['nome'] == 'Externa')
+        except Exception as e:
+            result.test("Transações", False, str(e))
+        
+        print("\n📌 Teste 5: close() espera as conexões emprestadas a outras threads")
+        try:
+            emprestada, lidas = threading.Event(), []
+            
+            def usar_conexao():
+                with db.connection() as conn:
+                    emprestada.set()
+                    time.sleep(0.2)
+                    lidas.append(conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0])
+            
+            thread = threading.Thread(target=usar_conexao)
+            thread.start()
+            emprestada.wait()
+            db.close()
+            thread.join()
+            result.test("Conexão não foi fechada em uso", lidas == [1], str(lidas))
+        except Exception as e:
+            result.test("close() espera as conexões", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_carregamento_de_usuarios():
+    """Testa a leitura dos usuários em uma única consulta e o histórico sob demanda"""
+    print("\n" + "="*60)
+    print("TESTANDO CARREGAMENTO DE USUÁRIOS")
+    print("="*60)
+    result = TestResult()
+    
+    from repository import ClienteRepository, UsuarioRepository
+    
+    with banco_temporario(cache_size=0) as db:
+        usuario_repo, cliente_repo = UsuarioRepository(), ClienteRepository()
+        admin_id = usuario_repo.salvar(
+            Admin(None, 11111111111, "Admin", "admin@teste.com", "senha123", 7), 'admin',
+            {'admin_id': 7})
+        anunciante_id = usuario_repo.salvar(
+            Anunciante(22222222222, "Loja", "loja@teste.com", "senha123", "11999990000"),
+            'anunciante', {'telefone': "11999990000"})
+        cliente_id = usuario_repo.salvar(
+            Cliente(33333333333, "Cliente", "cliente@teste.com", "senha123"), 'cliente')
+        cliente_repo.salvar_pesquisa(cliente_id, "corolla")
+        
+        print("\n📌 Teste 1: Dados específicos de cada tipo na mesma consulta")
+        try:
+            admin, n = contar_consultas(db, lambda: usuario_repo.buscar_por_id(admin_id, 'admin'))
+            result.test("Admin com adminID", isinstance(admin, Admin) and admin.adminID == 7)
+            result.test("Admin lido com uma consulta", n == 1, f"{n} consultas")
+            anunciante, n = contar_consultas(
+                db, lambda: usuario_repo.buscar_por_id(anunciante_id, 'anunciante'))
+            result.test("Anunciante com telefone", anunciante.telefone == "11999990000")
+            result.test("Anunciante lido com uma consulta", n == 1, f"{n} consultas")
+            usuarios, n = contar_consultas(db, usuario_repo.listar_todos)
+            result.test("Listagem com todos os tipos", len(usuarios) == 3)
+            result.test("Listagem com uma consulta", n == 1, f"{n} consultas")
+        except Exception as e:
+            result.test("Leitura dos usuários", False, str(e))
+        
+        print("\n📌 Teste 2: Histórico do cliente lido só no primeiro acesso")
+        try:
+            cliente, n = contar_consultas(db, lambda: usuario_repo.buscar_por_id(cliente_id, 'cliente'))
+            result.test("Cliente lido sem o histórico", n == 1, f"{n} consultas")
+            historico, n = contar_consultas(db, lambda: cliente.historicoPesquisas)
+            result.test("Histórico carregado ao acessar", historico == ["corolla"] and n == 1,
+                        f"{historico}, {n} consultas")
+            _, n = contar_consultas(db, lambda: cliente.historicoPesquisas)
+            result.test("Histórico não é relido", n == 0, f"{n} consultas")
+        except Exception as e:
+            result.test("Histórico sob demanda", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_busca_textual():
+    """Testa a busca FTS5 de veículos por marca e modelo"""
+    print("\n" + "="*60)
+    print("TESTANDO BUSCA TEXTUAL (FTS5)")
+    print("="*60)
+    result = TestResult()
+    
+    from repository import VeiculoRepository
+    
+    with banco_temporario(cache_size=0) as db:
+        repo = VeiculoRepository()
+        corolla = repo.salvar(Veiculo("Toyota", "Corolla", 2020, 120000.0, 30000))
+        repo.salvar(Veiculo("Toyota", "Hilux", 2019, 200000.0, 60000))
+        citroen = repo.salvar(Veiculo("Citroën", "C3", 2018, 55000.0, 70000))
+        
+        def ids(filtro):
+            return [v.id for v in repo.buscar(filtro)]
+        
+        print("\n📌 Teste 1: Prefixos de palavras, todos os termos obrigatórios")
+        try:
+            result.test("FTS5 disponível", db.has_table('veiculos_fts'))
+            result.test("'toy cor' encontra só o Corolla", ids("toy cor") == [corolla],
+                        str(ids("toy cor")))
+            result.test("'toyota' encontra os dois Toyota", len(ids("toyota")) == 2)
+            result.test("Busca sem acento encontra marca acentuada", ids("citroen") == [citroen])
+            result.test("Aspas no filtro não quebram a consulta", ids('"corolla') == [corolla])
+            result.test("Operadores do FTS5 são tratados como texto",
+                        ids("toyota NOT corolla") == [], str(ids("toyota NOT corolla")))
+        except Exception as e:
+            result.test("Busca por prefixo", False, str(e))
+        
+        print("\n📌 Teste 2: Índice acompanha alterações e exclusões")
+        try:
+            repo.atualizar(corolla, {'modelo': 'Yaris'})
+            result.test("Modelo novo encontrado", ids("yaris") == [corolla])
+            result.test("Modelo antigo não encontrado", ids("corolla") == [])
+            repo.deletar(citroen)
+            result.test("Veículo excluído sai do índice", ids("citroen") == [])
+        except Exception as e:
+            result.test("Sincronização do índice", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_busca_filtrada():
+    """Testa os planos e a ordem dos resultados da busca filtrada"""
+    print("\n" + "="*60)
+    print("TESTANDO BUSCA FILTRADA")
+    print("="*60)
+    result = TestResult()
+    
+    from gerador import GeradorCatalogo
+    from repository import AnuncioRepository, VeiculoRepository
+    
+    with banco_temporario(cache_size=0) as db:
+        GeradorCatalogo(db, usuarios=50, veiculos=500).executar()
+        veiculos, anuncios = VeiculoRepository(), AnuncioRepository()
+        
+        def plano(buscar, **filtros):
+            with db.instrumentation.gravar() as gravacao:
+                buscar(**filtros)
+            sql, params = next(exemplo for chave, exemplo in gravacao.items()
+                               if chave.endswith("LIMIT ? OFFSET ?"))
+            return db.explain(sql, params)
+        
+        faixa_preco = dict(preco_min=30000, preco_max=80000)
+        faixa_ano = dict(ano_min=2015, ano_max=2020)
+        # (busca, filtros, índice esperado, ordena as linhas filtradas)
+        casos = [
+            (veiculos.buscar_filtrado, dict(ordem='preco'), 'idx_veiculos_preco', False),
+            (veiculos.buscar_filtrado, dict(ordem='ano_desc'), 'idx_veiculos_ano_preco', False),
+            (veiculos.buscar_filtrado, dict(ordem='km'), 'idx_veiculos_km', False),
+            (veiculos.buscar_filtrado, dict(faixa_preco, ordem='preco_desc'),
+             'idx_veiculos_preco', False),
+            (veiculos.buscar_filtrado, dict(faixa_ano, ordem='ano'), 'idx_veiculos_ano_preco', False),
+            (veiculos.buscar_filtrado, dict(km_max=20000, ordem='km'), 'idx_veiculos_km', False),
+            (veiculos.buscar_filtrado, dict(marcas=['Honda'], ordem='preco'),
+             'idx_veiculos_marca_preco', False),
+            (veiculos.buscar_filtrado, dict(faixa_preco, ordem='ano'), 'idx_veiculos_preco', True),
+            (anuncios.buscar_filtrado, dict(ordem='recentes'), 'idx_anuncios_status_data', False),
+            (anuncios.buscar_filtrado, dict(ordem='preco'), 'idx_veiculos_preco', False),
+            (anuncios.buscar_filtrado, dict(faixa_preco, ordem='preco'), 'idx_veiculos_preco', False),
+            (anuncios.buscar_filtrado, dict(faixa_ano, ordem='ano_desc'),
+             'idx_veiculos_ano_preco', False),
+        ]
+        
+        print("\n📌 Teste 1: Plano de cada combinação de filtro e ordenação")
+        for buscar, filtros, indice, ordena in casos:
+            nome = f"{buscar.__self__.__class__.__name__} {filtros}"
+            try:
+                detalhes = plano(buscar, **filtros)
+                ordenou = any('USE TEMP B-TREE FOR ORDER BY' in d for d in detalhes)
+                result.test(nome, any(indice in d for d in detalhes) and ordenou == ordena,
+                            " | ".join(detalhes))
+            except Exception as e:
+                result.test(nome, False, str(e))
+        
+        print("\n📌 Teste 2: Resultados na ordem pedida")
+        try:
+            pagina = veiculos.buscar_filtrado(**faixa_preco, ordem='preco_desc', limit=50).itens
+            precos = [v.preco for v in pagina]
+            result.test("Preço decrescente dentro da faixa",
+                        precos == sorted(precos, reverse=True)
+                        and all(30000 <= p <= 80000 for p in precos))
+            pagina = veiculos.buscar_filtrado(**faixa_preco, ordem='ano', limit=50).itens
+            chaves = [(v.ano, v.preco, v.id) for v in pagina]
+            result.test("Ano crescente, depois preço", chaves == sorted(chaves))
+            resultado = anuncios.buscar_filtrado(ordem='recentes', limit=50)
+            datas = [a.dataPublicacao for a in resultado.itens]
+            aprovados = db.fetch_one("SELECT COUNT(*) FROM anuncios WHERE status = 'Aprovado'")[0]
+            result.test("Anúncios aprovados, mais recentes primeiro",
+                        datas == sorted(datas, reverse=True)
+                        and all(a.status == 'Aprovado' for a in resultado.itens)
+                        and resultado.total == aprovados)
+        except Exception as e:
+            result.test("Ordem dos resultados", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_paginacao():
+    """Testa a paginação por chave dos métodos listar_*"""
+    print("\n" + "="*60)
+    print("TESTANDO PAGINAÇÃO POR CHAVE")
+    print("="*60)
+    result = TestResult()
+    
+    from gerador import GeradorCatalogo
+    from repository import (AnuncioRepository, Pagina, UsuarioRepository,
+                            VeiculoRepository)
+    
+    def percorrer(listar_pagina, limit, **filtros):
+        ids, paginas, token = [], 0, None
+        while True:
+            pagina = listar_pagina(after_id=token, limit=limit, **filtros)
+            ids.extend(item.id for item in pagina.itens)
+            paginas += 1
+            if not pagina.tem_mais:
+                return ids, paginas
+            token = pagina.token
+    
+    with banco_temporario(cache_size=0) as db:
+        GeradorCatalogo(db, usuarios=40, veiculos=150).executar()
+        usuarios, veiculos, anuncios = UsuarioRepository(), VeiculoRepository(), AnuncioRepository()
+        
+        print("\n📌 Teste 1: Percorrer todas as páginas")
+        casos = [
+            ("Usuários", usuarios.listar_pagina, {}, "SELECT id FROM usuarios"),
+            ("Clientes", usuarios.listar_pagina, dict(tipo='Cliente'),
+             "SELECT id FROM usuarios WHERE tipo = 'Cliente'"),
+            ("Veículos", veiculos.listar_pagina, {}, "SELECT id FROM veiculos"),
+            ("Anúncios", anuncios.listar_pagina, {}, "SELECT id FROM anuncios"),
+            ("Anúncios aprovados", anuncios.listar_pagina, dict(status='Aprovado'),
+             "SELECT id FROM anuncios WHERE status = 'Aprovado'"),
+        ]
+        for nome, listar_pagina, filtros, consulta in casos:
+            try:
+                esperado = sorted(row[0] for row in db.fetch_all(consulta))
+                ids, paginas = percorrer(listar_pagina, 7, **filtros)
+                result.test(f"{nome}: todos os ids, em ordem e sem repetição", ids == esperado,
+                            f"{len(ids)} de {len(esperado)}")
+                result.test(f"{nome}: {paginas} páginas de até 7", paginas == max(1, -(-len(esperado) // 7)))
+            except Exception as e:
+                result.test(nome, False, str(e))
+        
+        print("\n📌 Teste 2: Token de continuação")
+        try:
+            pagina = veiculos.listar_pagina(limit=5)
+            result.test("Token devolve o último id da página",
+                        Pagina.decodificar(pagina.token) == pagina.itens[-1].id == pagina.proximo_id)
+            pelo_token = [v.id for v in veiculos.listar_pagina(after_id=pagina.token, limit=5).itens]
+            pelo_id = [v.id for v in veiculos.listar_pagina(after_id=pagina.proximo_id, limit=5).itens]
+            result.test("Token e id levam à mesma página", pelo_token == pelo_id)
+            total = db.fetch_one("SELECT COUNT(*) FROM veiculos")[0]
+            ultima = veiculos.listar_pagina(limit=total)
+            result.test("Última página sem token", not ultima.tem_mais and ultima.token is None)
+        except Exception as e:
+            result.test("Token de continuação", False, str(e))
+        
+        try:
+            veiculos.listar_pagina(after_id="não é um token")
+            result.test("Token inválido rejeitado", False)
+        except ValueError:
+            result.test("Token inválido rejeitado", True)
+        
+        try:
+            veiculos.listar_pagina(limit=0)
+            result.test("Limite zero rejeitado", False)
+        except ValueError:
+            result.test("Limite zero rejeitado", True)
+        
+        print("\n📌 Teste 3: Próxima página é uma busca por chave")
+        try:
+            meio = db.fetch_one("SELECT id FROM anuncios ORDER BY id LIMIT 1 OFFSET 50")[0]
+            with db.instrumentation.gravar() as gravacao:
+                anuncios.listar_pagina(after_id=meio, limit=10)
+            sql, params = next(iter(gravacao.values()))
+            detalhes = db.explain(sql, params)
+            result.test("Sem OFFSET", "OFFSET" not in sql.upper(), sql)
+            result.test("Sem SCAN nem ordenação",
+                        not any(d.startswith('SCAN') or 'TEMP B-TREE' in d for d in detalhes),
+                        " | ".join(detalhes))
+        except Exception as e:
+            result.test("Plano da próxima página", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_mapa_de_identidade():
+    """Testa o mapa de identidade das sessões"""
+    print("\n" + "="*60)
+    print("TESTANDO MAPA DE IDENTIDADE")
+    print("="*60)
+    result = TestResult()
+    
+    import gc
+    from gerador import GeradorCatalogo
+    from identity_map import IdentityMap
+    from repository import AnuncioRepository, UsuarioRepository, VeiculoRepository
+    
+    with banco_temporario(cache_size=0) as db:
+        GeradorCatalogo(db, usuarios=20, veiculos=30).executar()
+        usuarios, veiculos, anuncios = UsuarioRepository(), VeiculoRepository(), AnuncioRepository()
+        anuncio_id = db.fetch_one("SELECT id FROM anuncios ORDER BY id LIMIT 1")[0]
+        
+        print("\n📌 Teste 1: Mesma chave, mesmo objeto")
+        try:
+            with db.session() as mapa:
+                anuncio = anuncios.buscar_por_id(anuncio_id)
+                repetido, consultas = contar_consultas(db, lambda: anuncios.buscar_por_id(anuncio_id))
+                result.test("Segunda busca devolve a mesma instância", repetido is anuncio)
+                result.test("Segunda busca vem da memória", consultas == 0, f"{consultas} consultas")
+                result.test("Veículo do anúncio é o canônico",
+                            veiculos.buscar_por_id(anuncio.veiculo.id) is anuncio.veiculo)
+                result.test("Anunciante do anúncio é o canônico",
+                            usuarios.buscar_por_id(anuncio.anunciante.id, 'anunciante')
+                            is anuncio.anunciante)
+                with db.session() as interno:
+                    result.test("Sessão aninhada reutiliza o mapa",
+                                interno is mapa and anuncios.buscar_por_id(anuncio_id) is anuncio)
+            result.test("Sem sessão cada busca cria um objeto",
+                        anuncios.buscar_por_id(anuncio_id) is not anuncios.buscar_por_id(anuncio_id))
+        except Exception as e:
+            result.test("Mesma chave, mesmo objeto", False, str(e))
+        
+        print("\n📌 Teste 2: Escritas atualizam o objeto carregado")
+        try:
+            with db.session():
+                anuncio = anuncios.buscar_por_id(anuncio_id)
+                veiculos.atualizar(anuncio.veiculo.id, {'preco': 12345.0})
+                result.test("Preço atualizado no objeto da sessão", anuncio.veiculo.preco == 12345.0)
+                anuncios.atualizar_status(anuncio_id, 'Rejeitado')
+                result.test("Status atualizado no objeto da sessão", anuncio.status == 'Rejeitado')
+                anuncios.deletar(anuncio_id)
+                result.test("Anúncio removido sai do mapa", anuncios.buscar_por_id(anuncio_id) is None)
+        except Exception as e:
+            result.test("Escritas atualizam o objeto carregado", False, str(e))
+        
+        print("\n📌 Teste 3: Escritas fora dos repositórios")
+        try:
+            with db.session():
+                anuncio = anuncios.listar_todos(limit=1)[0]
+                veiculo, anunciante = anuncio.veiculo, anuncio.anunciante
+                novo_status = 'Aprovado' if anuncio.status != 'Aprovado' else 'Pendente'
+                db.execute("UPDATE anuncios SET status = ? WHERE id = ?", (novo_status, anuncio.id))
+                db.execute("UPDATE veiculos SET preco = 1.0 WHERE id = ?", (veiculo.id,))
+                db.execute("UPDATE usuarios SET nome = 'Renomeado' WHERE id = ?", (anunciante.id,))
+                result.test("Busca pelo id continua vindo da memória",
+                            anuncios.buscar_por_id(anuncio.id).status != novo_status)
+                relido = anuncios.listar_todos(limit=1)[0]
+                result.test("Nova consulta devolve a mesma instância", relido is anuncio)
+                result.test("Anúncio corrigido pela linha lida", anuncio.status == novo_status, anuncio.status)
+                result.test("Veículo e anunciante corrigidos",
+                            anuncio.veiculo is veiculo and veiculo.preco == 1.0
+                            and anunciante.nome == 'Renomeado', f"{veiculo.preco} {anunciante.nome}")
+                db.execute("UPDATE veiculos SET quilometragem = 7 WHERE id = ?", (veiculo.id,))
+                result.test("Listagem de veículos também corrige",
+                            any(v is veiculo for v in veiculos.listar_todos()) and veiculo.quilometragem == 7)
+        except Exception as e:
+            result.test("Escritas fora dos repositórios", False, str(e))
+        
+        print("\n📌 Teste 4: Referências fracas")
+        try:
+            with db.session() as mapa:
+                for veiculo in veiculos.listar_todos(limit=10):
+                    pass
+                del veiculo
+                gc.collect()
+                result.test("Objetos sem uso saem do mapa", len(mapa) == 0, f"{len(mapa)} entradas")
+        except Exception as e:
+            result.test("Referências fracas", False, str(e))
+    
+    print("\n📌 Teste 5: atualizar respeita o lock do mapa")
+    try:
+        class Objeto:
+            valor = 0
+        mapa, objeto = IdentityMap(), Objeto()
+        mapa.registrar('t', 1, objeto)
+        with mapa._lock:
+            thread = threading.Thread(target=mapa.atualizar, args=('t', 1, {'valor': 1}))
+            thread.start()
+            thread.join(0.1)
+            result.test("Espera quem segura o lock", thread.is_alive() and objeto.valor == 0)
+        thread.join(1)
+        result.test("Aplica os valores ao liberar", objeto.valor == 1)
+    except Exception as e:
+        result.test("atualizar respeita o lock do mapa", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_cache_de_leitura():
+    """Testa o cache LRU/TTL com etiquetas e geração"""
+    print("\n" + "="*60)
+    print("TESTANDO CACHE DE LEITURA")
+    print("="*60)
+    result = TestResult()
+    
+    from cache import CacheLRU
+    
+    print("\n📌 Teste 1: LRU e expiração")
+    try:
+        cache = CacheLRU(max_entradas=2, ttl=60)
+        cache.obter_ou_carregar('a', lambda: 1)
+        cache.obter_ou_carregar('b', lambda: 2)
+        cache.obter_ou_carregar('a', lambda: 'recarregado')
+        cache.obter_ou_carregar('c', lambda: 3)
+        result.test("Sai a entrada menos usada",
+                    cache.obter_ou_carregar('a', lambda: 'recarregado') == 1
+                    and cache.obter_ou_carregar('b', lambda: 'novo') == 'novo')
+        result.test("Tamanho limitado", len(cache) == 2)
+        
+        cache = CacheLRU(max_entradas=10, ttl=0.05)
+        cache.obter_ou_carregar('a', lambda: 1)
+        time.sleep(0.1)
+        result.test("Entrada expirada é recarregada", cache.obter_ou_carregar('a', lambda: 2) == 2)
+        
+        cache.obter_ou_carregar('nada', lambda: None)
+        result.test("None não é guardado", cache.obter_ou_carregar('nada', lambda: 5) == 5)
+        
+        estatisticas = cache.estatisticas()
+        result.test("Estatísticas contam expirações e falhas",
+                    estatisticas['expiracoes'] == 1 and estatisticas['falhas'] == 4
+                    and estatisticas['acertos'] == 0, str(estatisticas))
+        
+        desligado = CacheLRU(max_entradas=0)
+        desligado.obter_ou_carregar('a', lambda: 1)
+        result.test("max_entradas=0 desliga o cache",
+                    desligado.obter_ou_carregar('a', lambda: 2) == 2 and len(desligado) == 0)
+    except Exception as e:
+        result.test("LRU e expiração", False, str(e))
+    
+    print("\n📌 Teste 2: Etiquetas e geração")
+    try:
+        cache = CacheLRU()
+        cache.obter_ou_carregar('linha1', lambda: 'l1', [('veiculos', 1)])
+        cache.obter_ou_carregar('linha2', lambda: 'l2', [('veiculos', 2)])
+        cache.obter_ou_carregar('lista', lambda: 'lista', [('veiculos', None)])
+        cache.obter_ou_carregar('outra', lambda: 'o', lambda valor: [('anuncios', 9)])
+        cache.invalidar('veiculos', 1)
+        restantes = {chave for chave in ('linha1', 'linha2', 'lista', 'outra')
+                     if cache.obter_ou_carregar(chave, lambda: 'recarregado') != 'recarregado'}
+        result.test("Escrita na linha remove a linha e as listagens",
+                    restantes == {'linha2', 'outra'}, str(restantes))
+        cache.invalidar('veiculos')
+        result.test("Escrita sem id remove toda a tabela",
+                    cache.obter_ou_carregar('linha2', lambda: 'novo') == 'novo'
+                    and cache.obter_ou_carregar('outra', lambda: 'novo') == 'o')
+        
+        def carga_com_escrita_concorrente():
+            cache.invalidar('veiculos', 3)
+            return 'antigo'
+        cache.obter_ou_carregar('corrida', carga_com_escrita_concorrente, [('veiculos', 3)])
+        result.test("Carga que cruzou uma invalidação não é guardada",
+                    cache.obter_ou_carregar('corrida', lambda: 'novo') == 'novo')
+    except Exception as e:
+        result.test("Etiquetas e geração", False, str(e))
+    
+    print("\n📌 Teste 3: Cache dos repositórios")
+    from models.Vehicle import Veiculo
+    from repository import VeiculoRepository
+    
+    with banco_temporario() as db:
+        try:
+            repo = VeiculoRepository()
+            veiculo_id = repo.salvar(Veiculo("Fiat", "Uno", 2010, 15000.0, 90000))
+            repo.buscar_por_id(veiculo_id)
+            veiculo, consultas = contar_consultas(db, lambda: repo.buscar_por_id(veiculo_id))
+            result.test("Segunda leitura vem do cache", consultas == 0 and veiculo.modelo == "Uno",
+                        f"{consultas} consultas")
+            repo.atualizar(veiculo_id, {'preco': 14000.0})
+            result.test("Atualização invalida a entrada", repo.buscar_por_id(veiculo_id).preco == 14000.0)
+            
+            try:
+                with db.transaction():
+                    db.execute("UPDATE veiculos SET preco = 1 WHERE id = ?", (veiculo_id,))
+                    result.test("Transação enxerga a própria escrita",
+                                repo.buscar_por_id(veiculo_id).preco == 1)
+                    raise RuntimeError("desfazer")
+            except RuntimeError:
+                pass
+            result.test("Rollback não deixa valor não confirmado no cache",
+                        repo.buscar_por_id(veiculo_id).preco == 14000.0)
+            result.test("Estatísticas expostas pelo Database", db.cache_stats()['acertos'] >= 1)
+        except Exception as e:
+            result.test("Cache dos repositórios", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_alteracoes_entre_processos():
+    """Testa a invalidação do cache por escritas de outro processo"""
+    print("\n" + "="*60)
+    print("TESTANDO ALTERAÇÕES ENTRE PROCESSOS")
+    print("="*60)
+    result = TestResult()
+    
+    import subprocess
+    import sys
+    from models.Vehicle import Veiculo
+    from repository import VeiculoRepository
+    
+    def outro_processo(db, sql):
+        subprocess.run([sys.executable, "-c",
+                        "import sqlite3, sys\n"
+                        "conn = sqlite3.connect(sys.argv[1])\n"
+                        "conn.execute(sys.argv[2])\n"
+                        "conn.commit()\n",
+                        db._db_path, sql], check=True)
+    
+    with banco_temporario() as db:
+        try:
+            repo = VeiculoRepository()
+            primeiro = repo.salvar(Veiculo("Fiat", "Uno", 2010, 15000.0, 90000))
+            segundo = repo.salvar(Veiculo("Fiat", "Palio", 2012, 18000.0, 70000))
+            repo.buscar_por_id(primeiro)
+            db.check_changes(force=True)
+            
+            print("\n📌 Teste 1: Escrita de outro processo")
+            outro_processo(db, f"UPDATE veiculos SET preco = 1000 WHERE id = {primeiro}")
+            result.test("Cache ainda tem o valor antigo", repo.buscar_por_id(primeiro).preco == 15000.0)
+            alteradas = db.check_changes(force=True)
+            result.test("Tabela alterada detectada", alteradas == ['veiculos'], str(alteradas))
+            result.test("Valor novo lido após a verificação", repo.buscar_por_id(primeiro).preco == 1000)
+            result.test("Nada mudou desde então", db.check_changes(force=True) == [])
+            
+            print("\n📌 Teste 2: Escritas do próprio processo")
+            repo.buscar_por_id(primeiro)
+            repo.atualizar(segundo, {'preco': 17000.0})
+            with db.transaction():
+                repo.atualizar(segundo, {'quilometragem': 71000})
+            alteradas = db.check_changes(force=True)
+            result.test("Escritas locais não contam como alteração", alteradas == [], str(alteradas))
+            _, consultas = contar_consultas(db, lambda: repo.buscar_por_id(primeiro))
+            result.test("Entrada de outra linha continua no cache", consultas == 0,
+                        f"{consultas} consultas")
+            
+            print("\n📌 Teste 3: Escrita de outro processo antes de uma local")
+            outro_processo(db, f"UPDATE veiculos SET preco = 2000 WHERE id = {primeiro}")
+            repo.atualizar(segundo, {'preco': 16000.0})
+            alteradas = db.check_changes(force=True)
+            result.test("Alteração externa não é encoberta pela local",
+                        alteradas == ['veiculos'], str(alteradas))
+            result.test("Valor externo lido", repo.buscar_por_id(primeiro).preco == 2000)
+            
+            print("\n📌 Teste 4: Sessão com objeto em uso")
+            with db.session():
+                # A referência mantém o objeto no mapa de identidade
+                veiculo = repo.buscar_por_id(primeiro)
+                repo.listar_todos()
+                db.check_changes(force=True)
+                outro_processo(db, "UPDATE veiculos SET preco = 3000")
+                alteradas = db.check_changes(force=True)
+                result.test("Tabela alterada detectada na sessão", alteradas == ['veiculos'], str(alteradas))
+                relido = repo.buscar_por_id(primeiro)
+                result.test("buscar_por_id relê a linha", relido.preco == 3000, str(relido.preco))
+                result.test("Listagem relida",
+                            all(v.preco == 3000 for v in repo.listar_todos()))
+                result.test("Objeto novo passa a ser o canônico",
+                            repo.buscar_por_id(primeiro) is relido and veiculo is not relido)
+        except Exception as e:
+            result.test("Alterações entre processos", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_gravacao_em_lote():
+    """Testa o salvar_muitos dos repositórios"""
+    print("\n" + "="*60)
+    print("TESTANDO GRAVAÇÃO EM LOTE")
+    print("="*60)
+    result = TestResult()
+    
+    from models.Advertisement import Anuncio
+    from models.Announcer import Anunciante
+    from models.Client import Cliente
+    from models.Vehicle import Veiculo
+    from repository import AnuncioRepository, UsuarioRepository, VeiculoRepository
+    
+    with banco_temporario() as db:
+        usuarios, veiculos, anuncios = UsuarioRepository(), VeiculoRepository(), AnuncioRepository()
+        
+        print("\n📌 Teste 1: IDs na ordem de entrada")
+        try:
+            lote = [(Cliente(100 + i, f"Cliente {i}", f"c{i}@lote.com", "x"), 'cliente')
+                    for i in range(3)]
+            lote.insert(1, (Anunciante(200, "Revenda", "revenda@lote.com", "x", "1199"),
+                            'anunciante', {'telefone': '1199'}))
+            resultado = usuarios.salvar_muitos(lote)
+            emails = [db.fetch_one("SELECT email FROM usuarios WHERE id = ?", (i,))[0]
+                      for i in resultado.ids]
+            result.test("Usuários: cada id aponta para a linha certa",
+                        resultado.sucesso and emails == [u.email for u, *_ in lote], str(emails))
+            anunciante_id = resultado.ids[1]
+            result.test("Dados do tipo gravados com o id do lote",
+                        usuarios.buscar_por_id(anunciante_id, 'anunciante').telefone == '1199')
+            result.test("Objetos recebem o id", [u.id for u, *_ in lote] == resultado.ids)
+            
+            # Apaga as últimas linhas: com AUTOINCREMENT os ids não são reaproveitados
+            carros = [Veiculo("Fiat", f"Modelo {i}", 2010 + i, 10000.0 + i, 1000 * i) for i in range(6)]
+            primeiros = veiculos.salvar_muitos(carros[:3], anunciante_id)
+            db.execute("DELETE FROM veiculos WHERE id = ?", (primeiros.ids[-1],))
+            resultado = veiculos.salvar_muitos(carros[3:], anunciante_id)
+            modelos = [db.fetch_one("SELECT modelo FROM veiculos WHERE id = ?", (i,))[0]
+                       for i in resultado.ids]
+            result.test("Veículos: ids corretos após remover o último",
+                        modelos == [v.modelo for v in carros[3:]], f"{resultado.ids} {modelos}")
+            
+            vendidos = [(Anuncio("2024-01-0%d" % (i + 1), 'Pendente', v, None), v.id, anunciante_id)
+                        for i, v in enumerate(carros[3:])]
+            resultado = anuncios.salvar_muitos(vendidos)
+            ligados = [db.fetch_one("SELECT veiculo_id FROM anuncios WHERE id = ?", (i,))[0]
+                       for i in resultado.ids]
+            result.test("Anúncios: cada id aponta para o veículo certo",
+                        ligados == [v.id for v in carros[3:]], str(ligados))
+            result.test("Lote vazio", anuncios.salvar_muitos([]).ids == [])
+        except Exception as e:
+            result.test("IDs na ordem de entrada", False, str(e))
+        
+        print("\n📌 Teste 2: Linhas rejeitadas não abortam o lote")
+        try:
+            lote = [(Cliente(300, "Novo 1", "novo1@lote.com", "x"), 'cliente'),
+                    (Cliente(301, "Repetido", "c0@lote.com", "x"), 'cliente'),
+                    (Cliente(302, "Novo 2", "novo2@lote.com", "x"), 'cliente')]
+            antes = usuarios.contar()
+            resultado = usuarios.salvar_muitos(lote)
+            result.test("Linha com email repetido rejeitada",
+                        [posicao for posicao, _ in resultado.erros] == [1]
+                        and 'UNIQUE' in resultado.erros[0][1], str(resultado.erros))
+            result.test("Posição rejeitada sem id", resultado.ids[1] is None
+                        and None not in (resultado.ids[0], resultado.ids[2]))
+            result.test("Demais linhas gravadas", usuarios.contar() == antes + 2
+                        and usuarios.buscar_por_email("novo2@lote.com")[0].id == resultado.ids[2])
+            
+            extra = Veiculo("Fiat", "Extra", 2020, 30000.0, 0)
+            extra_id = veiculos.salvar(extra, anunciante_id)
+            repetido = db.fetch_one("SELECT veiculo_id FROM anuncios LIMIT 1")[0]
+            resultado = anuncios.salvar_muitos([
+                (Anuncio("2024-02-01", 'Pendente', extra, None), repetido, anunciante_id),
+                (Anuncio("2024-02-02", 'Pendente', extra, None), extra_id, anunciante_id)])
+            result.test("Anúncio de veículo já anunciado rejeitado",
+                        [posicao for posicao, _ in resultado.erros] == [0]
+                        and resultado.ids[1] is not None
+                        and anuncios.buscar_por_id(resultado.ids[1]).veiculo.id == extra_id)
+        except Exception as e:
+            result.test("Linhas rejeitadas não abortam o lote", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_importador():
+    """Testa a importação em lotes com retomada"""
+    print("\n" + "="*60)
+    print("TESTANDO IMPORTADOR")
+    print("="*60)
+    result = TestResult()
+    
+    import csv
+    from importador import Importador
+    from models.Announcer import Anunciante
+    from repository import UsuarioRepository
+    
+    class Interrompida(Exception):
+        pass
+    
+    with banco_temporario() as db:
+        UsuarioRepository().salvar(Anunciante(12345678901, "Revenda", "revenda@imp.com", "x", "1199"),
+                                   'anunciante', {'telefone': '1199'})
+        caminho = os.path.join(os.path.dirname(db._db_path), 'catalogo.csv')
+        linhas = [
+            dict(marca='Fiat', modelo='Uno', ano='2010', preco='R$ 15.000,00',
+                 quilometragem='90.000 km', anunciante_cpf='123.456.789-01', status='aprovado'),
+            dict(marca='Fiat', modelo='Palio', ano='1800', preco='1', quilometragem='1',
+                 anunciante_cpf='12345678901'),
+            dict(marca='VW', modelo='Gol', ano='2015', preco='30000', quilometragem='50000',
+                 anunciante_email='ninguem@imp.com'),
+            dict(marca='VW', modelo='Fox', ano='2016', preco='35000', quilometragem='40000',
+                 anunciante_email='revenda@imp.com', status='Pendente',
+                 data_publicacao='2001-01-01'),
+        ]
+        linhas += [dict(marca='Honda', modelo=f'Civic {i}', ano='2018', preco='80000',
+                        quilometragem='10000', anunciante_email='revenda@imp.com')
+                   for i in range(6)]
+        with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+            escritor = csv.DictWriter(arquivo, fieldnames=['marca', 'modelo', 'ano', 'preco',
+                                                           'quilometragem', 'anunciante_cpf',
+                                                           'anunciante_email', 'status',
+                                                           'data_publicacao'])
+            escritor.writeheader()
+            escritor.writerows(linhas)
+        # Anúncio recusado pelo banco, depois de o veículo da linha ser gravado
+        db.execute("""
+            CREATE TRIGGER recusa_anuncio BEFORE INSERT ON anuncios
+            WHEN NEW.data_publicacao = '2001-01-01'
+            BEGIN SELECT RAISE(ABORT, 'anúncio recusado'); END
+        """)
+        
+        print("\n📌 Teste 1: Interrupção e retomada")
+        try:
+            def interromper(parcial):
+                if parcial['lidas'] >= 6:
+                    raise Interrompida()
+            
+            try:
+                Importador(db, caminho, tamanho_lote=3, processos=0).executar(interromper)
+                result.test("Importação interrompida", False)
+            except Interrompida:
+                pass
+            ponto = Importador(db, caminho).ponto_de_retomada()
+            result.test("Ponto de retomada após o segundo lote",
+                        ponto['linhas_processadas'] == 6 and not ponto['concluida'], str(ponto))
+            
+            importador = Importador(db, caminho, tamanho_lote=3, processos=0)
+            relatorio = importador.executar()
+            result.test("Retomada continua da linha 7",
+                        relatorio['retomada_em'] == 6 and relatorio['lidas'] == 4, str(relatorio))
+            ponto = importador.ponto_de_retomada()
+            result.test("Totais acumulados entre execuções",
+                        ponto['concluida'] and ponto['importadas'] == 7 and ponto['rejeitadas'] == 3,
+                        str(ponto))
+            result.test("Nenhuma linha gravada duas vezes",
+                        db.fetch_one("SELECT COUNT(*) FROM veiculos")[0] == 7)
+        except Exception as e:
+            result.test("Interrupção e retomada", False, str(e))
+        
+        print("\n📌 Teste 2: Erros por linha do arquivo")
+        try:
+            importador = Importador(db, caminho, tamanho_lote=4, processos=0)
+            db.execute("DELETE FROM veiculos")
+            relatorio = importador.executar()
+            numeros = [numero for numero, _ in importador.erros]
+            result.test("Linhas rejeitadas: ano, anunciante e anúncio", numeros == [2, 3, 4],
+                        str(importador.erros))
+            result.test("Anúncio recusado informa a mensagem do banco",
+                        'anúncio recusado' in dict(importador.erros)[4])
+            result.test("Contadores", relatorio['importadas'] == 7 and relatorio['rejeitadas'] == 3,
+                        str(relatorio))
+            result.test("Veículo do anúncio recusado não fica gravado",
+                        db.fetch_one("SELECT COUNT(*) FROM veiculos WHERE modelo = 'Fox'")[0] == 0)
+            result.test("Anúncio da linha válida gravado",
+                        db.fetch_one("SELECT status FROM anuncios")[0] == 'Aprovado')
+        except Exception as e:
+            result.test("Erros por linha do arquivo", False, str(e))
+        
+        print("\n📌 Teste 3: Mensagens de erro limitadas")
+        try:
+            importador = Importador(db, caminho, tamanho_lote=4, processos=0, max_erros=2)
+            db.execute("DELETE FROM veiculos")
+            importador.reiniciar()
+            relatorio = importador.executar()
+            result.test("Só as primeiras mensagens guardadas",
+                        [numero for numero, _ in importador.erros] == [2, 3], str(importador.erros))
+            result.test("Total de rejeitadas completo", relatorio['rejeitadas'] == 3, str(relatorio))
+        except Exception as e:
+            result.test("Mensagens de erro limitadas", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_exportador():
+    """Testa os formatos e a divisão dos arquivos exportados"""
+    print("\n" + "="*60)
+    print("TESTANDO EXPORTADOR")
+    print("="*60)
+    result = TestResult()
+    
+    import csv
+    import gzip
+    import json
+    from exportador import COLUNAS, exportar, formato_do_arquivo
+    from gerador import GeradorCatalogo
+    
+    with banco_temporario() as db:
+        GeradorCatalogo(db, usuarios=20, veiculos=60).executar()
+        pasta = os.path.dirname(db._db_path)
+        
+        def ids(consulta, params=()):
+            return [row[0] for row in db.fetch_all(consulta, params)]
+        
+        def ler_csv(caminho):
+            with open(caminho, newline='', encoding='utf-8') as arquivo:
+                return list(csv.DictReader(arquivo))
+        
+        def ler_json(caminho):
+            abrir = gzip.open if caminho.endswith('.gz') else open
+            with abrir(caminho, 'rt', encoding='utf-8') as arquivo:
+                return [json.loads(linha) for linha in arquivo]
+        
+        aprovados = ids("SELECT id FROM anuncios WHERE status = 'Aprovado' ORDER BY id")
+        todos = ids("SELECT id FROM anuncios ORDER BY id")
+        
+        print("\n📌 Teste 1: Formatos")
+        try:
+            result.test("Formato pela extensão",
+                        [formato_do_arquivo(n) for n in ('a.csv', 'a.ndjson', 'a.JSONL', 'a.jsonl.gz')]
+                        == ['csv', 'jsonl', 'jsonl', 'ndjson.gz'])
+            
+            relatorio = exportar(os.path.join(pasta, 'aprovados.csv'))
+            linhas = ler_csv(relatorio['arquivos'][0])
+            result.test("CSV com os aprovados, em ordem de id",
+                        [int(l['anuncio_id']) for l in linhas] == aprovados
+                        and relatorio['linhas'] == len(aprovados))
+            result.test("CSV com todas as colunas", list(linhas[0]) == COLUNAS)
+            
+            relatorio = exportar(os.path.join(pasta, 'todos.jsonl'), status=None)
+            linhas = ler_json(relatorio['arquivos'][0])
+            anuncio = db.fetch_one("""
+                SELECT a.status, v.marca, v.preco, u.email
+                FROM anuncios a JOIN veiculos v ON v.id = a.veiculo_id
+                JOIN usuarios u ON u.id = a.anunciante_id WHERE a.id = ?
+            """, (linhas[0]['anuncio_id'],))
+            result.test("JSONL com todos os status", [l['anuncio_id'] for l in linhas] == todos)
+            result.test("Dados do veículo e do anunciante",
+                        (linhas[0]['status'], linhas[0]['marca'], linhas[0]['preco'],
+                         linhas[0]['anunciante_email']) == tuple(anuncio))
+            
+            relatorio = exportar(os.path.join(pasta, 'todos.ndjson.gz'), status=None)
+            result.test("NDJSON compactado igual ao JSONL",
+                        ler_json(relatorio['arquivos'][0]) == linhas)
+            
+            try:
+                exportar(os.path.join(pasta, 'x.xml'), formato='xml')
+                result.test("Formato inválido rejeitado", False)
+            except ValueError:
+                result.test("Formato inválido rejeitado", True)
+        except Exception as e:
+            result.test("Formatos", False, str(e))
+        
+        print("\n📌 Teste 2: Filtros")
+        try:
+            datas = sorted(row[0] for row in db.fetch_all("SELECT data_publicacao FROM anuncios"))
+            inicio, fim = datas[len(datas) // 4], datas[len(datas) // 2]
+            relatorio = exportar(os.path.join(pasta, 'janela.jsonl'), status=None,
+                                 data_inicio=inicio, data_fim=fim)
+            esperado = ids("""SELECT id FROM anuncios WHERE data_publicacao BETWEEN ? AND ?
+                              ORDER BY id""", (inicio, fim))
+            result.test("Janela de datas inclusiva",
+                        [l['anuncio_id'] for l in ler_json(relatorio['arquivos'][0])] == esperado)
+            
+            anunciante_id = db.fetch_one("SELECT anunciante_id FROM anuncios LIMIT 1")[0]
+            relatorio = exportar(os.path.join(pasta, 'anunciante.jsonl'), status=None,
+                                 anunciante_id=anunciante_id)
+            esperado = ids("SELECT id FROM anuncios WHERE anunciante_id = ? ORDER BY id",
+                           (anunciante_id,))
+            result.test("Só os anúncios do anunciante",
+                        [l['anuncio_id'] for l in ler_json(relatorio['arquivos'][0])] == esperado)
+            
+            relatorio = exportar(os.path.join(pasta, 'vazio.csv'), data_inicio='2999-01-01')
+            result.test("Exportação vazia gera CSV só com cabeçalho",
+                        relatorio['linhas'] == 0 and ler_csv(relatorio['arquivos'][0]) == []
+                        and os.path.getsize(relatorio['arquivos'][0]) > 0)
+        except Exception as e:
+            result.test("Filtros", False, str(e))
+        
+        print("\n📌 Teste 3: Divisão em partes")
+        try:
+            relatorio = exportar(os.path.join(pasta, 'partes.csv'), status=None,
+                                 linhas_por_arquivo=7, chunk_size=5)
+            nomes = [os.path.basename(c) for c in relatorio['arquivos']]
+            partes = [ler_csv(c) for c in relatorio['arquivos']]
+            result.test("Quantidade e nomes das partes",
+                        len(nomes) == -(-len(todos) // 7) and nomes[0] == 'partes-0001.csv', str(nomes))
+            result.test("Até 7 linhas por parte, cada uma com cabeçalho",
+                        all(0 < len(p) <= 7 for p in partes))
+            result.test("Partes juntas têm todas as linhas, sem repetição",
+                        [int(l['anuncio_id']) for p in partes for l in p] == todos)
+            
+            relatorio = exportar(os.path.join(pasta, 'partes.ndjson.gz'), status=None,
+                                 linhas_por_arquivo=len(todos))
+            result.test("Divisão exata não gera parte vazia", len(relatorio['arquivos']) == 1
+                        and relatorio['arquivos'][0].endswith('partes-0001.ndjson.gz'))
+        except Exception as e:
+            result.test("Divisão em partes", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_moderacao_em_lote():
+    """Testa as atualizações de status em lote"""
+    print("\n" + "="*60)
+    print("TESTANDO MODERAÇÃO EM LOTE")
+    print("="*60)
+    result = TestResult()
+    
+    import sqlite3
+    from models.Advertisement import Anuncio
+    from models.Announcer import Anunciante
+    from models.Vehicle import Veiculo
+    from repository import AnuncioRepository, UsuarioRepository, VeiculoRepository
+    
+    with banco_temporario() as db:
+        usuarios, veiculos, anuncios = UsuarioRepository(), VeiculoRepository(), AnuncioRepository()
+        revendas = [usuarios.salvar(Anunciante(500 + i, f"Revenda {i}", f"r{i}@lote.com", "x", "11"),
+                                    'anunciante', {'telefone': '11'}) for i in range(2)]
+        carros = [("Toyota", "Corolla", 0), ("Toyota", "Hilux", 0), ("Toyota", "Etios", 1),
+                  ("Honda", "Civic", 0), ("Honda", "Fit", 1), ("Fiat", "Uno", 0)]
+        ids = []
+        for marca, modelo, revenda in carros:
+            veiculo = Veiculo(marca, modelo, 2020, 50000.0, 0)
+            veiculo_id = veiculos.salvar(veiculo, revendas[revenda])
+            ids.append(anuncios.salvar(Anuncio("2024-01-01", 'Pendente', veiculo, None),
+                                       veiculo_id, revendas[revenda]))
+        corolla, hilux, etios, civic, fit, uno = ids
+        
+        def status(*escolhidos):
+            return [db.fetch_one("SELECT status FROM anuncios WHERE id = ?", (i,))[0]
+                    for i in escolhidos]
+        
+        print("\n📌 Teste 1: Lista de ids")
+        try:
+            anuncios.atualizar_status(uno, 'Rejeitado')
+            pendentes = [a.id for a in anuncios.listar_por_status('Pendente')]
+            with db.session():
+                carregado = anuncios.buscar_por_id(civic)
+                alterados, consultas = contar_consultas(db, lambda: anuncios.atualizar_status_em_lote(
+                    [civic, fit, uno, 99999], 'Aprovado', status_atual='Pendente'))
+                result.test("Só os pendentes existentes mudam", alterados == [civic, fit], str(alterados))
+                result.test("Um único comando SQL", consultas == 1, f"{consultas} comandos")
+                result.test("Objeto carregado recebe o novo status", carregado.status == 'Aprovado')
+            result.test("Anúncio já moderado não é revertido", status(uno) == ['Rejeitado'])
+            result.test("Listagem em cache atualizada",
+                        [a.id for a in anuncios.listar_por_status('Pendente')]
+                        == [i for i in pendentes if i not in (civic, fit)])
+            result.test("Repetir não altera nada",
+                        anuncios.atualizar_status_em_lote([civic, fit], 'Aprovado') == []
+                        and anuncios.atualizar_status_em_lote([], 'Aprovado') == [])
+        except Exception as e:
+            result.test("Lista de ids", False, str(e))
+        
+        print("\n📌 Teste 2: Por filtro")
+        try:
+            alterados = anuncios.atualizar_status_por_filtro('Aprovado', 'toyota',
+                                                             anunciante_id=revendas[0])
+            result.test("Toyotas pendentes da revenda", alterados == [corolla, hilux], str(alterados))
+            result.test("Toyota de outra revenda continua pendente", status(etios) == ['Pendente'])
+            result.test("Filtro por modelo",
+                        anuncios.atualizar_status_por_filtro('Rejeitado', 'etios') == [etios])
+        except Exception as e:
+            result.test("Por filtro", False, str(e))
+        
+        print("\n📌 Teste 3: Atomicidade")
+        try:
+            anuncios.atualizar_status_em_lote([corolla, etios], 'Pendente')
+            try:
+                anuncios.atualizar_status_em_lote([corolla, etios], 'Vendido')
+                result.test("Status inválido rejeitado", False)
+            except sqlite3.IntegrityError:
+                result.test("Status inválido rejeitado", True)
+            result.test("Nenhuma linha alterada pela falha", status(corolla, etios) == ['Pendente'] * 2)
+            contagens = {row[0]: row[1] for row in db.fetch_all(
+                "SELECT status, COUNT(*) FROM anuncios GROUP BY status")}
+            result.test("Contadores por status acompanham o lote",
+                        all(anuncios.contar(s) == n for s, n in contagens.items()), str(contagens))
+        except Exception as e:
+            result.test("Atomicidade", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_fila_moderacao():
+    """Testa as reservas da fila de moderação"""
+    print("\n" + "="*60)
+    print("TESTANDO FILA DE MODERAÇÃO")
+    print("="*60)
+    result = TestResult()
+    
+    from models.Advertisement import Anuncio
+    from models.Announcer import Anunciante
+    from models.Vehicle import Veiculo
+    from moderacao import FilaModeracao
+    from repository import AnuncioRepository, UsuarioRepository, VeiculoRepository
+    
+    with banco_temporario() as db:
+        veiculos, anuncios = VeiculoRepository(), AnuncioRepository()
+        revenda = UsuarioRepository().salvar(Anunciante(700, "Revenda", "r@fila.com", "x", "11"),
+                                             'anunciante', {'telefone': '11'})
+        # Ids em ordem inversa das datas: a fila segue data_publicacao
+        pendentes = []
+        for dia in range(20, 0, -1):
+            veiculo = Veiculo("Fiat", f"Uno {dia}", 2015, 20000.0, 0)
+            veiculo_id = veiculos.salvar(veiculo, revenda)
+            pendentes.append(anuncios.salvar(Anuncio(f"2024-01-{dia:02d}", 'Pendente', veiculo, None),
+                                             veiculo_id, revenda))
+        na_ordem = pendentes[::-1]
+        fila = FilaModeracao()
+        
+        print("\n📌 Teste 1: Exclusividade e ordem")
+        try:
+            primeiro = [a.id for a in fila.reivindicar(1, quantidade=4)]
+            segundo = [a.id for a in fila.reivindicar(2, quantidade=4)]
+            result.test("Mais antigos primeiro", primeiro == na_ordem[:4], str(primeiro))
+            result.test("Outro admin recebe os seguintes", segundo == na_ordem[4:8], str(segundo))
+            result.test("Reivindicar de novo renova as mesmas reservas",
+                        [a.id for a in fila.reivindicar(1, quantidade=4)] == primeiro)
+            result.test("Lote maior completa com novos anúncios",
+                        [a.id for a in fila.reivindicar(1, quantidade=6)] == primeiro + na_ordem[8:10])
+            result.test("Situação da fila", fila.situacao() == {'disponiveis': 10, 'reservados': 10},
+                        str(fila.situacao()))
+            result.test("Só o dono conclui", fila.aprovar(2, primeiro[:1]) == []
+                        and fila.aprovar(1, primeiro[:1]) == primeiro[:1])
+            result.test("Liberar devolve à fila",
+                        fila.liberar(2) == sorted(segundo)
+                        and fila.situacao() == {'disponiveis': 14, 'reservados': 5})
+        except Exception as e:
+            result.test("Exclusividade e ordem", False, str(e))
+        
+        print("\n📌 Teste 2: Reservas vencidas e anúncios já moderados")
+        try:
+            fila.liberar(1)
+            curta = FilaModeracao(duracao=0.05)
+            vencidos = [a.id for a in curta.reivindicar(1, quantidade=3)]
+            time.sleep(0.1)
+            result.test("Reserva vencida não pode ser concluída", curta.aprovar(1, vencidos) == [])
+            result.test("Reserva vencida volta para a fila",
+                        [a.id for a in fila.reivindicar(2, quantidade=3)] == vencidos)
+            
+            anuncios.atualizar_status(vencidos[0], 'Rejeitado')
+            lote = [a.id for a in fila.reivindicar(2, quantidade=3)]
+            result.test("Anúncio moderado por fora sai das reservas",
+                        vencidos[0] not in lote and len(lote) == 3 and lote[:2] == vencidos[1:], str(lote))
+            fila.liberar(2)
+        except Exception as e:
+            result.test("Reservas vencidas", False, str(e))
+        
+        print("\n📌 Teste 3: Admins concorrentes")
+        try:
+            disponiveis = fila.situacao()['disponiveis']
+            lotes, falhas = {}, []
+            
+            def moderar(admin_id):
+                try:
+                    lotes[admin_id] = [a.id for a in fila.reivindicar(admin_id, quantidade=5)]
+                except Exception as e:
+                    falhas.append(e)
+            
+            threads = [threading.Thread(target=moderar, args=(admin_id,)) for admin_id in range(10, 14)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            reservados = [i for lote in lotes.values() for i in lote]
+            result.test("Nenhum anúncio reservado duas vezes",
+                        not falhas and len(reservados) == len(set(reservados)) == min(20, disponiveis),
+                        f"{falhas} {len(reservados)} de {disponiveis}")
+        except Exception as e:
+            result.test("Admins concorrentes", False, str(e))
+        
+        print("\n📌 Teste 4: Planos das consultas da fila")
+        try:
+            with db.instrumentation.gravar() as gravacao:
+                fila.reivindicar(99, quantidade=2)
+            planos = {sql: db.explain(sql, params) for sql, params in gravacao.values()
+                      if 'moderacao_leases' in sql}
+            result.test("Nenhuma árvore B temporária",
+                        not any('TEMP B-TREE' in d for p in planos.values() for d in p))
+            result.test("Nenhuma varredura de moderacao_leases",
+                        not any(d.startswith('SCAN') for p in planos.values() for d in p),
+                        str(planos))
+            result.test("Reservas vencidas pelo índice de expiração",
+                        any('idx_moderacao_leases_expira' in d for p in planos.values() for d in p))
+        except Exception as e:
+            result.test("Planos das consultas da fila", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_estatisticas():
+    """Testa os resumos mantidos por gatilhos contra as tabelas"""
+    print("\n" + "="*60)
+    print("TESTANDO ESTATÍSTICAS")
+    print("="*60)
+    result = TestResult()
+    
+    import math
+    from estatisticas import Estatisticas
+    from gerador import GeradorCatalogo
+    from models.Vehicle import Veiculo
+    from repository import AnuncioRepository, UsuarioRepository, VeiculoRepository
+    
+    def por_marca_direto(db):
+        """Distribuição por marca calculada com GROUP BY sobre veiculos"""
+        marcas = {}
+        for row in db.fetch_all("""
+            SELECT marca, COUNT(*) AS n,
+                   MIN(preco), MAX(preco), AVG(preco), AVG(preco * preco),
+                   MIN(quilometragem), MAX(quilometragem), AVG(quilometragem),
+                   AVG(quilometragem * quilometragem),
+                   MIN(ano), MAX(ano), AVG(ano), AVG(ano * ano)
+            FROM veiculos GROUP BY marca
+        """):
+            campos = {}
+            for i, nome in enumerate(('preco', 'quilometragem', 'ano')):
+                minimo, maximo, media, media_q = row[2 + 4 * i: 6 + 4 * i]
+                campos[nome] = (minimo, maximo, media, math.sqrt(max(media_q - media * media, 0.0)))
+            marcas[row['marca']] = (row['n'], campos)
+        return marcas
+    
+    def confere(estatisticas, db):
+        """Compara os resumos com os valores calculados direto das tabelas"""
+        direto = por_marca_direto(db)
+        resumo = {m['marca']: m for m in estatisticas.por_marca()}
+        if set(resumo) != set(direto):
+            return False, f"marcas {sorted(resumo)} != {sorted(direto)}"
+        for marca, (n, campos) in direto.items():
+            if resumo[marca]['veiculos'] != n:
+                return False, f"{marca}: {resumo[marca]['veiculos']} != {n}"
+            for nome, (minimo, maximo, media, desvio) in campos.items():
+                valores = resumo[marca][nome]
+                if (valores['min'], valores['max']) != (minimo, maximo) \
+                        or not math.isclose(valores['media'], media, rel_tol=1e-9) \
+                        or not math.isclose(valores['desvio'], desvio, rel_tol=1e-6, abs_tol=1e-6):
+                    return False, f"{marca}.{nome}: {valores} != {(minimo, maximo, media, desvio)}"
+        return True, ""
+    
+    with banco_temporario() as db:
+        GeradorCatalogo(db, usuarios=30, veiculos=200).executar()
+        estatisticas = Estatisticas()
+        usuarios, veiculos, anuncios = UsuarioRepository(), VeiculoRepository(), AnuncioRepository()
+        
+        print("\n📌 Teste 1: Após a carga inicial")
+        try:
+            result.test("Contagens iguais às do GROUP BY",
+                        estatisticas.contagens() == estatisticas.calcular(),
+                        f"{estatisticas.contagens()} != {estatisticas.calcular()}")
+            result.test("Distribuição por marca igual à das tabelas", *confere(estatisticas, db))
+        except Exception as e:
+            result.test("Após a carga inicial", False, str(e))
+        
+        print("\n📌 Teste 2: Após atualizações e remoções")
+        try:
+            ids = [row[0] for row in db.fetch_all("SELECT id FROM veiculos ORDER BY id")]
+            extremos = db.fetch_one("""
+                SELECT (SELECT id FROM veiculos ORDER BY preco DESC LIMIT 1),
+                       (SELECT id FROM veiculos ORDER BY quilometragem LIMIT 1)
+            """)
+            veiculos.atualizar(extremos[0], {'preco': 1.0})       # máximo vira mínimo
+            veiculos.deletar(extremos[1])                        # remove um mínimo
+            veiculos.atualizar(ids[0], {'marca': 'Marca Nova', 'ano': 1990})
+            for veiculo_id in ids[10:30]:
+                veiculos.deletar(veiculo_id)                     # anúncios saem em cascata
+            veiculos.salvar_muitos([Veiculo("Marca Nova", f"M{i}", 2000 + i, 1000.0 * i, 10 * i)
+                                    for i in range(5)])
+            pendentes = [a.id for a in anuncios.listar_por_status('Pendente')]
+            anuncios.atualizar_status_em_lote(pendentes[:5], 'Aprovado')
+            anunciante = db.fetch_one("SELECT anunciante_id FROM veiculos WHERE anunciante_id IS NOT NULL")[0]
+            usuarios.deletar(anunciante)                          # cascata para os anúncios
+            try:
+                with db.transaction():
+                    veiculos.atualizar(ids[40], {'preco': 10 ** 9})
+                    raise RuntimeError("desfazer")
+            except RuntimeError:
+                pass
+            
+            result.test("Contagens iguais às do GROUP BY",
+                        estatisticas.contagens() == estatisticas.calcular(),
+                        f"{estatisticas.contagens()} != {estatisticas.calcular()}")
+            result.test("Distribuição por marca igual à das tabelas", *confere(estatisticas, db))
+            
+            for veiculo_id in [row[0] for row in db.fetch_all(
+                    "SELECT id FROM veiculos WHERE marca = 'Marca Nova'")]:
+                veiculos.deletar(veiculo_id)
+            result.test("Marca sem veículos sai do resumo",
+                        'Marca Nova' not in {m['marca'] for m in estatisticas.por_marca()})
+        except Exception as e:
+            result.test("Após atualizações e remoções", False, str(e))
+        
+        print("\n📌 Teste 3: Recalcular")
+        try:
+            antes = estatisticas.resumo(limite_marcas=None)
+            db.execute("DELETE FROM contagens")
+            db.execute("DELETE FROM estatisticas_marca")
+            estatisticas.recalcular()
+            depois = estatisticas.resumo(limite_marcas=None)
+            result.test("Recalcular reconstrói os mesmos números",
+                        depois['usuarios'] == antes['usuarios'] and depois['anuncios'] == antes['anuncios']
+                        and depois['veiculos'] == antes['veiculos'] and confere(estatisticas, db)[0])
+            _, consultas = contar_consultas(db, lambda: estatisticas.resumo())
+            result.test("Resumo em duas consultas", consultas == 2, f"{consultas} consultas")
+        except Exception as e:
+            result.test("Recalcular", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_perfis():
+    """Testa os perfis de PRAGMAs das conexões"""
+    print("\n" + "="*60)
+    print("TESTANDO PERFIS DE CONEXÃO")
+    print("="*60)
+    result = TestResult()
+    
+    import sqlite3
+    from database import Database
+    from migrations import aplicar_migracoes, versao_atual
+    from perfis import PERFIS, VARIAVEL_AMBIENTE, obter_perfil
+    
+    def pragmas(db, readonly=False):
+        with db.connection(readonly=readonly) as conn:
+            return {nome: conn.execute(f"PRAGMA {nome}").fetchone()[0]
+                    for nome in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size',
+                                 'busy_timeout', 'foreign_keys', 'query_only')}
+    
+    print("\n📌 Teste 1: Escolha do perfil")
+    try:
+        anterior = os.environ.pop(VARIAVEL_AMBIENTE, None)
+        try:
+            result.test("Padrão do programa", obter_perfil(padrao='carga-em-massa').nome == 'carga-em-massa')
+            os.environ[VARIAVEL_AMBIENTE] = 'somente-leitura'
+            result.test("Variável de ambiente antes do padrão",
+                        obter_perfil(padrao='carga-em-massa').nome == 'somente-leitura')
+            result.test("Nome explícito antes da variável", obter_perfil('interativo').nome == 'interativo')
+        finally:
+            os.environ.pop(VARIAVEL_AMBIENTE, None)
+            if anterior is not None:
+                os.environ[VARIAVEL_AMBIENTE] = anterior
+        try:
+            obter_perfil('turbo')
+            result.test("Perfil desconhecido rejeitado", False)
+        except ValueError:
+            result.test("Perfil desconhecido rejeitado", True)
+    except Exception as e:
+        result.test("Escolha do perfil", False, str(e))
+    
+    print("\n📌 Teste 2: PRAGMAs aplicados a cada conexão")
+    for nome in ('interativo', 'carga-em-massa'):
+        with banco_temporario(profile=nome) as db:
+            try:
+                perfil, valores = PERFIS[nome], pragmas(db)
+                result.test(f"{nome}: PRAGMAs do perfil",
+                            valores == {'journal_mode': 'wal',
+                                        'synchronous': {'OFF': 0, 'NORMAL': 1}[perfil.synchronous],
+                                        'cache_size': perfil.cache_size, 'mmap_size': perfil.mmap_size,
+                                        'busy_timeout': perfil.busy_timeout, 'foreign_keys': 1,
+                                        'query_only': 0}, str(valores))
+                result.test(f"{nome}: também nas conexões de leitura",
+                            pragmas(db, readonly=True)['cache_size'] == perfil.cache_size)
+            except Exception as e:
+                result.test(f"PRAGMAs de {nome}", False, str(e))
+    
+    print("\n📌 Teste 3: Perfil somente leitura")
+    with banco_temporario() as db:
+        try:
+            db.execute("INSERT INTO veiculos (marca, modelo, ano, preco, quilometragem) "
+                       "VALUES ('Fiat', 'Uno', 2010, 15000, 90000)")
+            caminho = db._db_path
+            db.close()
+            Database._instance = None
+            leitor = Database(caminho, profile='somente-leitura')
+            try:
+                leitor.create_tables()
+                result.test("Sem migrações: esquema intocado", versao_atual(leitor) == 10)
+                result.test("query_only nas conexões de escrita e de leitura",
+                            pragmas(leitor)['query_only'] == 1
+                            and pragmas(leitor, readonly=True)['query_only'] == 1)
+                result.test("Leituras funcionam",
+                            leitor.fetch_one("SELECT modelo FROM veiculos")[0] == 'Uno')
+                for nome, escrever in (("execute", lambda: leitor.execute("DELETE FROM veiculos")),
+                                       ("transaction", lambda: leitor.executemany(
+                                           "DELETE FROM veiculos WHERE id = ?", [(1,)]))):
+                    try:
+                        escrever()
+                        result.test(f"Escrita recusada ({nome})", False)
+                    except sqlite3.OperationalError:
+                        result.test(f"Escrita recusada ({nome})", True)
+                result.test("Nada foi gravado", leitor.fetch_one("SELECT COUNT(*) FROM veiculos")[0] == 1)
+            finally:
+                leitor.close()
+                Database._instance = db
+            
+            antigo = os.path.join(os.path.dirname(caminho), 'antigo.db')
+            Database._instance = None
+            velho = Database(antigo)
+            aplicar_migracoes(velho, alvo=5)
+            velho.close()
+            Database._instance = None
+            leitor = Database(antigo, profile='somente-leitura')
+            try:
+                leitor.create_tables()
+                result.test("Esquema desatualizado é recusado", False)
+            except RuntimeError:
+                result.test("Esquema desatualizado é recusado", versao_atual(leitor) == 5)
+            finally:
+                leitor.close()
+                Database._instance = db
+        except Exception as e:
+            result.test("Perfil somente leitura", False, str(e))
+    
+    print("\n📌 Teste 4: Troca de perfil em memória")
+    
+    def somente_leitura(db):
+        with db.connection() as conn:
+            return conn.execute("PRAGMA query_only").fetchone()[0]
+    
+    anterior = Database._instance
+    Database._instance = None
+    memoria = Database(":memory:")
+    try:
+        memoria.create_tables()
+        memoria.set_profile('somente-leitura')
+        result.test("Conexão atual passa a somente leitura", somente_leitura(memoria) == 1)
+        memoria.set_profile('interativo')
+        memoria.execute("INSERT INTO veiculos (marca, modelo, ano, preco, quilometragem) "
+                        "VALUES ('Fiat', 'Uno', 2010, 15000, 90000)")
+        result.test("Volta a aceitar escritas", somente_leitura(memoria) == 0)
+    except Exception as e:
+        result.test("Troca de perfil em memória", False, str(e))
+    finally:
+        memoria.close()
+        Database._instance = anterior
+    
+    result.summary()
+    return result
+
+
+def test_instrumentacao():
+    """Testa as medições por consulta e o log de consultas lentas"""
+    print("\n" + "="*60)
+    print("TESTANDO INSTRUMENTAÇÃO")
+    print("="*60)
+    result = TestResult()
+    
+    from instrumentacao import Instrumentacao, chamador, normalizar_sql
+    from models.Vehicle import Veiculo
+    from repository import AnuncioRepository, VeiculoRepository
+    
+    print("\n📌 Teste 1: Agregação por comando")
+    try:
+        result.test("Literais e listas IN normalizados",
+                    normalizar_sql("SELECT *  FROM t\n WHERE id IN (1, 2,  3) AND nome = 'x'")
+                    == normalizar_sql("SELECT * FROM t WHERE id IN (?, ?) AND nome = ?")
+                    == "SELECT * FROM t WHERE id IN (...) AND nome = ?")
+        medidor = Instrumentacao(max_amostras=10)
+        for milissegundos in range(1, 101):
+            medidor.registrar("SELECT * FROM t WHERE id = ?", milissegundos / 1000, linhas=1)
+        item = medidor.estatisticas()[0]
+        result.test("Chamadas, linhas e máximo",
+                    (item['chamadas'], item['linhas'], round(item['max_ms'])) == (100, 100, 100))
+        result.test("Percentis da amostra limitada", 1 <= item['p50_ms'] <= item['p99_ms'] <= 100)
+        medidor.ativa = False
+        medidor.registrar("SELECT 1", 0.001)
+        result.test("Desligada não mede", len(medidor.estatisticas()) == 1)
+    except Exception as e:
+        result.test("Agregação por comando", False, str(e))
+    
+    with banco_temporario() as db:
+        print("\n📌 Teste 2: Log de consultas lentas")
+        try:
+            log = os.path.join(os.path.dirname(db._db_path), 'lentas.log')
+            veiculos, anuncios = VeiculoRepository(), AnuncioRepository()
+            veiculos.salvar_muitos([Veiculo("Fiat", f"Uno {i}", 2010, 15000.0, 0) for i in range(3)])
+            
+            db.instrumentation.configurar_log_lento(0, log)
+            try:
+                anuncios.contar()
+                veiculos.buscar_filtrado(marcas=['Fiat'])
+                veiculos.salvar_muitos([Veiculo("Fiat", "Palio", 2012, 18000.0, 0)])
+            finally:
+                db.instrumentation.configurar_log_lento(None)
+            with open(log, encoding='utf-8') as arquivo:
+                linhas = arquivo.read().splitlines()
+            origens = {linha.split(' | ')[3].split(' (')[0] for linha in linhas}
+            result.test("Cada consulta registrada no arquivo", len(linhas) >= 5, f"{len(linhas)} linhas")
+            result.test("Origem é o método do repositório",
+                        {'AnuncioRepository.contar', 'VeiculoRepository.buscar_filtrado',
+                         'VeiculoRepository.salvar_muitos'} <= origens, str(origens))
+            result.test("Funções auxiliares de repository.py não aparecem",
+                        not any(origem.startswith('_') for origem in origens), str(origens))
+            
+            antes = len(linhas)
+            db.instrumentation.configurar_log_lento(10 ** 6, log)
+            try:
+                anuncios.contar()
+            finally:
+                db.instrumentation.configurar_log_lento(None)
+            with open(log, encoding='utf-8') as arquivo:
+                result.test("Abaixo do limite nada é escrito", len(arquivo.readlines()) == antes)
+            result.test("Fora da camada de banco, a própria função",
+                        chamador().startswith("test_instrumentacao (test.py:"))
+        except Exception as e:
+            result.test("Log de consultas lentas", False, str(e))
+        
+        print("\n📌 Teste 3: Exemplos gravados")
+        try:
+            with db.instrumentation.gravar() as gravacao:
+                db.executemany("UPDATE veiculos SET preco = ? WHERE id = ?", [(1.0, 1), (2.0, 2)])
+            result.test("executemany guarda os parâmetros da primeira linha",
+                        list(gravacao.values()) == [("UPDATE veiculos SET preco = ? WHERE id = ?", (1.0, 1))])
+            estatisticas = {item['sql']: item for item in db.query_stats()}
+            result.test("Linhas afetadas somadas",
+                        estatisticas["UPDATE veiculos SET preco = ? WHERE id = ?"]['linhas'] == 2)
+        except Exception as e:
+            result.test("Exemplos gravados", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_planos_de_consulta():
+    """Testa se alguma consulta dos repositórios passou a varrer tabelas"""
+    print("\n" + "="*60)
+    print("TESTANDO PLANOS DE CONSULTA")
+    print("="*60)
+    result = TestResult()
+    
+    import verificar_planos
+    
+    print("\n📌 Teste 1: Planos comparados com planos_consultas.json")
+    try:
+        resultado = verificar_planos.verificar()
+        result.test("Consultas analisadas", len(resultado['planos']) > 0,
+                    "nenhum comando SQL registrado")
+        for sql, motivo in resultado['regressoes']:
+            result.test("Plano de consulta", False, f"{motivo}: {sql[:80]}")
+        if not resultado['regressoes']:
+            result.test("Nenhuma regressão de plano", True)
+    except Exception as e:
+        result.test("Verificação de planos", False, str(e))
+    
+    result.summary()
+    return result
+
+
+def test_benchmark():
+    """Testa a detecção de regressões do benchmark com medições sintéticas"""
+    print("\n" + "="*60)
+    print("TESTANDO DETECÇÃO DE REGRESSÕES DO BENCHMARK")
+    print("="*60)
+    result = TestResult()
+    
+    import random
+    import benchmark
+    
+    aleatorio = random.Random(1)
+    
+    def medicao(operacao_ms, maquina=1.0):
+        """Medianas de 10 rodadas com 5% de ruído; maquina escala tudo."""
+        def rodadas(ms):
+            return [ms * maquina * aleatorio.gauss(1.0, 0.05) for _ in range(10)]
+        return {'1000': {'veiculos.buscar_por_id': {'rodadas': rodadas(operacao_ms)},
+                         benchmark.CALIBRACAO: {'rodadas': rodadas(0.2)}}}
+    
+    referencia = medicao(0.05)
+    
+    print("\n📌 Teste 1: Mesmos tempos não são regressão")
+    try:
+        resultado = benchmark.comparar(referencia, medicao(0.05))
+        print(f"   📊 Variação: {resultado['comparacoes'][0]['variacao']:+.1%}")
+        result.test("Sem regressão com tempos iguais", not resultado['regressoes'])
+    except Exception as e:
+        result.test("Sem regressão com tempos iguais", False, str(e))
+    
+    print("\n📌 Teste 2: Operação 50% mais lenta é regressão")
+    try:
+        resultado = benchmark.comparar(referencia, medicao(0.075))
+        print(f"   📊 Variação: {resultado['comparacoes'][0]['variacao']:+.1%}, "
+              f"p = {resultado['comparacoes'][0]['p']:.2g}")
+        result.test("Regressão detectada", len(resultado['regressoes']) == 1)
+    except Exception as e:
+        result.test("Regressão detectada", False, str(e))
+    
+    print("\n📌 Teste 3: Máquina 50% mais lenta não é regressão (calibração)")
+    try:
+        resultado = benchmark.comparar(referencia, medicao(0.05, maquina=1.5))
+        print(f"   📊 Variação descontada a calibração: "
+              f"{resultado['comparacoes'][0]['variacao']:+.1%}")
+        result.test("Calibração desconta a máquina", not resultado['regressoes'])
+    except Exception as e:
+        result.test("Calibração desconta a máquina", False, str(e))
+    
+    result.summary()
+    return result
+
+
 def main():
     """Função principal que executa todos os testes"""
     print("\n" + "="*60)
@@ -669,6 +2274,24 @@ def main():
     results.append(test_anunciante())
     results.append(test_anuncio())
     results.append(test_admin())
+    results.append(test_pool_e_transacoes())
+    results.append(test_carregamento_de_usuarios())
+    results.append(test_busca_textual())
+    results.append(test_busca_filtrada())
+    results.append(test_paginacao())
+    results.append(test_mapa_de_identidade())
+    results.append(test_cache_de_leitura())
+    results.append(test_alteracoes_entre_processos())
+    results.append(test_gravacao_em_lote())
+    results.append(test_importador())
+    results.append(test_exportador())
+    results.append(test_moderacao_em_lote())
+    results.append(test_fila_moderacao())
+    results.append(test_estatisticas())
+    results.append(test_perfis())
+    results.append(test_instrumentacao())
+    results.append(test_planos_de_consulta())
+    results.append(test_benchmark())
     
     # Resumo geral
     total_passed = sum(r.passed for r in results)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verificação de Planos de Consulta
+=================================
+
+Detecta consultas dos repositórios que passaram a varrer tabelas inteiras.
+
+1. Cria um banco temporário com alguns milhares de registros (gerador.py).
+2. Chama os métodos dos repositórios (e da fila de moderação e das
+   estatísticas), gravando um exemplo de cada comando SQL distinto
+   (``Instrumentacao.gravar``).
+3. Roda ``EXPLAIN QUERY PLAN`` em cada um e anota as varreduras completas
+   (``SCAN tabela``) e as árvores B temporárias (``USE TEMP B-TREE``).
+4. Compara com a referência gravada em ``planos_consultas.json``: uma
+   varredura ou árvore temporária que não existia antes é uma regressão.
+
+Comandos novos (ainda fora da referência) só são listados. Depois de revisar
+uma mudança intencional de plano, grave uma nova referência com
+``--atualizar``.
+
+Uso:
+    python verificar_planos.py                 # compara com a referência
+    python verificar_planos.py --atualizar     # grava a referência atual
+    python verificar_planos.py --veiculos 50000
+    python verificar_planos.py --mostrar       # imprime todos os planos
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+from database import Database
+from gerador import GeradorCatalogo
+
+REFERENCIA_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 'planos_consultas.json')
+
+# Comandos sem plano de consulta relevante
+_IGNORADOS = ('PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE',
+              'CREATE', 'DROP', 'ANALYZE', 'EXPLAIN', 'INSERT INTO CONTAGENS',
+              'INSERT INTO ESTATISTICAS_MARCA', 'DELETE FROM CONTAGENS',
+              'DELETE FROM ESTATISTICAS_MARCA')
+
+_VARREDURA = re.compile(r"^SCAN (\w+)(?!.*VIRTUAL TABLE)")
+_BTREE = re.compile(r"USE TEMP B-TREE FOR (.+)$")
+# Nomes de CTEs: percorrer o resultado já filtrado não é varrer uma tabela
+_CTE = re.compile(r"(?:\bWITH|,)\s*(\w+)\s+AS\s+(?:NOT\s+)?(?:MATERIALIZED\s*)?\(", re.IGNORECASE)
+
+def exercitar(admin_id: int, anunciante_id: int, cliente_id: int,
+              veiculo_id: int, anuncio_id: int):
+    """Chama os métodos de leitura e escrita que emitem SQL."""
+    from estatisticas import Estatisticas
+    from models.Vehicle import Veiculo
+    from moderacao import FilaModeracao
+    from repository import (AnuncioRepository, ClienteRepository, UsuarioRepository,
+                            VeiculoRepository)
+
+    usuarios, veiculos = UsuarioRepository(), VeiculoRepository()
+    anuncios, clientes = AnuncioRepository(), ClienteRepository()
+
+    # Usuários
+    usuarios.buscar_por_id(admin_id, 'admin')
+    usuarios.buscar_por_id(anunciante_id, 'anunciante')
+    usuarios.buscar_por_id(cliente_id, 'cliente')
+    usuarios.buscar_por_email('usuario1@exemplo.com')
+    usuarios.listar_todos(limit=50)
+    usuarios.listar_todos('cliente', after_id=anunciante_id, limit=50)
+    usuarios.contar()
+    usuarios.contar('cliente')
+    list(usuarios.iter_todos('anunciante'))
+    pagina = usuarios.listar_pagina(limit=20, tipo='cliente')
+    usuarios.listar_pagina(pagina.token, limit=20, tipo='cliente')
+    usuarios.carregar_historico(cliente_id)
+    usuarios.atualizar(cliente_id, {'nome': 'Cliente Renomeado'})
+
+    # Veículos
+    veiculos.buscar_por_id(veiculo_id)
+    veiculos.listar_todos(limit=50)
+    veiculos.listar_todos(after_id=100, limit=50)
+    veiculos.listar_por_anunciante(anunciante_id, limit=50)
+    veiculos.contar()
+    veiculos.contar(anunciante_id)
+    list(veiculos.iter_todos(anunciante_id))
+    pagina = veiculos.listar_pagina(limit=20, anunciante_id=anunciante_id)
+    veiculos.listar_pagina(pagina.token, limit=20, anunciante_id=anunciante_id)
+    veiculos.buscar("toyota cor")
+    for ordem in VeiculoRepository._ORDENACOES:
+        veiculos.buscar_filtrado(ordem=ordem)
+        veiculos.buscar_filtrado(preco_min=30000, preco_max=80000, ordem=ordem)
+    veiculos.buscar_filtrado(ano_min=2015, ano_max=2020, ordem='ano')
+    veiculos.buscar_filtrado(km_max=20000, ordem='km')
+    veiculos.buscar_filtrado(ano_min=2015, ano_max=2020, marcas=['Ford', 'Fiat'])
+    veiculos.buscar_filtrado(km_max=20000)
+    veiculos.buscar_filtrado(marcas=['Honda'], ordem='ano_desc')
+    veiculos.atualizar(veiculo_id, {'preco': 50000.0})
+    novo = Veiculo('Ford', 'Ka', 2019, 40000.0, 1000, None)
+    veiculos.deletar(veiculos.salvar(novo, anunciante_id))
+
+    # Anúncios
+    anuncios.buscar_por_id(anuncio_id)
+    anuncios.buscar_por_ids([anuncio_id, anuncio_id - 1])
+    anuncios.listar_todos(limit=50)
+    anuncios.listar_por_anunciante(anunciante_id, limit=50)
+    anuncios.listar_por_status('Aprovado', limit=50)
+    anuncios.listar_por_status('Pendente', after_id=100, limit=50)
+    anuncios.contar()
+    anuncios.contar('Pendente')
+    list(anuncios.iter_todos('Aprovado', anunciante_id=anunciante_id))
+    list(anuncios.iter_exportacao('Aprovado', '2024-01-01', '2024-03-31'))
+    list(anuncios.iter_exportacao(None, anunciante_id=anunciante_id))
+    pagina = anuncios.listar_pagina(limit=20, status='Aprovado')
+    anuncios.listar_pagina(pagina.token, limit=20, status='Aprovado')
+    anuncios.buscar_aprovados("honda", limit=20)
+    anuncios.buscar_aprovados("", limit=20)
+    for ordem in AnuncioRepository._ORDENACOES:
+        anuncios.buscar_filtrado(ordem=ordem)
+        anuncios.buscar_filtrado(preco_min=30000, preco_max=80000, ordem=ordem)
+    anuncios.buscar_filtrado(ano_min=2015, ano_max=2020, ordem='ano_desc')
+    anuncios.buscar_filtrado(ano_min=2015, marcas=['Toyota'], km_max=50000)
+    anuncios.atualizar_status(anuncio_id, 'Pendente')
+    anuncios.atualizar_status_em_lote([anuncio_id, anuncio_id - 1], 'Aprovado',
+                                      status_atual='Pendente')
+    anuncios.atualizar_status_por_filtro('Aprovado', 'corolla', anunciante_id=anunciante_id)
+    anuncios.atualizar_status_por_filtro('Rejeitado', status_atual='Pendente',
+                                         anunciante_id=anunciante_id)
+
+    # Histórico de pesquisas
+    clientes.salvar_pesquisa(cliente_id, 'civic')
+    clientes.obter_historico(cliente_id)
+    clientes.limpar_historico(cliente_id)
+
+    # Fila de moderação e estatísticas
+    fila = FilaModeracao()
+    lote = fila.reivindicar(admin_id, 10)
+    fila.renovar(admin_id)
+    fila.aprovar(admin_id, [a.id for a in lote[:5]])
+    fila.liberar(admin_id)
+    fila.situacao()
+    Estatisticas().resumo()
+    Estatisticas().calcular()
+
+
+def coletar(db: Database) -> Dict[str, Tuple[str, tuple]]:
+    """Exercita os repositórios e retorna um exemplo de cada comando emitido."""
+    def primeiro(tipo):
+        return db.fetch_one("SELECT MIN(id) AS id FROM usuarios WHERE tipo = ?", (tipo,))['id']
+
+    ids = dict(admin_id=primeiro('admin'), anunciante_id=primeiro('anunciante'),
+               cliente_id=primeiro('cliente'),
+               veiculo_id=db.fetch_one("SELECT MAX(veiculo_id) AS id FROM anuncios")['id'],
+               anuncio_id=db.fetch_one("SELECT MAX(id) AS id FROM anuncios")['id'])
+    with db.instrumentation.gravar() as gravacao:
+        exercitar(**ids)
+    return {chave: exemplo for chave, exemplo in gravacao.items()
+            if not chave.upper().startswith(_IGNORADOS)}
+
+
+def analisar_plano(sql: str, detalhes: List[str]) -> dict:
+    """Extrai as varreduras completas e as árvores B temporárias de um plano."""
+    ctes = {nome.lower() for nome in _CTE.findall(sql)}
+    varreduras, btrees = set(), set()
+    for detalhe in detalhes:
+        varredura = _VARREDURA.match(detalhe)
+        if (varredura and detalhe != 'SCAN CONSTANT ROW'
+                and varredura.group(1).lower() not in ctes):
+            varreduras.add(varredura.group(1))
+        btree = _BTREE.search(detalhe)
+        if btree:
+            btrees.add(btree.group(1))
+    return {'plano': detalhes, 'varreduras': sorted(varreduras),
+            'btree_temporaria': sorted(btrees)}
+
+
+def analisar(db: Database, consultas: Dict[str, Tuple[str, tuple]]) -> Dict[str, dict]:
+    """Roda EXPLAIN QUERY PLAN em cada comando coletado."""
+    planos = {}
+    for chave, (sql, params) in sorted(consultas.items()):
+        try:
+            detalhes = db.explain(sql, params)
+        except sqlite3.Error as e:
+            detalhes = [f"ERRO: {e}"]
+        planos[chave] = analisar_plano(sql, detalhes)
+    return planos
+
+
+def comparar(referencia: Dict[str, dict], atuais: Dict[str, dict]) -> dict:
+    """
+    Compara os planos atuais com a referência.
+
+    Returns:
+        dict: regressoes (lista de (sql, motivo)), novas (sql com varredura
+        ou árvore temporária que ainda não estão na referência) e removidas.
+    """
+    regressoes, novas = [], []
+    for chave, atual in atuais.items():
+        anterior = referencia.get(chave)
+        if anterior is None:
+            if atual['varreduras'] or atual['btree_temporaria']:
+                novas.append(chave)
+            continue
+        for tabela in set(atual['varreduras']) - set(anterior['varreduras']):
+            regressoes.append((chave, f"passou a varrer a tabela {tabela}"))
+        for uso in set(atual['btree_temporaria']) - set(anterior['btree_temporaria']):
+            regressoes.append((chave, f"passou a usar árvore B temporária para {uso}"))
+    removidas = sorted(set(referencia) - set(atuais))
+    return {'regressoes': regressoes, 'novas': sorted(novas), 'removidas': removidas}
+
+
+def verificar(referencia: str = REFERENCIA_PADRAO, atualizar: bool = False,
+              veiculos: int = 20000) -> dict:
+    """
+    Executa a verificação completa em um banco temporário.
+
+    Args:
+        referencia: Arquivo JSON com os planos de referência.
+        atualizar: Grava os planos atuais como nova referência.
+        veiculos: Tamanho do banco de teste.
+
+    Returns:
+        dict: planos atuais e o resultado de ``comparar`` (vazio ao atualizar
+        ou sem referência).
+    """
+    pasta = tempfile.mkdtemp(prefix='planos_')
+    caminho = os.path.join(pasta, 'planos.db')
+    db = Database(caminho, cache_size=0)
+    if os.path.abspath(db._db_path) != caminho:
+        raise RuntimeError("verificar_planos precisa da primeira instância de Database.")
+    try:
+        db.create_tables()
+        GeradorCatalogo(db, usuarios=300, veiculos=veiculos).executar()
+        planos = analisar(db, coletar(db))
+    finally:
+        db.close()
+        for nome in os.listdir(pasta):
+            os.remove(os.path.join(pasta, nome))
+        os.rmdir(pasta)
+
+    resultado = {'planos': planos, 'regressoes': [], 'novas': [], 'removidas': [],
+                 'sqlite_referencia': sqlite3.sqlite_version}
+    if atualizar or not os.path.exists(referencia):
+        with open(referencia, 'w', encoding='utf-8') as arquivo:
+            json.dump({'sqlite': sqlite3.sqlite_version, 'veiculos': veiculos,
+                       'planos': planos}, arquivo, ensure_ascii=False, indent=2)
+            arquivo.write('\n')
+        return resultado
+
+    with open(referencia, encoding='utf-8') as arquivo:
+        dados = json.load(arquivo)
+    resultado.update(comparar(dados['planos'], planos))
+    resultado['sqlite_referencia'] = dados.get('sqlite')
+    return resultado
+
+
+def main():
+    """Função principal da verificação."""
+    parser = argparse.ArgumentParser(description="Verifica os planos das consultas dos repositórios.")
+    parser.add_argument('--referencia', default=REFERENCIA_PADRAO,
+                        help="arquivo JSON de referência (padrão: planos_consultas.json)")
+    parser.add_argument('--atualizar', action='store_true',
+                        help="grava os planos atuais como referência")
+    parser.add_argument('--veiculos', type=int, default=20000,
+                        help="veículos no banco de teste (padrão: 20000)")
+    parser.add_argument('--mostrar', action='store_true', help="imprime todos os planos")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("🔍 VERIFICAÇÃO DOS PLANOS DE CONSULTA")
+    print("="*60)
+
+    existia = os.path.exists(args.referencia)
+    resultado = verificar(args.referencia, args.atualizar, args.veiculos)
+    planos = resultado['planos']
+
+    if args.mostrar:
+        for sql, plano in planos.items():
+            print(f"\n{sql}")
+            for detalhe in plano['plano']:
+                print(f"    {detalhe}")
+
+    com_varredura = [sql for sql, plano in planos.items() if plano['varreduras']]
+    com_btree = [sql for sql, plano in planos.items() if plano['btree_temporaria']]
+    print(f"📋 {len(planos)} comandos analisados: {len(com_varredura)} com varredura "
+          f"completa, {len(com_btree)} com árvore B temporária")
+
+    if args.atualizar or not existia:
+        print(f"💾 Referência gravada em {args.referencia}")
+        print("="*60 + "\n")
+        return 0
+
+    if resultado['sqlite_referencia'] != sqlite3.sqlite_version:
+        print(f"⚠️  Referência gravada com SQLite {resultado['sqlite_referencia']}, "
+              f"executando com {sqlite3.sqlite_version}: planos podem mudar entre versões")
+    for sql in resultado['novas']:
+        print(f"⚠️  Comando novo com varredura ou árvore temporária:\n    {sql}")
+    if resultado['removidas']:
+        print(f"ℹ️  {len(resultado['removidas'])} comando(s) da referência não foram executados")
+    for sql, motivo in resultado['regressoes']:
+        print(f"✗ Regressão: {motivo}\n    {sql}")
+        for detalhe in planos[sql]['plano']:
+            print(f"      {detalhe}")
+
+    if resultado['regressoes']:
+        print(f"\n✗ {len(resultado['regressoes'])} regressão(ões) de plano")
+        print("="*60 + "\n")
+        return 1
+    print("✅ Nenhuma regressão de plano")
+    print("="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())